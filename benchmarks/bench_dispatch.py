@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Time to turn an input line into a command and its arguments, with the
+# dispatch table versus an argparse tree of the same commands, and the time
+# to build each from the plugin manifest.
+#
+#   python benchmarks/bench_dispatch.py --repeat 20 --lines 1000
+
+import argparse
+import json
+import os
+
+from rsbbs.parser import Parser
+
+import common
+
+
+MANIFEST = os.path.join(os.path.dirname(__file__), '..', 'rsbbs',
+                        'plugins', 'manifest.json')
+
+LINES = [
+    'b',
+    'r 12',
+    'l',
+    'l from:W1AW 5',
+    'l -a 100-200',
+    'f -n 5 antenna',
+    'sp --callsign w1aw --subject hi --message 73',
+]
+
+
+def build() -> Parser:
+    parser = Parser()
+    with open(MANIFEST) as f:
+        for commands in json.load(f).values():
+            for command in commands:
+                parser.add_command(command, print)
+    return parser
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=20,
+                        help="Timed runs per measurement")
+    parser.add_argument('--lines', type=int, default=1000,
+                        help="Lines parsed per timed run")
+    args = parser.parse_args()
+
+    commands = build()
+    tree = commands.parser
+    rows = []
+    for line in LINES:
+        words = line.split()
+
+        def dispatch():
+            for _ in range(args.lines):
+                commands.parse_args(words)
+
+        def parse():
+            for _ in range(args.lines):
+                tree.parse_args(words)
+
+        # From milliseconds for args.lines lines to microseconds for one
+        scale = 1000 / args.lines
+        ours = common.timed(dispatch, args.repeat) * scale
+        theirs = common.timed(parse, args.repeat) * scale
+        rows.append([line, f"{theirs:.1f}", f"{ours:.1f}",
+                     f"{theirs / ours:.0f}x"])
+    common.report(
+        "Microseconds to parse a line",
+        ['line', 'argparse', 'dispatch', 'speedup'],
+        rows)
+
+    def build_table():
+        parser = build()
+        for command in parser.dispatcher.commands:
+            command.grammar
+
+    common.report(
+        "Milliseconds to build from the manifest",
+        ['dispatch table', 'argparse tree'],
+        [[f"{common.timed(build_table, args.repeat):.2f}",
+          f"{common.timed(lambda: build().parser, args.repeat):.2f}"]])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Mailbox query latency on the original schema versus the current one, with
+# its indexes and unread index.
+#
+#   python benchmarks/bench_indexes.py --messages 100000
+
+import sqlalchemy
+
+from sqlalchemy.orm import Session
+
+from rsbbs.mailbox import select_unread
+from rsbbs.models import Message, User
+
+import common
+
+
+# The user columns the original schema has; later columns, such as
+# login_previous, aren't there to select
+LOGIN_COLUMNS = (User.id, User.callsign, User.given_name, User.family_name,
+                 User.login_count, User.login_last)
+
+
+def statements(caller: str, user_id: int, indexed: bool) -> dict:
+    # The query shapes used by the mailbox plugins
+    if indexed:
+        listunread = select_unread(caller)
+    else:
+        # What listunread ran before the unread index
+        listunread = sqlalchemy.select(Message).from_statement(
+            sqlalchemy.text("""
+                SELECT * FROM message
+                WHERE recipient = :caller AND NOT EXISTS (
+                    SELECT 1 FROM user_message
+                    WHERE user_message.message_id = message.id
+                    AND user_message.user_id = :user_id)""").bindparams(
+                caller=caller, user_id=user_id))
+    return {
+        'list': sqlalchemy.select(Message).where(
+            sqlalchemy.or_(Message.is_private.is_(False),
+                           Message.recipient == caller)),
+        'listmine': sqlalchemy.select(Message).where(
+            Message.recipient == caller),
+        'listunread': listunread,
+        'delete (lookup)': sqlalchemy.select(Message.id).where(
+            Message.recipient == caller, Message.id == 50),
+        'login': sqlalchemy.select(*LOGIN_COLUMNS).where(
+            User.callsign == caller),
+    }
+
+
+def measure(engine: sqlalchemy.Engine, repeat: int, indexed: bool) -> dict:
+    caller = common.callsign(7)
+    results = {}
+    with Session(engine) as session:
+        for name, statement in statements(caller, 8, indexed).items():
+            def run():
+                session.execute(statement).all()
+                session.expunge_all()
+            results[name] = common.timed(run, repeat)
+    return results
+
+
+def main():
+    args = common.parse_args(__doc__)
+    before = common.temporary_engine(schema_version=1)
+    after = common.temporary_engine()
+    for engine in (before, after):
+        common.populate(engine, args.messages, args.callsigns)
+
+    before_ms = measure(before, args.repeat, indexed=False)
+    after_ms = measure(after, args.repeat, indexed=True)
+    common.report(
+        f"Median latency, {args.messages} messages, "
+        f"{args.callsigns} callsigns",
+        ['query', 'before (ms)', 'after (ms)', 'speedup'],
+        [[name, f"{before_ms[name]:.2f}", f"{after_ms[name]:.2f}",
+          f"{before_ms[name] / after_ms[name]:.1f}x"]
+         for name in before_ms])
+
+
+if __name__ == "__main__":
+    main()
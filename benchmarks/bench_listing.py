@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Cost of the list commands loading whole messages versus just the columns
+# a message list shows.
+#
+#   python benchmarks/bench_listing.py --messages 100000
+
+import sqlalchemy
+
+from sqlalchemy.orm import Session, undefer
+
+from rsbbs.models import Message
+from rsbbs.pagination import SUMMARY_COLUMNS
+
+import common
+
+
+# Bulletins run long
+BODY_SIZE = 2000
+
+
+def queries(caller: str) -> dict:
+    visible = sqlalchemy.or_(Message.is_private.is_(False),
+                             Message.recipient == caller)
+    return {
+        'list (page)': (visible, 21),
+        'list (all)': (visible, None),
+        'listmine (all)': (Message.recipient == caller, None),
+    }
+
+
+def statement(columns: list, where, limit: int) -> sqlalchemy.Select:
+    statement = sqlalchemy.select(*columns).where(where).order_by(
+        Message.id.desc())
+    return statement.limit(limit) if limit else statement
+
+
+def bytes_fetched(engine: sqlalchemy.Engine,
+                  statement: sqlalchemy.Select) -> int:
+    with engine.connect() as connection:
+        return sum(len(str(value))
+                   for row in connection.execute(statement)
+                   for value in row)
+
+
+def main():
+    args = common.parse_args(__doc__)
+    engine = common.temporary_engine()
+    common.populate(engine, args.messages, args.callsigns,
+                    body_size=BODY_SIZE)
+
+    # Before: whole Message objects, as the list commands used to load them
+    whole = ([Message], [undefer(Message.message)], [Message.__table__])
+    # After: only the columns print_message_list shows
+    summary = (SUMMARY_COLUMNS, [], SUMMARY_COLUMNS)
+
+    rows = []
+    with Session(engine) as session:
+        for name, (where, limit) in queries(common.callsign(7)).items():
+            results = []
+            for columns, options, raw_columns in (whole, summary):
+                query = statement(columns, where, limit).options(*options)
+
+                def run():
+                    for _ in session.execute(query):
+                        pass
+                    session.expunge_all()
+                results.append((
+                    bytes_fetched(engine,
+                                  statement(raw_columns, where, limit)),
+                    common.timed(run, args.repeat)))
+            (before_bytes, before_ms), (after_bytes, after_ms) = results
+            rows.append([name, before_bytes, after_bytes,
+                         f"{before_ms:.2f}", f"{after_ms:.2f}"])
+
+    common.report(
+        f"Listing, {args.messages} messages of {BODY_SIZE} bytes",
+        ['query', 'bytes before', 'bytes after', 'ms before', 'ms after'],
+        rows)
+
+
+if __name__ == "__main__":
+    main()
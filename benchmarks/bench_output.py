@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Time on air for command output over a simulated 1200 baud AX.25 link,
+# writing each line as it comes versus packet-sized writes.
+#
+# Each write to stdout becomes at least one I frame, with 20 bytes of
+# flags, addresses, control, PID and checksum around up to paclen bytes of
+# text. The sender keys up (txdelay) for every maxframe frames and waits
+# for the RR that acknowledges them.
+#
+#   python benchmarks/bench_output.py --paclen 256 --maxframe 4
+
+import argparse
+import io
+import math
+import unittest.mock
+
+from datetime import datetime, timedelta
+
+from rsbbs.output import PacketWriter
+
+import common
+
+
+BAUD = 1200
+FRAME_OVERHEAD = 20
+RR_FRAME = 17
+
+
+class Link(io.RawIOBase):
+    """Records the size of each write to stdout."""
+
+    def __init__(self):
+        self.writes = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.writes.append(len(data))
+        return len(data)
+
+
+def list_output(count: int = 20) -> list:
+    lines = [f"{'MSG#': <5} {'TO': <9} {'FROM': <9} {'DATE': <11} SUBJECT"]
+    start = datetime(2023, 6, 1)
+    for n in range(count):
+        date = (start + timedelta(days=n)).strftime('%Y-%m-%d')
+        lines.append(f"{n + 1: <5} {common.callsign(n): <9} "
+                     f"{common.callsign(n + 1): <9} {date: <11} "
+                     f"Net report {n + 1}")
+    lines.append(f"More: l --after {count}")
+    return lines
+
+
+def read_output(body_lines: int = 30) -> list:
+    return [
+        "",
+        "Message: 1",
+        "Date:    Thursday, June 1, 2023 at 9:00 AM UTC",
+        "From:    K0001",
+        "To:      K0002",
+        "Subject: Net report",
+        "",
+        '\r\n'.join("The quick brown fox jumps over the lazy dog. " * 2
+                    for _ in range(body_lines)),
+    ]
+
+
+def frames(writes: list, paclen: int) -> int:
+    # The kernel splits a write longer than paclen into several frames
+    return sum(math.ceil(size / paclen) for size in writes)
+
+
+def air_time(writes: list, args: argparse.Namespace) -> float:
+    count = frames(writes, args.paclen)
+    transmissions = math.ceil(count / args.maxframe)
+    data = sum(writes) + count * FRAME_OVERHEAD
+    acks = transmissions * RR_FRAME
+    return ((data + acks) * 8 / BAUD
+            + transmissions * 2 * args.txdelay / 1000)
+
+
+def run(lines: list, paclen: int) -> list:
+    link = Link()
+    stdout = io.TextIOWrapper(io.BufferedWriter(link), newline='')
+    writer = PacketWriter(paclen, delay=0)
+    with unittest.mock.patch('sys.stdout', new=stdout):
+        for line in lines + ['ENTER COMMAND >']:
+            writer.write(line + '\r\n')
+        writer.flush()
+    return link.writes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--paclen', type=int, default=256,
+                        help="Largest frame payload in bytes")
+    parser.add_argument('--maxframe', type=int, default=4,
+                        help="Frames sent per transmission")
+    parser.add_argument('--txdelay', type=int, default=300,
+                        help="Key-up delay per transmission in ms")
+    args = parser.parse_args()
+
+    rows = []
+    for name, lines in [('l', list_output()), ('r', read_output())]:
+        for mode, paclen in [('per line', 0), ('coalesced', args.paclen)]:
+            writes = run(lines, paclen)
+            seconds = air_time(writes, args)
+            rows.append([name, mode, sum(writes), len(writes),
+                         frames(writes, args.paclen), f"{seconds:.1f}",
+                         f"{sum(writes) / seconds:.0f}"])
+
+    common.report(
+        f"Command output at {BAUD} baud, paclen {args.paclen}, maxframe "
+        f"{args.maxframe}, txdelay {args.txdelay} ms",
+        ['command', 'output', 'bytes', 'writes', 'frames', 'seconds',
+         'bytes/s'],
+        rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The cost of building and compiling each command's statement, versus
+# running the prebuilt statements in rsbbs.queries from a warm cache.
+#
+#   python benchmarks/bench_queries.py --messages 10000 --repeat 500
+
+import sqlalchemy
+
+from sqlalchemy.orm import Session, undefer
+
+from rsbbs import queries
+from rsbbs.mailbox import select_unread
+from rsbbs.models import Message, UnreadMessage
+from rsbbs.pagination import SUMMARY_COLUMNS, Page
+
+import common
+
+
+# Each command's statement as the plugins built it on every call, and the
+# prebuilt one with its parameters
+def read_message(callsign):
+    return sqlalchemy.select(Message).where(
+        sqlalchemy.or_(
+            sqlalchemy.and_(Message.id == 5, Message.recipient == callsign),
+            sqlalchemy.and_(Message.id == 5,
+                            sqlalchemy.not_(Message.is_private)))).options(
+        undefer(Message.message))
+
+
+def list_visible(callsign):
+    return Page('l', 20).apply(sqlalchemy.select(*SUMMARY_COLUMNS).where(
+        sqlalchemy.or_(Message.is_private.is_(False),
+                       Message.recipient == callsign)))
+
+
+def list_unread(callsign):
+    return Page('lu', 20).apply(select_unread(callsign, *SUMMARY_COLUMNS),
+                                UnreadMessage.message_id)
+
+
+def count_messages(callsign):
+    return sqlalchemy.select(sqlalchemy.func.count(Message.id))
+
+
+COMMANDS = [
+    ('r', read_message, lambda: queries.READ_MESSAGE, ['id', 'callsign']),
+    ('l', list_visible,
+     lambda: Page('l', 20).apply(queries.LIST_VISIBLE), ['callsign']),
+    ('lu', list_unread,
+     lambda: Page('lu', 20).apply(queries.LIST_UNREAD,
+                                  UnreadMessage.message_id), ['callsign']),
+    ('st', count_messages, lambda: queries.COUNT_MESSAGES, []),
+]
+
+
+def main():
+    args = common.parse_args(__doc__, messages=10_000, repeat=500)
+    warm_engine = common.temporary_engine()
+    common.populate(warm_engine, args.messages, args.callsigns)
+    # A short-lived process compiles every statement it runs
+    cold_engine = sqlalchemy.create_engine(warm_engine.url,
+                                           query_cache_size=0)
+    queries.warm(warm_engine)
+    caller = common.callsign(7)
+    values = {'id': 5, 'callsign': caller}
+
+    def us(function):
+        return f"{common.timed(function, args.repeat) * 1000:.0f}"
+
+    rows = []
+    with Session(warm_engine) as warm, Session(cold_engine) as cold:
+        for name, build, prebuilt, params in COMMANDS:
+            params = {key: values[key] for key in params}
+            rows.append([
+                name,
+                us(lambda: build(caller)),
+                us(lambda: cold.execute(build(caller)).all()),
+                us(lambda: warm.execute(build(caller)).all()),
+                us(lambda: warm.execute(prebuilt(), params).all()),
+            ])
+
+    common.report(
+        f"Statement overhead, {args.messages} messages (microseconds)",
+        ['command', 'build', 'build+compile+run', 'build+run (cached)',
+         'prebuilt+run (cached)'],
+        rows)
+
+
+if __name__ == "__main__":
+    main()
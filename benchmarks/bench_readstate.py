@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Storage and lookup cost of read state: the user_message association table
+# versus compressed per-user bitmaps.
+#
+#   python benchmarks/bench_readstate.py --messages 100000
+
+import sqlalchemy
+
+from sqlalchemy.orm import Session
+
+from rsbbs import readstate
+
+import common
+
+
+def table_bytes(engine: sqlalchemy.Engine, table: str) -> int:
+    with engine.connect() as connection:
+        return connection.exec_driver_sql(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name = ?",
+            (table,)).scalar()
+
+
+def main():
+    args = common.parse_args(__doc__, callsigns=50)
+    # Schema 3 is the last with the user_message table
+    before = common.temporary_engine(schema_version=3)
+    after = common.temporary_engine()
+    for engine in (before, after):
+        # Everyone has read everything addressed to them but a few
+        common.populate(engine, args.messages, args.callsigns,
+                        read_ratio=0.95)
+
+    message_id = args.messages // 2
+    with before.connect() as connection:
+        def lookup_before():
+            connection.exec_driver_sql(
+                "SELECT 1 FROM user_message "
+                "WHERE user_id = ? AND message_id = ?",
+                (8, message_id)).all()
+        before_ms = common.timed(lookup_before, args.repeat)
+    with Session(after) as session:
+        def lookup_after():
+            readstate.has_read(session, 8, message_id)
+        after_ms = common.timed(lookup_after, args.repeat)
+
+    common.report(
+        f"Read state, {args.messages} messages, {args.callsigns} callsigns",
+        ['store', 'bytes', 'has read (ms)'],
+        [['user_message', table_bytes(before, 'user_message'),
+          f"{before_ms:.3f}"],
+         ['read_state', table_bytes(after, 'read_state'),
+          f"{after_ms:.3f}"]])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Searching messages with the full-text index versus scanning them with
+# LIKE.
+#
+#   python benchmarks/bench_search.py --messages 100000
+
+import sqlalchemy
+
+from rsbbs.models import Message
+from rsbbs.pagination import SUMMARY_COLUMNS
+from rsbbs.search import select_matches
+
+import common
+
+
+def select_like(word: str, callsign: str, limit: int) -> sqlalchemy.Select:
+    pattern = f"%{word}%"
+    return sqlalchemy.select(*SUMMARY_COLUMNS).where(
+        sqlalchemy.or_(Message.subject.like(pattern),
+                       Message.message.like(pattern)),
+        sqlalchemy.or_(Message.is_private.is_(False),
+                       Message.recipient == callsign)).order_by(
+        Message.id.desc()).limit(limit)
+
+
+def main():
+    args = common.parse_args(__doc__)
+    engine = common.temporary_engine()
+    common.populate(engine, args.messages, args.callsigns)
+    # One message in a thousand mentions a rarer word
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "UPDATE message SET message = message || ' Sporadic E tonight.' "
+            "WHERE id % 1000 = 0")
+
+    caller = common.callsign(7)
+    rows = []
+    with engine.connect() as connection:
+        def timed(statement):
+            return common.timed(lambda: connection.execute(statement).all(),
+                                args.repeat)
+        for word in ('sporadic', 'fox'):
+            matches = connection.exec_driver_sql(
+                "SELECT COUNT(*) FROM message_fts WHERE message_fts MATCH ?",
+                (word,)).scalar()
+            like_ms = timed(select_like(word, caller, 20))
+            fts_ms = timed(select_matches([word], caller, 20))
+            rows.append([word, matches, f"{like_ms:.2f}", f"{fts_ms:.2f}"])
+
+    common.report(
+        f"Search, {args.messages} messages, 20 matches (FTS5 ranked, "
+        "LIKE newest first)",
+        ['word', 'matches', 'LIKE (ms)', 'FTS5 (ms)'],
+        rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Exporting and importing a whole database, versus importing the same
+# messages one ORM insert and commit at a time, as the send command does.
+#
+#   python benchmarks/bench_transfer.py --messages 1000000
+
+import json
+import os
+import time
+import tracemalloc
+
+from sqlalchemy.orm import Session
+
+from rsbbs import transfer
+from rsbbs.models import Message
+
+import common
+
+
+def seconds(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def peak_mb(function) -> float:
+    """Peak traced megabytes of one call to function(). Tracing slows it
+    down, so this is a separate run from the timed one.
+    """
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return peak
+
+
+def import_one_at_a_time(engine, path: str, limit: int) -> None:
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            if record['type'] != 'message':
+                continue
+            if limit == 0:
+                return
+            limit -= 1
+            record.pop('type')
+            record.pop('id')
+            record['datetime'] = transfer._parse_time(record['datetime'])
+            with Session(engine) as session:
+                session.add(Message(**record))
+                session.commit()
+
+
+def main():
+    args = common.parse_args(__doc__)
+    source = common.temporary_engine()
+    common.populate(source, args.messages, args.callsigns)
+    path = os.path.join(os.path.dirname(source.url.database), 'bbs.jsonl')
+    rows = []
+
+    def row(operation, messages, function, memory=True):
+        elapsed = seconds(function)
+        rows.append([operation, messages, f"{elapsed:.2f}",
+                     f"{messages / elapsed:,.0f}",
+                     f"{peak_mb(function):.1f}" if memory else '-'])
+
+    row('export', args.messages,
+        lambda: transfer.export_file(source, path))
+    row('import (batched)', args.messages,
+        lambda: transfer.import_file(common.temporary_engine(), path))
+    # Row at a time is too slow to run in full; time a sample of it
+    sample = min(args.messages, 2000)
+    row('import (one at a time)', sample,
+        lambda: import_one_at_a_time(common.temporary_engine(), path,
+                                     sample),
+        memory=False)
+
+    common.report(
+        f"Transfer, {args.messages} messages, {args.callsigns} users, "
+        f"{os.path.getsize(path) / 2**20:.0f} MB file",
+        ['operation', 'messages', 'seconds', 'messages/s', 'peak MB'],
+        rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Shared helpers for the benchmarks in this directory. They build a
+# synthetic messages.db and time the statements the plugins run.
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from datetime import datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
+
+import sqlalchemy
+
+from rsbbs.migrations import migrate
+from rsbbs.readstate import ReadSet
+
+
+def parse_args(description: str, **defaults) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--messages', type=int,
+                        default=defaults.get('messages', 100_000),
+                        help="Number of messages in the synthetic database")
+    parser.add_argument('--callsigns', type=int,
+                        default=defaults.get('callsigns', 500),
+                        help="Number of distinct callsigns")
+    parser.add_argument('--repeat', type=int,
+                        default=defaults.get('repeat', 20),
+                        help="Timed runs per measurement")
+    return parser.parse_args()
+
+
+def callsign(n: int) -> str:
+    return f"K{n:04d}"
+
+
+def temporary_engine(schema_version: int = None) -> sqlalchemy.Engine:
+    """Create an empty database migrated to schema_version (default: the
+    latest) in a temporary directory that lasts as long as the process.
+    """
+    tmpdir = tempfile.mkdtemp(prefix='rsbbs-bench-')
+    db_path = os.path.join(tmpdir, 'messages.db')
+    engine = sqlalchemy.create_engine('sqlite:///' + db_path)
+    migrate(engine, schema_version)
+    return engine
+
+
+def populate(engine: sqlalchemy.Engine, messages: int, callsigns: int,
+             private_ratio: float = 0.2, read_ratio: float = 0.5,
+             body_size: int = 400, seed: int = 73) -> None:
+    """Fill a database with messages between users, some private, with
+    each user having read about read_ratio of the messages addressed to them.
+
+    Works with any schema version, so that benchmarks can compare them.
+    """
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1)
+    body = ("The quick brown fox jumps over the lazy dog. " * 100)[:body_size]
+    db_path = engine.url.database
+    with sqlite3.connect(db_path) as connection:
+        connection.executemany(
+            "INSERT INTO user (id, callsign, login_count, login_last) "
+            "VALUES (?, ?, 1, ?)",
+            ((n + 1, callsign(n), str(start)) for n in range(callsigns)))
+        rows = []
+        reads = []
+        for id_ in range(1, messages + 1):
+            recipient = rng.randrange(callsigns)
+            rows.append((
+                id_,
+                callsign(rng.randrange(callsigns)),
+                callsign(recipient),
+                f"Subject {id_}",
+                body,
+                str(start + timedelta(minutes=id_)),
+                rng.random() < private_ratio))
+            if rng.random() < read_ratio:
+                reads.append((recipient + 1, id_))
+        connection.executemany(
+            "INSERT INTO message (id, sender, recipient, subject, message, "
+            "datetime, is_private) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        tables = {name for name, in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if 'user_message' in tables:
+            connection.executemany(
+                "INSERT INTO user_message (user_id, message_id) "
+                "VALUES (?, ?)", reads)
+        else:
+            reads.sort()
+            for user_id, rows in groupby(reads, key=itemgetter(0)):
+                connection.execute(
+                    "INSERT INTO read_state (user_id, bitmap) VALUES (?, ?)",
+                    (user_id, ReadSet(m for _, m in rows).to_bytes()))
+        if 'unread_message' in tables:
+            connection.executemany(
+                "DELETE FROM unread_message "
+                "WHERE callsign = ? AND message_id = ?",
+                ((callsign(user_id - 1), message_id)
+                 for user_id, message_id in reads))
+    engine.dispose()
+
+
+def timed(function, repeat: int) -> float:
+    """Median wall time of function() in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def report(title: str, columns: list, rows: list) -> None:
+    print(title)
+    widths = [max(len(str(c)) for c in column)
+              for column in zip(columns, *rows)]
+    for row in [columns] + rows:
+        print("  ".join(f"{str(c):>{w}}" for c, w in zip(row, widths)))
+    print()
@@ -16,7 +16,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-__all__ = ['config', 'console', 'controller',
+__all__ = ['client', 'config', 'console', 'controller', 'daemon',
            'logger', 'models', 'parser', 'pluginloader']
 
 __version__ = "0.4.0"
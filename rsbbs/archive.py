@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The archive: old messages moved out of messages.db into archive.db.
+#
+# Keeping old messages out of the message table keeps it, its indexes and
+# the unread and full-text indexes small, so the everyday commands stay
+# fast however much history the BBS keeps. The archive is a SQLite file
+# with a message table just like the one in messages.db. It is ATTACHed as
+# the 'archive' schema only for the commands that ask for it, so nothing
+# else ever opens it.
+#
+# Archived messages keep their IDs, and messages.db never hands them out
+# again. Any statement over the message table runs against the archive with
+# the SCHEMA execution options, which point the message table at
+# archive.message.
+
+import logging
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Iterator
+
+import sqlalchemy
+
+from sqlalchemy import Connection, Engine
+
+from rsbbs.migrations import reserve_message_ids
+from rsbbs.models import Message
+
+
+SCHEMA = 'archive'
+
+# Execution options that run a statement against the archive instead
+EXECUTION_OPTIONS = {'schema_translate_map': {None: SCHEMA}}
+
+_archived_message = sqlalchemy.table(
+    'message', *(sqlalchemy.column(c.name) for c in Message.__table__.c),
+    schema=SCHEMA)
+
+
+def _create_schema(connection: Connection) -> None:
+    # The message table as in messages.db, less the triggers that keep the
+    # unread and full-text indexes, and with just the mailbox index
+    connection.exec_driver_sql(f"""
+        CREATE TABLE IF NOT EXISTS {SCHEMA}.message (
+            id INTEGER NOT NULL,
+            sender VARCHAR NOT NULL,
+            recipient VARCHAR NOT NULL,
+            subject VARCHAR NOT NULL,
+            message VARCHAR NOT NULL,
+            datetime DATETIME NOT NULL,
+            is_private BOOLEAN NOT NULL,
+            PRIMARY KEY (id)
+        )""")
+    connection.exec_driver_sql(f"""
+        CREATE INDEX IF NOT EXISTS {SCHEMA}.ix_message_recipient
+        ON message (recipient)""")
+
+
+def _reserve_ids(connection: Connection) -> None:
+    # A database that reused IDs before it was migrated may have a sequence
+    # below the archive's highest ID, so move it past that
+    reserve_message_ids(connection, connection.exec_driver_sql(
+        f"SELECT MAX(id) FROM {SCHEMA}.message").scalar())
+
+
+@contextmanager
+def attached(connection: Connection, path: str,
+             create: bool = False) -> Iterator:
+    """Attach the archive to a connection for the length of a with block.
+
+    :param connection: a connection that is not in a transaction
+    :param path: the archive database file
+    :param create: whether to create the archive if need be; otherwise it
+        must already exist
+
+    """
+    connection.exec_driver_sql(f"ATTACH DATABASE ? AS {SCHEMA}", (path,))
+    try:
+        if create:
+            _create_schema(connection)
+            connection.commit()
+        yield connection
+    finally:
+        # An attached database can't be detached mid-transaction
+        connection.rollback()
+        connection.exec_driver_sql(f"DETACH DATABASE {SCHEMA}")
+        connection.commit()
+
+
+class Archive():
+    """Moves messages older than the configured age into the archive.
+
+    :param engine: the messages database
+    :param path: the archive database file
+    :param after_days: archive messages older than this many days
+    :param batch_size: messages moved per transaction
+
+    """
+
+    def __init__(self, engine: Engine, path: str, after_days: int,
+                 batch_size: int = 500) -> None:
+        self.engine = engine
+        self.path = path
+        self.after_days = after_days
+        self.batch_size = batch_size or 500
+
+    def run(self, now: datetime = None) -> int:
+        """Archive a batch at a time until no old messages are left.
+
+        Each batch is copied into the archive before it is deleted, so a
+        batch cut short is copied again on the next run, never lost. IDs
+        are never reused, so copying a message whose ID the archive already
+        has is an error rather than a reason to replace it.
+
+        :param now: the time to measure ages from, if not the current time
+        :returns: how many messages were archived
+
+        """
+        if self.after_days is None:
+            return 0
+        # Times are stored in UTC without a zone
+        now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+        cutoff = now - timedelta(days=self.after_days)
+        total = 0
+        with self.engine.connect() as connection, \
+                attached(connection, self.path, create=True):
+            with connection.begin():
+                _reserve_ids(connection)
+            old = sqlalchemy.select(Message.id).where(
+                Message.datetime < cutoff).order_by(Message.id).limit(
+                self.batch_size)
+            while True:
+                with connection.begin():
+                    ids = connection.execute(old).scalars().all()
+                    if not ids:
+                        break
+                    columns = list(Message.__table__.c)
+                    connection.execute(
+                        sqlalchemy.insert(_archived_message)
+                        .from_select(
+                            [c.name for c in columns],
+                            sqlalchemy.select(*columns).where(
+                                Message.id.in_(ids))))
+                    connection.execute(sqlalchemy.delete(Message).where(
+                        Message.id.in_(ids)))
+                total += len(ids)
+                if len(ids) < self.batch_size:
+                    break
+        logging.info(f"archived {total} messages older than {cutoff}")
+        return total
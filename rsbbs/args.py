@@ -61,6 +61,81 @@ def parse_args():
         dest='show_config',
         help="Show the configuration and exit")
 
+    # Migrate option:
+    group.add_argument(
+        '--migrate',
+        action='store_true',
+        default=None,
+        dest='migrate',
+        help="Upgrade the database schema and exit")
+
+    # Purge option:
+    group.add_argument(
+        '--purge',
+        action='store_true',
+        default=None,
+        dest='purge',
+        help="Purge messages past their retention and exit")
+
+    # Archive option:
+    group.add_argument(
+        '--archive',
+        action='store_true',
+        default=None,
+        dest='archive',
+        help="Move old messages into the archive and exit")
+
+    # Command stats option:
+    group.add_argument(
+        '--command-stats',
+        action='store_true',
+        default=None,
+        dest='command_stats',
+        help="Show how long each command has been taking and exit")
+
+    # Export option:
+    group.add_argument(
+        '--export',
+        action='store',
+        default=None,
+        dest='export_file',
+        metavar='FILE',
+        help="Export messages, users and read state to FILE (.jsonl, or "
+             ".mbox for just the messages; - for stdout) and exit")
+
+    # Import option:
+    group.add_argument(
+        '--import',
+        action='store',
+        default=None,
+        dest='import_file',
+        metavar='FILE',
+        help="Import a file written by --export and exit")
+
+    # Daemon mode:
+    group.add_argument(
+        '--daemon',
+        action='store_true',
+        default=None,
+        dest='daemon',
+        help="Run as a resident daemon serving rsbbs-client connections")
+
+    # Server mode:
+    group.add_argument(
+        '--serve',
+        action='store_true',
+        default=None,
+        dest='serve',
+        help="Serve callers over TCP and a Unix socket, as configured")
+
+    # Daemon socket:
+    argv_parser.add_argument(
+        '--socket',
+        action='store',
+        default=None,
+        dest='socket',
+        help="Path to the daemon socket")
+
     # Calling station:
     group.add_argument(
         '-s',
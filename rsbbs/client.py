@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This module is what ax25d runs for every call when a daemon is running, so
+# keep its imports to the standard library and platformdirs.
+
+import argparse
+import array
+import os
+import socket
+import sys
+
+import platformdirs
+
+from rsbbs import __version__
+
+
+def default_socket_path(app_name: str) -> str:
+    """The daemon socket lives next to messages.db unless configured."""
+    return os.path.join(
+        platformdirs.user_data_dir(appname=app_name),
+        'rsbbs.sock')
+
+
+def send_fds(sock: socket.socket, payload: bytes, fds: list) -> None:
+    """Send a payload along with open file descriptors."""
+    sock.sendmsg(
+        [payload],
+        [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array('i', fds))])
+
+
+def recv_fds(sock: socket.socket, bufsize: int, maxfds: int) -> tuple:
+    """Receive a payload along with up to maxfds file descriptors."""
+    fds = array.array('i')
+    payload, ancdata, flags, addr = sock.recvmsg(
+        bufsize, socket.CMSG_LEN(maxfds * fds.itemsize))
+    for level, type_, data in ancdata:
+        if level == socket.SOL_SOCKET and type_ == socket.SCM_RIGHTS:
+            fds.frombytes(data[:len(data) - (len(data) % fds.itemsize)])
+    return payload, list(fds)
+
+
+def connect(socket_path: str, calling_station: str,
+            stdin: int = 0, stdout: int = 1) -> None:
+    """Hand the caller's stdin and stdout to the daemon.
+
+    Blocks until the daemon is done with the caller, so ax25d keeps the
+    connection up for exactly as long as the session lasts.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        send_fds(sock, calling_station.encode() + b'\n', [stdin, stdout])
+        # The daemon holds its end open until the caller signs off
+        while sock.recv(64):
+            pass
+
+
+def parse_args():
+    argv_parser = argparse.ArgumentParser(
+        prog='rsbbs-client',
+        description=("Connect a caller to a running rsbbs daemon."))
+
+    argv_parser.add_argument(
+        '-s', '--calling-station',
+        action='store',
+        required=True,
+        dest='calling_station',
+        help="Callsign of the calling station")
+
+    argv_parser.add_argument(
+        '-f', '--config-file',
+        action='store',
+        default=None,
+        dest='config_file',
+        help="Path to config.yaml file, if no daemon is running")
+
+    argv_parser.add_argument(
+        '--socket',
+        action='store',
+        default=None,
+        dest='socket',
+        help="Path to the daemon socket")
+
+    argv_parser.add_argument(
+        '-v', '--version',
+        action='version',
+        version=f"{argv_parser.prog} version {__version__}")
+
+    return argv_parser.parse_args(sys.argv[1:])
+
+
+def main():
+    """Pass the caller to the daemon, or serve them directly if none is
+    listening.
+    """
+    args = parse_args()
+    socket_path = args.socket or default_socket_path('rsbbs')
+    try:
+        connect(socket_path, args.calling_station)
+    except (FileNotFoundError, ConnectionRefusedError):
+        # No daemon; fall back to starting up the slow way
+        from rsbbs import rsbbs
+        sys.argv = [sys.argv[0], '-s', args.calling_station]
+        if args.config_file:
+            sys.argv += ['-f', args.config_file]
+        rsbbs.main()
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import argparse
 import os
 import pkg_resources
 import platformdirs
@@ -24,26 +25,53 @@ import yaml
 
 class Config():
 
-    def __init__(self, app_name, args):
+    def __init__(self, app_name, args, values: dict = None):
         self.app_name = app_name
         self._argv_config_file = args.config_file
 
-        self._init_config_file()
-        self._load_config()
+        if values is not None:
+            # Values another Config has loaded (see for_caller)
+            self._config = dict(values)
+        else:
+            self._init_config_file()
+            self._load_config()
 
-        # Put the messages db file in the system's user data directory
-        db_dir = platformdirs.user_data_dir(appname=self.app_name)
-        if not os.path.exists(db_dir):
-            os.makedirs(db_dir)
-        self._config['db_path'] = os.path.join(
-            db_dir,
-            'messages.db')
+            # Put the messages db file in the system's user data directory
+            db_dir = platformdirs.user_data_dir(appname=self.app_name)
+            if not os.path.exists(db_dir):
+                os.makedirs(db_dir)
+            self._config['db_path'] = os.path.join(
+                db_dir,
+                'messages.db')
+            # and archived messages next to it
+            self._config['archive_path'] = os.path.join(
+                db_dir,
+                'archive.db')
 
         # Grab some config from the command line for convenience
         self._config['args'] = args
         self._config['calling_station'] = args.calling_station.upper() or None
         self._config['debug'] = args.debug
 
+    def set_calling_station(self, calling_station: str) -> None:
+        """Point the configuration at a new caller.
+
+        A resident process (see rsbbs.daemon) loads the configuration once and
+        then serves many callers, so the caller is updated per connection.
+        """
+        self._config['args'].calling_station = calling_station
+        self._config['calling_station'] = calling_station.upper() or None
+
+    def for_caller(self, calling_station: str) -> 'Config':
+        """A copy of the configuration for one caller.
+
+        A server (see rsbbs.server) serves many callers at once, so each
+        gets a copy of its own to point at them.
+        """
+        args = argparse.Namespace(**vars(self.args))
+        args.calling_station = calling_station
+        return Config(self.app_name, args, values=self._config)
+
     # The main thing people want from Config is config values, so let's pretend
     # everything anyone asks of Config that isn't otherwise defined is probably
     # a config value they want
@@ -74,16 +102,21 @@ class Config():
         )
         return config_file
 
+    @property
+    def config_default(self) -> dict:
+        # The default config file included in the package
+        config_default_file = pkg_resources.resource_filename(
+            __name__,
+            'config_default.yaml')
+        with open(config_default_file, 'r') as f:
+            return yaml.load(f, Loader=yaml.FullLoader)
+
     def _init_config_file(self):
         # If the file doesn't exist there, create it from the default file
         # included in the package
         if not os.path.exists(self.config_file):
-            config_default_file = pkg_resources.resource_filename(
-                __name__,
-                'config_default.yaml')
             try:
-                with open(config_default_file, 'r') as f:
-                    config_default = yaml.load(f, Loader=yaml.FullLoader)
+                config_default = self.config_default
                 with open(self.config_file, 'w') as f:
                     yaml.dump(config_default, f)
             except Exception as e:
@@ -96,11 +129,25 @@ class Config():
         If a config file is specified, attempt to use that. Otherwise, use a
         file in the location appropriate to the host system. Create the file
         if it does not exist, using the config_default.yaml as a default.
+
+        Options missing from an older config file fall back to the values in
+        config_default.yaml, so new options work without editing the file.
         """
         # Load it
         try:
             with open(self.config_file, 'r') as f:
-                self._config = yaml.load(f, Loader=yaml.FullLoader)
+                config = yaml.load(f, Loader=yaml.FullLoader) or {}
+            self._config = _merge(self.config_default, config)
         except Exception as e:
             print(f"Error loading configuration file: {e}")
             exit(1)
+
+
+def _merge(defaults: dict, overrides: dict) -> dict:
+    """Recursively overlay one config dict onto another."""
+    merged = dict(defaults)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            value = _merge(merged[key], value)
+        merged[key] = value
+    return merged
@@ -19,14 +19,30 @@
 import logging
 import sys
 
+from contextlib import contextmanager
+
 import rsbbs
+from rsbbs import metrics
 from rsbbs.config import Config
 from rsbbs.controller import Controller
+from rsbbs.dispatch import UsageError
+from rsbbs.mailbox import unread_count
+from rsbbs.metrics import CommandMetrics
+from rsbbs.output import PacketWriter
+from rsbbs.pagination import Page
 from rsbbs.parser import Parser
 from rsbbs.pluginloader import PluginLoader
 from rsbbs.models import User
 
 
+class OutputSkipped(Exception):
+    """The caller chose to skip the rest of what was being shown."""
+
+
+class OutputAborted(Exception):
+    """The caller chose to stop the command at a more prompt."""
+
+
 # Main UI console class
 
 class Console():
@@ -37,8 +53,21 @@ class Console():
         self.controller = controller
         self.user = user
 
+        # The caller's input and output: stdin and stdout unless a session
+        # (see rsbbs.session) gives the console streams of its own
+        self.stdin = None
+        self.output = PacketWriter(config.paclen, config.output_delay)
+        # Lines written since the caller last had a chance to answer
+        self.lines_shown = 0
+
         self.parser = Parser()
 
+        # How long each command takes, if measuring (see rsbbs.metrics)
+        self.metrics = None
+        if config.metrics['enabled']:
+            self.metrics = CommandMetrics(controller.engine,
+                                          config.metrics['keep_days'])
+
         self.pluginloader = PluginLoader(self)
         self.pluginloader.load_plugins()
 
@@ -50,8 +79,14 @@ class Console():
         """End the program, disconnecting the user
         """
         logging.info("caller disconnected")
+        self.output.flush()
         sys.exit(0)
 
+    def readline(self) -> str:
+        """Read a line from the caller, or '' if they have gone."""
+        with metrics.waiting():
+            return (self.stdin or sys.stdin).readline()
+
     def read_enter(self, prompt: str) -> None:
         """Wait for the user to press enter.
 
@@ -60,7 +95,11 @@ class Console():
         """
         if prompt:
             self.write_output(prompt)
-        sys.stdin.readline().strip()
+        self.output.flush()
+        self.lines_shown = 0
+        if not self.readline():
+            # End of input: the caller has gone
+            self.disconnect()
 
     def read_line(self, prompt: str) -> str:
         """Read a single line of input, with an optional prompt,
@@ -73,7 +112,13 @@ class Console():
         while not valid_input:
             if prompt:
                 self.write_output(prompt)
-            input_line = sys.stdin.readline().strip()
+            self.output.flush()
+            self.lines_shown = 0
+            input_line = self.readline()
+            if not input_line:
+                # End of input: the caller has gone
+                self.disconnect()
+            input_line = input_line.strip()
             if input_line != "":
                 valid_input = input_line
         return valid_input
@@ -88,8 +133,13 @@ class Console():
         input_lines = []
         if prompt:
             self.write_output(prompt)
+        self.output.flush()
+        self.lines_shown = 0
         while True:
-            input_line = sys.stdin.readline()
+            input_line = self.readline()
+            if not input_line:
+                # End of input: the caller has gone
+                self.disconnect()
             if input_line.lower().strip() == "/ex":
                 break
             input_lines.append(input_line)
@@ -98,10 +148,57 @@ class Console():
     def write_output(self, output: str) -> None:
         """Write something to stdout.
 
+        Output is held until there is a packet's worth, the BBS waits for
+        input, or config.output_delay passes (see rsbbs.output).
+
+        After every config.screen_lines lines, the caller is asked whether
+        to go on (see more()).
+
         :param output: the string to write to stdout
 
         """
-        sys.stdout.write(output + '\r\n')
+        if not self.config.screen_lines:
+            self.output.write(output + '\r\n')
+            return
+        for line in output.splitlines() or ['']:
+            if self.lines_shown >= self.config.screen_lines:
+                self.more()
+            self.output.write(line + '\r\n')
+            self.lines_shown += 1
+
+    def more(self) -> None:
+        """Ask the caller whether to see another screenful.
+
+        :raises OutputSkipped: if the caller skips the rest of this message
+            or list
+        :raises OutputAborted: if the caller stops the command
+
+        """
+        self.output.write("-- More: Enter to continue, S to skip, "
+                          "Q to quit --\r\n")
+        self.output.flush()
+        answer = self.readline()
+        if not answer:
+            # End of input: the caller has gone
+            self.disconnect()
+        self.lines_shown = 0
+        answer = answer.strip().lower()
+        if answer.startswith('q'):
+            logging.info("caller stopped the command")
+            raise OutputAborted()
+        if answer.startswith('s'):
+            raise OutputSkipped()
+
+    @contextmanager
+    def skippable(self):
+        """Output in this with block is what the caller skips by answering
+        S at a more prompt.
+
+        """
+        try:
+            yield
+        except OutputSkipped:
+            pass
 
     def print_configuration(self) -> None:
         """Print the current running configuration.
@@ -123,6 +220,15 @@ class Console():
 
         greeting.append(f"Last login: {self.user.login_last}")
 
+        # Logging in counts the unread messages
+        unread = self.user.unread_count
+        if unread is None:
+            with self.controller.session() as session:
+                unread = unread_count(session, self.user.callsign)
+        if unread:
+            greeting.append(f"You have {unread} new message(s). "
+                            "To read them, enter 'ru'")
+
         greeting.append(self.config.banner_message)
 
         greeting.append("For help, enter 'h'")
@@ -139,35 +245,50 @@ class Console():
         datetime = message.Message.datetime.strftime(
             '%A, %B %-d, %Y at %-H:%M %p UTC')
         # Print the message
-        self.write_output("")
-        self.write_output(f"Message: {message.Message.id}")
-        self.write_output(f"Date:    {datetime}")
-        self.write_output(f"From:    {message.Message.sender}")
-        self.write_output(f"To:      {message.Message.recipient}")
-        self.write_output(f"Subject: {message.Message.subject}")
-        self.write_output("")
-        self.write_output(f"{message.Message.message}")
-
-    def print_message_list(self, messages: list) -> None:
+        with self.skippable():
+            self.write_output("")
+            self.write_output(f"Message: {message.Message.id}")
+            self.write_output(f"Date:    {datetime}")
+            self.write_output(f"From:    {message.Message.sender}")
+            self.write_output(f"To:      {message.Message.recipient}")
+            self.write_output(f"Subject: {message.Message.subject}")
+            self.write_output("")
+            self.write_output(f"{message.Message.message}")
+
+    def print_message_list(self, messages: list, page: Page = None) -> None:
         """Print a list of messages.
 
-        :param messages: a list of Message objects to print
+        :param messages: rows of message summaries (see
+            rsbbs.pagination.SUMMARY_COLUMNS) to print
+        :param page: the page the messages were selected for, if paged
+
+        A caller who stops at a more prompt stops the rows being fetched,
+        too, as long as messages is a result still being iterated.
 
         """
-        # Print the column headers
-        self.write_output(f"{'MSG#': <{5}} "
-                          f"{'TO': <{9}} "
-                          f"{'FROM': <{9}} "
-                          f"{'DATE': <{11}} "
-                          f"SUBJECT")
-        # Print the messages
-        for message in messages:
-            datetime_ = message.Message.datetime.strftime('%Y-%m-%d')
-            self.write_output(f"{message.Message.id: <{5}} "
-                              f"{message.Message.recipient: <{9}} "
-                              f"{message.Message.sender: <{9}} "
-                              f"{datetime_: <{11}} "
-                              f"{message.Message.subject}")
+        with self.skippable():
+            # Print the column headers
+            self.write_output(f"{'MSG#': <{5}} "
+                              f"{'TO': <{9}} "
+                              f"{'FROM': <{9}} "
+                              f"{'DATE': <{11}} "
+                              f"SUBJECT")
+            # Print the messages
+            count = 0
+            last_id = None
+            for message in messages:
+                if page and page.limit and count == page.limit:
+                    # The query fetched one past the page, so there are more
+                    self.write_output(f"More: {page.next(last_id)}")
+                    break
+                count += 1
+                last_id = message.id
+                datetime_ = message.datetime.strftime('%Y-%m-%d')
+                self.write_output(f"{message.id: <{5}} "
+                                  f"{message.recipient: <{9}} "
+                                  f"{message.sender: <{9}} "
+                                  f"{datetime_: <{11}} "
+                                  f"{message.subject}")
 
     #
     # Main input loop
@@ -177,6 +298,31 @@ class Console():
         """Main UI loop.
 
         """
+        try:
+            self._run()
+        finally:
+            self.output.flush()
+            self.flush_metrics()
+
+    def run_command(self, args) -> None:
+        """Run a parsed command, measuring it if metrics are on."""
+        if self.metrics is None:
+            args.func(args)
+            return
+        name = self.parser.dispatcher.lookup(args.command).spec['name']
+        with self.metrics.measure(name, self.output):
+            args.func(args)
+
+    def flush_metrics(self) -> None:
+        """Log and store the caller's command metrics."""
+        if self.metrics is None:
+            return
+        try:
+            self.metrics.flush()
+        except Exception as e:
+            logging.error(f"could not store command metrics: {e}")
+
+    def _run(self):
         # If asked to show the config, show the config;
         if self.config.args.show_config:
             self.print_configuration()
@@ -187,12 +333,19 @@ class Console():
 
         # Show initial prompt to the calling user
         self.write_output(self.config.command_prompt)
+        self.output.flush()
+        self.lines_shown = 0
 
         # Parse the BBS interactive commands for the rest of time
-        for input_line in sys.stdin:
+        for input_line in iter(self.readline, ''):
             try:
                 args = self.parser.parse_args(input_line.split())
-                args.func(args)
+                if args is not None:
+                    self.run_command(args)
+            except UsageError as e:
+                self.write_output(str(e))
+            except OutputAborted:
+                pass
             except Exception:
                 if self.config.debug:
                     raise
@@ -200,3 +353,5 @@ class Console():
 
             # Show our prompt to the calling user again
             self.write_output(self.config.command_prompt)
+            self.output.flush()
+            self.lines_shown = 0
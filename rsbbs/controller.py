@@ -16,19 +16,31 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from sqlalchemy import create_engine
+import os
+
+from contextlib import contextmanager
+from typing import Iterator
+
+from sqlalchemy import Engine, Executable, create_engine, event
 from sqlalchemy.orm import Session
 
+from rsbbs import archive, metrics
 from rsbbs.config import Config
-from rsbbs.models import Base
+from rsbbs.migrations import migrate, schema_version
+from rsbbs.slowquery import SlowQueryLog, log_path
 
 
 class Controller():
 
-    def __init__(self, config: Config) -> None:
+    def __init__(self, config: Config, engine: Engine = None) -> None:
         self.config = config
-        self._init_datastore()
-        self._session
+        if engine is None:
+            self._init_datastore()
+        else:
+            # Another controller's engine, already migrated (see for_caller)
+            self.engine = engine
+            self.migrations_applied = []
+        self._session = Session(self.engine, autoflush=True)
 
     def _init_datastore(self) -> None:
         """Create a connection to the sqlite3 database.
@@ -36,14 +48,109 @@ class Controller():
         The default location is the system-specific user-level data directory.
         """
         db_path = self.config.db_path
+        # When measuring, connections count the statements and rows of each
+        # command (see rsbbs.metrics); the counting cursor costs time on
+        # every fetch, so it is only used then
+        measuring = self.config.metrics['enabled']
+        connect_args = {'factory': metrics.Connection} if measuring else {}
         self.engine = create_engine(
             'sqlite:///' + db_path,
-            echo=self.config.debug)
+            echo=self.config.debug,
+            connect_args=connect_args)
+        event.listen(self.engine, 'connect', self._configure_connection)
+        if measuring:
+            event.listen(self.engine, 'before_cursor_execute',
+                         metrics.count_statement)
+
+        # Log slow statements, if asked to, to a file of their own
+        slow_query_log = self.config.slow_query_log
+        if slow_query_log['enabled']:
+            SlowQueryLog(self.engine, slow_query_log['threshold_ms'],
+                         log_path(self.config.app_name))
+
+        # Create or upgrade the database schema. When it is already current,
+        # this only reads the schema version.
+        self.migrations_applied = migrate(self.engine)
 
-        # Create the database schema if none exists
-        Base.metadata.create_all(self.engine)
+    def _configure_connection(self, dbapi_connection, record) -> None:
+        """Apply the configured SQLite settings to a new connection."""
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, value in (self.config.sqlite or {}).items():
+                # PRAGMA takes no bound parameters, so only accept plain
+                # names and values
+                if not (pragma.isidentifier()
+                        and (isinstance(value, int)
+                             or str(value).isidentifier())):
+                    raise ValueError(
+                        f"invalid sqlite setting {pragma}: {value}")
+                cursor.execute(f"PRAGMA {pragma} = {value}")
+        finally:
+            cursor.close()
 
+    def after_fork(self) -> None:
+        """Drop database connections inherited from a parent process.
+
+        Connections must not be shared across a fork, so a forked child
+        starts over with a fresh pool and session.
+        """
+        self.engine.dispose(close=False)
         self._session = Session(self.engine, autoflush=True)
 
+    def for_caller(self, config: Config) -> 'Controller':
+        """A controller for one of many callers served at once.
+
+        It shares this controller's engine, and so its connection pool and
+        compiled queries, but has a session of its own.
+        """
+        return Controller(config, engine=self.engine)
+
+    @property
+    def schema_version(self) -> int:
+        with self.engine.connect() as connection:
+            return schema_version(connection)
+
     def session(self) -> Session:
         return self._session
+
+    @property
+    def has_archive(self) -> bool:
+        """Whether archiving is on and there is an archive to look in."""
+        return (self.config.archive['after_days'] is not None
+                and os.path.exists(self.config.archive_path))
+
+    @contextmanager
+    def archive(self) -> Iterator:
+        """Open a session on the archive of old messages (see
+        rsbbs.archive), for the length of a with block.
+
+        Statements over the message table run against the archive's
+        message table instead. The archive must exist (see has_archive).
+        """
+        with self.engine.connect() as connection, \
+                archive.attached(connection, self.config.archive_path):
+            connection.execution_options(**archive.EXECUTION_OPTIONS)
+            with Session(connection) as session:
+                yield session
+
+    @contextmanager
+    def stream(self, statement: Executable, params: dict = None,
+               batch_size: int = 100, archived: bool = False) -> Iterator:
+        """Run a query and stream its rows.
+
+        Rows are fetched in batches as they are iterated, so a large result
+        never has to fit in memory. The query gets a session of its own that
+        is open only inside the with block.
+
+        :param statement: the query to run
+        :param params: values for its bound parameters
+        :param batch_size: how many rows to fetch at a time
+        :param archived: whether to query the archive instead
+
+        """
+        with (self.archive() if archived
+              else Session(self.engine)) as session:
+            with session.execute(
+                    statement, params,
+                    execution_options={'yield_per': batch_size}) as result:
+                yield result
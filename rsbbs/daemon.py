@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+import os
+import signal
+import socket
+import sys
+
+from rsbbs import queries
+from rsbbs.client import default_socket_path, recv_fds
+from rsbbs.config import Config
+from rsbbs.console import Console
+from rsbbs.controller import Controller
+from rsbbs.logger import Logger
+from rsbbs.session import run_stdio
+from rsbbs.user import User
+
+
+class Daemon():
+    """Resident process that serves callers handed over by rsbbs-client.
+
+    The configuration, database engine, parser and plugins are set up once,
+    and the queries compiled. Each caller then gets a forked copy of this
+    warm process, attached to the stdin and stdout that ax25d gave the
+    client.
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.config = config
+        self.controller = Controller(config)
+        queries.warm(self.controller.engine)
+        self.console = Console(config, self.controller, None)
+        self.console.pluginloader.preload_plugins()
+
+    @property
+    def socket_path(self) -> str:
+        return (self.config.args.socket
+                or self.config.daemon_socket
+                or default_socket_path(self.config.app_name))
+
+    def _listen(self) -> socket.socket:
+        # Clear out a socket left behind by a previous daemon
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        sock.listen()
+        return sock
+
+    def serve_forever(self) -> None:
+        """Accept callers until terminated."""
+        # Let the kernel reap finished sessions, and clean up on SIGTERM
+        signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+        sock = self._listen()
+        logging.info(f"daemon listening on {self.socket_path}")
+        try:
+            while True:
+                conn, _ = sock.accept()
+                try:
+                    self._handle(sock, conn)
+                except Exception as e:
+                    logging.error(f"daemon failed to start session: {e}")
+                finally:
+                    conn.close()
+        finally:
+            sock.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def _handle(self, sock: socket.socket, conn: socket.socket) -> None:
+        payload, fds = recv_fds(conn, 256, 2)
+        try:
+            calling_station = payload.decode().strip()
+            if len(fds) != 2 or not calling_station:
+                raise ValueError("malformed client handoff")
+            if os.fork() == 0:
+                # The child keeps conn open until the session ends, which is
+                # how the client knows when to hang up
+                sock.close()
+                self._run_session(calling_station, *fds)
+        finally:
+            for fd in fds:
+                os.close(fd)
+
+    def _run_session(self, calling_station: str,
+                     stdin: int, stdout: int) -> None:
+        """Serve one caller. Runs in the forked child and never returns."""
+        status = 0
+        try:
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+            # Become an ordinary rsbbs process attached to the caller
+            os.dup2(stdin, 0)
+            os.dup2(stdout, 1)
+            for fd in {stdin, stdout} - {0, 1}:
+                os.close(fd)
+            sys.stdin = os.fdopen(0, 'r', closefd=False)
+            sys.stdout = os.fdopen(1, 'w', buffering=1, closefd=False)
+
+            self.config.set_calling_station(calling_station)
+            Logger(self.config)
+            logging.info("caller connected")
+
+            self.controller.after_fork()
+            user = User(self.config, self.controller)
+            user.record_login()
+
+            self.console.user = user
+            run_stdio(self.console)
+        except SystemExit as e:
+            status = e.code or 0
+        except Exception as e:
+            logging.error(f"session ended with error: {e}")
+            status = 1
+        finally:
+            try:
+                sys.stdout.flush()
+            finally:
+                os._exit(status)
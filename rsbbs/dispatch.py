@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Turning a caller's input line into a command and its arguments.
+#
+# Plugins describe their commands the way argparse subparsers do, and the
+# plugin manifest records them the same way. Running every line through an
+# argparse tree costs far more than the commands need: they are mostly a
+# letter or two and a number. The dispatcher keeps a table from each alias
+# to its command, and each command parses its own arguments with a small
+# grammar compiled from what the plugin registered: options that store a
+# value or a flag, and positionals taking one value, an optional one or a
+# list, each optionally converted with a type. argparse is still used to
+# render help.
+
+import re
+
+from argparse import Namespace
+
+
+# Tokens that are negative numbers rather than options
+_NUMBER = re.compile(r'^-\d+$')
+
+
+class UsageError(ValueError):
+    """A line that can't be run as entered. The message says why, for the
+    caller."""
+
+
+class Command():
+    """A command as a plugin registered it, and the function that runs it.
+
+    :param spec: the command as in the plugin manifest: name, aliases, help,
+        arguments and defaults
+    :param func: the function to run it with
+
+    """
+
+    def __init__(self, spec: dict, func=None) -> None:
+        self.spec = spec
+        self.func = func
+        self._grammar = None
+
+    # Registration, the way argparse subparsers take it
+
+    def add_argument(self, *args, **kwargs) -> None:
+        self.spec['arguments'].append({'args': list(args), 'kwargs': kwargs})
+        self._grammar = None
+
+    def set_defaults(self, func=None, **kwargs) -> None:
+        if func is not None:
+            self.func = func
+        self.spec['defaults'].update(kwargs)
+
+    # Parsing
+
+    @property
+    def grammar(self) -> tuple:
+        """The command's options by name, its positionals in order, and
+        the values of its arguments when none are given."""
+        if self._grammar is None:
+            self._grammar = self._compile()
+        return self._grammar
+
+    def _compile(self) -> tuple:
+        options = {}
+        positionals = []
+        defaults = {}
+        for argument in self.spec['arguments']:
+            names, kwargs = argument['args'], argument['kwargs']
+            if names[0].startswith('-'):
+                long_names = [name for name in names if name.startswith('--')]
+                dest = kwargs.get('dest') or (
+                    long_names or names)[0].lstrip('-').replace('-', '_')
+                action = kwargs.get('action', 'store')
+                if action not in ('store', 'store_true'):
+                    raise ValueError(f"{self.spec['name']}: unsupported "
+                                     f"action {action}")
+                flag = action == 'store_true'
+                defaults[dest] = kwargs.get('default', False if flag else None)
+                for name in names:
+                    options[name] = (dest, not flag, kwargs.get('type'))
+            else:
+                dest, nargs = names[0], kwargs.get('nargs')
+                if nargs not in (None, '?', '*', '+'):
+                    raise ValueError(f"{self.spec['name']}: unsupported "
+                                     f"nargs {nargs}")
+                defaults[dest] = kwargs.get(
+                    'default', [] if nargs == '*' else None)
+                positionals.append((dest, nargs, kwargs.get('type')))
+        defaults.update(self.spec['defaults'])
+        return options, positionals, defaults
+
+    def usage(self, alias: str) -> str:
+        """A one-line summary of how to enter the command."""
+        words = [alias]
+        for argument in self.spec['arguments']:
+            names = argument['args']
+            nargs = argument['kwargs'].get('nargs')
+            if names[0].startswith('-'):
+                dest, takes_value, _ = self.grammar[0][names[0]]
+                words.append(f"[{names[0]} {dest.upper()}]" if takes_value
+                             else f"[{names[0]}]")
+            elif nargs is None:
+                words.append(names[0])
+            elif nargs == '?':
+                words.append(f"[{names[0]}]")
+            elif nargs == '*':
+                words.append(f"[{names[0]} ...]")
+            else:
+                words.append(f"{names[0]} [{names[0]} ...]")
+        return ' '.join(words)
+
+    def _option(self, name: str, options: dict) -> tuple:
+        if name in options:
+            return options[name]
+        # Like argparse, take an unambiguous start of a long option
+        if name.startswith('--'):
+            matches = {options[option] for option in options
+                       if option.startswith(name)}
+            if len(matches) == 1:
+                return matches.pop()
+        return None
+
+    def parse(self, alias: str, words: list) -> Namespace:
+        """Parse the words after the command's alias.
+
+        :raises UsageError: if they don't fit the command
+
+        """
+        options, positionals, defaults = self.grammar
+        values = dict(defaults)
+        free = []
+        only_positionals = False
+        words = iter(words)
+        for word in words:
+            if (only_positionals or not word.startswith('-') or word == '-'
+                    or _NUMBER.match(word)):
+                free.append(word)
+                continue
+            if word == '--':
+                only_positionals = True
+                continue
+            name, equals, value = word.partition('=')
+            option = self._option(name, options)
+            if option is None:
+                raise self.error(alias, f"unknown option {name}")
+            dest, takes_value, convert = option
+            if not takes_value:
+                if equals:
+                    raise self.error(alias, f"{name} takes no value")
+                values[dest] = True
+                continue
+            if not equals:
+                value = next(words, None)
+                if value is None:
+                    raise self.error(alias, f"{name} needs a value")
+            values[dest] = self._convert(alias, dest, convert, value)
+
+        missing = []
+        for index, (dest, nargs, convert) in enumerate(positionals):
+            # Leave enough for the positionals after this one that need one
+            later = sum(1 for _, n, _ in positionals[index + 1:]
+                        if n in (None, '+'))
+            available = len(free) - later
+            if nargs is None or nargs == '?':
+                if available > 0:
+                    values[dest] = self._convert(alias, dest, convert,
+                                                 free.pop(0))
+                elif nargs is None:
+                    missing.append(dest)
+            else:
+                if nargs == '+' and available < 1:
+                    missing.append(dest)
+                    continue
+                taken = max(available, 0)
+                values[dest] = [self._convert(alias, dest, convert, word)
+                                for word in free[:taken]]
+                free = free[taken:]
+        if missing:
+            raise self.error(alias, f"missing {', '.join(missing)}")
+        if free:
+            raise self.error(alias, f"unexpected {' '.join(free)}")
+        return Namespace(command=alias, func=self.func, **values)
+
+    def _convert(self, alias: str, dest: str, convert, value: str):
+        if convert is None:
+            return value
+        try:
+            return convert(value)
+        except (TypeError, ValueError):
+            raise self.error(alias, f"bad {dest} {value}") from None
+
+    def error(self, alias: str, message: str) -> UsageError:
+        return UsageError(f"{alias}: {message}\r\n"
+                          f"Usage: {self.usage(alias)}")
+
+
+class Dispatcher():
+    """A table from every command alias to its command.
+
+    Plugins register with it through parser.subparsers.add_parser(), as
+    they would with argparse.
+    """
+
+    def __init__(self) -> None:
+        self.commands = []
+        self.table = {}
+
+    def add(self, spec: dict, func=None) -> Command:
+        """Add a command described by a plugin manifest entry."""
+        command = Command(spec, func)
+        self.commands.append(command)
+        for alias in [spec['name']] + list(spec['aliases']):
+            self.table[alias] = command
+        return command
+
+    def add_parser(self, name: str, aliases: list = [],
+                   help: str = None) -> Command:
+        return self.add({'name': name, 'aliases': list(aliases),
+                         'help': help, 'arguments': [], 'defaults': {}})
+
+    def lookup(self, alias: str) -> Command:
+        """:raises UsageError: if there is no such command"""
+        try:
+            return self.table[alias]
+        except KeyError:
+            raise UsageError(
+                f"Unknown command {alias}. For help, enter 'h'") from None
+
+    def parse(self, words: list) -> Namespace:
+        """Parse a line split into words.
+
+        :returns: the arguments, with func set to the command's function and
+            command to the alias entered, or None for an empty line
+        :raises UsageError: if the line can't be run
+
+        """
+        if not words:
+            return None
+        return self.lookup(words[0]).parse(words[0], words[1:])
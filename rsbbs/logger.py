@@ -16,6 +16,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import contextvars
 import datetime
 import logging
 import logging.handlers
@@ -62,6 +63,11 @@ class Logger(logging.Logger):
         # Add the handler!
         logger.addHandler(handler)
 
+
+# The caller being served, where one process serves many (see rsbbs.server)
+caller = contextvars.ContextVar('caller', default=None)
+
+
 class Formatter(logging.Formatter):
     def __init__(self, var):
         super().__init__()
@@ -69,5 +75,6 @@ class Formatter(logging.Formatter):
 
     def format(self, record):
         now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-        record.msg = f"{now} {record.levelname} {self.var} {record.msg}"
+        var = caller.get() or self.var
+        record.msg = f"{now} {record.levelname} {var} {record.msg}"
         return super().format(record)
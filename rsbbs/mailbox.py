@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+import sqlalchemy
+
+from sqlalchemy import Engine
+from sqlalchemy.orm import Session
+
+from rsbbs import readstate
+from rsbbs.models import Mailbox, Message, UnreadMessage
+
+
+def unread_count(session: Session, callsign: str) -> int:
+    """Count the unread messages addressed to a callsign."""
+    count = session.execute(
+        sqlalchemy.select(Mailbox.unread_count).where(
+            Mailbox.callsign == callsign)).scalar_one_or_none()
+    return count or 0
+
+
+def select_unread(callsign: str, *columns) -> sqlalchemy.Select:
+    """Select the unread messages addressed to a callsign.
+
+    :param callsign: whose unread messages to select
+    :param columns: the columns to select, if not whole messages
+
+    """
+    return sqlalchemy.select(*(columns or [Message])).join(
+        UnreadMessage,
+        UnreadMessage.message_id == Message.id).where(
+        UnreadMessage.callsign == callsign)
+
+
+def select_unread_ids(callsign: str) -> sqlalchemy.Select:
+    """Select the IDs of the unread messages addressed to a callsign."""
+    return sqlalchemy.select(UnreadMessage.message_id).where(
+        UnreadMessage.callsign == callsign).order_by(
+        UnreadMessage.message_id)
+
+
+def mark_read(session: Session, user, message_ids: list) -> None:
+    """Record that a user has read some messages.
+
+    :param session: the session to record it in; the caller commits
+    :param user: the user who read the messages
+    :param message_ids: the IDs of the messages they read
+
+    """
+    if not message_ids:
+        return
+    readstate.mark_read(session, user.id, message_ids)
+    session.execute(
+        sqlalchemy.delete(UnreadMessage).where(
+            UnreadMessage.callsign == user.callsign,
+            UnreadMessage.message_id.in_(message_ids)))
+
+
+class ReadReceipts():
+    """Collects the messages a caller reads and records them a batch at a
+    time, each batch in one transaction.
+
+    Use it as a context manager: whatever is still pending is recorded when
+    the with block ends, including when the caller disconnects.
+
+    :param engine: the database to record them in
+    :param user: the user reading the messages
+    :param every: record after this many messages; 0 waits for the end
+
+    """
+
+    def __init__(self, engine: Engine, user, every: int = 0) -> None:
+        self.engine = engine
+        self.user = user
+        self.every = every
+        self.pending = []
+
+    def __enter__(self) -> 'ReadReceipts':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.flush()
+
+    def add(self, message_id: int) -> None:
+        """Note that the user has read a message."""
+        self.pending.append(message_id)
+        if self.every and len(self.pending) >= self.every:
+            self.flush()
+
+    def flush(self) -> None:
+        """Record the pending messages as read."""
+        if not self.pending:
+            return
+        with Session(self.engine) as session:
+            mark_read(session, self.user, self.pending)
+            session.commit()
+        logging.info(f"User {self.user.id} read messages {self.pending}")
+        self.pending = []
@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# How long each command takes, and what it costs.
+#
+# The console measures every command a caller runs: its wall time, less
+# any time spent waiting for the caller to type, the SQL statements it
+# executes, the rows it fetches and the bytes it sends. The
+# measurement under way is kept in a context variable, so that the engine's
+# statement events and the cursors fetching rows can add to it without
+# being handed it, and callers served at once in one process (each in a
+# thread with its own context) are measured apart. The samples are kept in
+# memory until the caller disconnects, then logged and stored in the
+# command_metric table, where `rsbbs --command-stats` reports percentiles
+# per command.
+
+import contextvars
+import logging
+import math
+import sqlite3
+import time
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from typing import Iterator
+
+import sqlalchemy
+
+from sqlalchemy import Engine
+from sqlalchemy.orm import Session
+
+from rsbbs.models import CommandMetric
+
+
+# The sample for the command running in this context, if any
+current = contextvars.ContextVar('command_metrics', default=None)
+
+
+class Sample():
+    """What one run of a command took."""
+
+    __slots__ = ('command', 'datetime', 'seconds', 'statements', 'rows',
+                 'bytes', 'waiting')
+
+    def __init__(self, command: str) -> None:
+        self.command = command
+        # Times are stored in UTC without a zone
+        self.datetime = datetime.now(timezone.utc).replace(tzinfo=None)
+        self.seconds = 0.0
+        self.statements = 0
+        self.rows = 0
+        self.bytes = 0
+        # Seconds spent waiting for the caller to type, which don't count
+        self.waiting = 0.0
+
+
+#
+# Counting statements and rows
+#
+
+def count_statement(connection, cursor, statement, parameters, context,
+                    executemany) -> None:
+    """Count a statement for the command running, as a
+    before_cursor_execute engine event listener."""
+    sample = current.get()
+    if sample is not None:
+        sample.statements += 1
+
+
+def _count_rows(rows: int) -> None:
+    sample = current.get()
+    if sample is not None:
+        sample.rows += rows
+
+
+class Cursor(sqlite3.Cursor):
+    """A cursor that counts the rows it fetches for the command running."""
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            _count_rows(1)
+        return row
+
+    def fetchmany(self, *args, **kwargs) -> list:
+        rows = super().fetchmany(*args, **kwargs)
+        _count_rows(len(rows))
+        return rows
+
+    def fetchall(self) -> list:
+        rows = super().fetchall()
+        _count_rows(len(rows))
+        return rows
+
+    def __next__(self):
+        row = super().__next__()
+        _count_rows(1)
+        return row
+
+
+class Connection(sqlite3.Connection):
+    """A connection whose cursors count rows. Pass it to create_engine()
+    as connect_args={'factory': Connection}."""
+
+    def cursor(self, factory=Cursor):
+        return super().cursor(factory)
+
+
+@contextmanager
+def waiting() -> Iterator:
+    """Leave the time spent in a with block, waiting for the caller,
+    out of the command running."""
+    sample = current.get()
+    if sample is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        sample.waiting += time.perf_counter() - start
+
+
+#
+# Percentiles
+#
+
+def percentile(values: list, p: float) -> float:
+    """The p'th percentile of sorted values, by nearest rank."""
+    if not values:
+        return None
+    return values[max(math.ceil(p / 100 * len(values)), 1) - 1]
+
+
+def summarize(samples: list) -> list:
+    """Count, p50 and p95 seconds, and totals, per command.
+
+    :param samples: Samples, or rows with the same attributes
+    :returns: a dict per command, in command order
+
+    """
+    summary = []
+    key = lambda sample: sample.command  # noqa: E731
+    for command, group in groupby(sorted(samples, key=key), key=key):
+        group = list(group)
+        seconds = sorted(sample.seconds for sample in group)
+        summary.append({
+            'command': command,
+            'count': len(group),
+            'p50': percentile(seconds, 50),
+            'p95': percentile(seconds, 95),
+            'statements': sum(sample.statements for sample in group),
+            'rows': sum(sample.rows for sample in group),
+            'bytes': sum(sample.bytes for sample in group),
+        })
+    return summary
+
+
+#
+# Measuring
+#
+
+class CommandMetrics():
+    """Measures the commands one caller runs.
+
+    :param engine: the database to store the samples in
+    :param keep_days: how many days of samples to keep in it
+
+    """
+
+    def __init__(self, engine: Engine, keep_days: int = None) -> None:
+        self.engine = engine
+        self.keep_days = keep_days
+        self.samples = []
+
+    @contextmanager
+    def measure(self, command: str, output) -> Iterator:
+        """Measure a command run inside a with block.
+
+        Time spent waiting for input (see waiting()) is left out, so that
+        a command that prompts is measured by its own work, not by how
+        long the caller took to answer.
+
+        :param command: the command's name
+        :param output: the PacketWriter its output goes through
+
+        """
+        sample = Sample(command)
+        token = current.set(sample)
+        written = output.bytes_written
+        start = time.perf_counter()
+        try:
+            yield sample
+        finally:
+            sample.seconds = (time.perf_counter() - start
+                              - sample.waiting)
+            sample.bytes = output.bytes_written - written
+            current.reset(token)
+            self.samples.append(sample)
+
+    def flush(self) -> None:
+        """Log a summary of the samples and store them."""
+        if not self.samples:
+            return
+        samples, self.samples = self.samples, []
+        for command in summarize(samples):
+            logging.info(
+                f"command {command['command']}: {command['count']} run(s), "
+                f"p50 {command['p50'] * 1000:.1f} ms, "
+                f"p95 {command['p95'] * 1000:.1f} ms, "
+                f"{command['statements']} statement(s), "
+                f"{command['rows']} row(s), {command['bytes']} bytes")
+        with Session(self.engine) as session:
+            session.execute(sqlalchemy.insert(CommandMetric), [
+                {name: getattr(sample, name) for name in Sample.__slots__}
+                for sample in samples])
+            if self.keep_days is not None:
+                session.execute(sqlalchemy.delete(CommandMetric).where(
+                    CommandMetric.datetime < samples[0].datetime
+                    - timedelta(days=self.keep_days)))
+            session.commit()
+
+
+def report(engine: Engine, days: int = None) -> list:
+    """Summarize the stored samples per command (see summarize()).
+
+    :param days: how many days back to look, if not at every sample
+
+    """
+    statement = sqlalchemy.select(
+        CommandMetric.command, CommandMetric.seconds,
+        CommandMetric.statements, CommandMetric.rows, CommandMetric.bytes)
+    if days is not None:
+        since = (datetime.now(timezone.utc).replace(tzinfo=None)
+                 - timedelta(days=days))
+        statement = statement.where(CommandMetric.datetime >= since)
+    with Session(engine) as session:
+        return summarize(session.execute(statement).all())
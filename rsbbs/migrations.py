@@ -0,0 +1,397 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Schema migrations for messages.db.
+#
+# The schema version is SQLite's user_version header field, so checking that
+# a database is current reads one integer and reflects nothing. Migrations
+# run in order, each in the same transaction as its version bump. To change
+# the schema, update the models and append a migration that makes the same
+# change to an existing database.
+
+import logging
+
+from itertools import groupby
+from operator import itemgetter
+
+from sqlalchemy import Connection, Engine
+
+from rsbbs.readstate import ReadSet
+
+
+MIGRATIONS = []
+
+
+def migration(function):
+    """Register a migration. Its docstring is logged when it runs."""
+    MIGRATIONS.append(function)
+    return function
+
+
+@migration
+def create_baseline(connection: Connection) -> None:
+    """Create the message, user and user_message tables."""
+    # Databases from before versioning already have these tables
+    connection.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS message (
+            id INTEGER NOT NULL,
+            sender VARCHAR NOT NULL,
+            recipient VARCHAR NOT NULL,
+            subject VARCHAR NOT NULL,
+            message VARCHAR NOT NULL,
+            datetime DATETIME NOT NULL,
+            is_private BOOLEAN NOT NULL,
+            PRIMARY KEY (id)
+        )""")
+    connection.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS user (
+            id INTEGER NOT NULL,
+            callsign VARCHAR NOT NULL,
+            given_name VARCHAR,
+            family_name VARCHAR,
+            login_count INTEGER NOT NULL,
+            login_last DATETIME NOT NULL,
+            PRIMARY KEY (id)
+        )""")
+    connection.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS user_message (
+            user_id INTEGER,
+            message_id INTEGER,
+            FOREIGN KEY(user_id) REFERENCES user (id),
+            FOREIGN KEY(message_id) REFERENCES message (id)
+        )""")
+
+
+@migration
+def index_mailboxes(connection: Connection) -> None:
+    """Index mailbox lookups, make callsigns unique and key user_message."""
+    # Merge any duplicate users into the oldest one with the same callsign
+    connection.exec_driver_sql("""
+        UPDATE user_message SET user_id = (
+            SELECT MIN(keeper.id) FROM user AS dupe
+            JOIN user AS keeper ON keeper.callsign = dupe.callsign
+            WHERE dupe.id = user_message.user_id)
+        WHERE user_id IN (SELECT id FROM user)""")
+    connection.exec_driver_sql("""
+        DELETE FROM user
+        WHERE id NOT IN (SELECT MIN(id) FROM user GROUP BY callsign)""")
+    connection.exec_driver_sql("""
+        CREATE UNIQUE INDEX ix_user_callsign ON user (callsign)""")
+
+    # Rebuild user_message with a primary key, dropping duplicate rows
+    connection.exec_driver_sql("""
+        CREATE TABLE user_message_new (
+            user_id INTEGER NOT NULL,
+            message_id INTEGER NOT NULL,
+            PRIMARY KEY (user_id, message_id),
+            FOREIGN KEY(user_id) REFERENCES user (id),
+            FOREIGN KEY(message_id) REFERENCES message (id)
+        ) WITHOUT ROWID""")
+    connection.exec_driver_sql("""
+        INSERT OR IGNORE INTO user_message_new (user_id, message_id)
+        SELECT user_id, message_id FROM user_message
+        WHERE user_id IS NOT NULL AND message_id IS NOT NULL""")
+    connection.exec_driver_sql("DROP TABLE user_message")
+    connection.exec_driver_sql(
+        "ALTER TABLE user_message_new RENAME TO user_message")
+
+    connection.exec_driver_sql("""
+        CREATE INDEX ix_message_recipient_is_private
+        ON message (recipient, is_private)""")
+
+
+@migration
+def track_unread(connection: Connection) -> None:
+    """Keep an index of unread messages and a count per mailbox."""
+    connection.exec_driver_sql("""
+        CREATE TABLE unread_message (
+            callsign VARCHAR NOT NULL,
+            message_id INTEGER NOT NULL,
+            PRIMARY KEY (callsign, message_id),
+            FOREIGN KEY(message_id) REFERENCES message (id)
+        ) WITHOUT ROWID""")
+    connection.exec_driver_sql("""
+        CREATE TABLE mailbox (
+            callsign VARCHAR NOT NULL,
+            unread_count INTEGER NOT NULL,
+            PRIMARY KEY (callsign)
+        )""")
+
+    # Start from what the user_message table says has been read
+    connection.exec_driver_sql("""
+        INSERT INTO unread_message (callsign, message_id)
+        SELECT message.recipient, message.id FROM message
+        WHERE NOT EXISTS (
+            SELECT 1 FROM user_message
+            JOIN user ON user.id = user_message.user_id
+            WHERE user.callsign = message.recipient
+            AND user_message.message_id = message.id)""")
+    connection.exec_driver_sql("""
+        INSERT INTO mailbox (callsign, unread_count)
+        SELECT callsign, COUNT(*) FROM unread_message GROUP BY callsign""")
+
+    # New messages are unread, and deleted ones no longer are
+    connection.exec_driver_sql("""
+        CREATE TRIGGER message_insert_unread AFTER INSERT ON message
+        BEGIN
+            INSERT INTO unread_message (callsign, message_id)
+            VALUES (NEW.recipient, NEW.id);
+        END""")
+    connection.exec_driver_sql("""
+        CREATE TRIGGER message_delete_unread AFTER DELETE ON message
+        BEGIN
+            DELETE FROM unread_message
+            WHERE callsign = OLD.recipient AND message_id = OLD.id;
+        END""")
+
+    # Keep the mailbox counts in step with the index
+    connection.exec_driver_sql("""
+        CREATE TRIGGER unread_message_insert_count
+        AFTER INSERT ON unread_message
+        BEGIN
+            INSERT INTO mailbox (callsign, unread_count)
+            VALUES (NEW.callsign, 1)
+            ON CONFLICT (callsign)
+            DO UPDATE SET unread_count = unread_count + 1;
+        END""")
+    connection.exec_driver_sql("""
+        CREATE TRIGGER unread_message_delete_count
+        AFTER DELETE ON unread_message
+        BEGIN
+            UPDATE mailbox SET unread_count = unread_count - 1
+            WHERE callsign = OLD.callsign;
+        END""")
+
+
+@migration
+def compress_read_state(connection: Connection) -> None:
+    """Store read state as a compressed bitmap per user."""
+    connection.exec_driver_sql("""
+        CREATE TABLE read_state (
+            user_id INTEGER NOT NULL,
+            bitmap BLOB NOT NULL,
+            PRIMARY KEY (user_id),
+            FOREIGN KEY(user_id) REFERENCES user (id)
+        )""")
+    reads = connection.exec_driver_sql("""
+        SELECT user_id, message_id FROM user_message
+        ORDER BY user_id, message_id""")
+    for user_id, rows in groupby(reads, key=itemgetter(0)):
+        read_set = ReadSet(message_id for _, message_id in rows)
+        connection.exec_driver_sql(
+            "INSERT INTO read_state (user_id, bitmap) VALUES (?, ?)",
+            (user_id, read_set.to_bytes()))
+    connection.exec_driver_sql("DROP TABLE user_message")
+
+
+@migration
+def index_recipient_by_id(connection: Connection) -> None:
+    """Index messages by recipient in ID order for paged listing."""
+    # The index's entries end with the rowid, so dropping is_private from it
+    # lets listmine page through a mailbox without sorting it first
+    connection.exec_driver_sql("DROP INDEX ix_message_recipient_is_private")
+    connection.exec_driver_sql("""
+        CREATE INDEX ix_message_recipient ON message (recipient)""")
+
+
+@migration
+def index_full_text(connection: Connection) -> None:
+    """Index message subjects and bodies for full-text search."""
+    # The index reads its text from the message table rather than keeping a
+    # copy, so triggers must tell it about every change
+    connection.exec_driver_sql("""
+        CREATE VIRTUAL TABLE message_fts USING fts5(
+            subject, message,
+            content='message', content_rowid='id',
+            tokenize='porter unicode61')""")
+    connection.exec_driver_sql(
+        "INSERT INTO message_fts (message_fts) VALUES ('rebuild')")
+    connection.exec_driver_sql("""
+        CREATE TRIGGER message_insert_fts AFTER INSERT ON message
+        BEGIN
+            INSERT INTO message_fts (rowid, subject, message)
+            VALUES (NEW.id, NEW.subject, NEW.message);
+        END""")
+    connection.exec_driver_sql("""
+        CREATE TRIGGER message_delete_fts AFTER DELETE ON message
+        BEGIN
+            INSERT INTO message_fts (message_fts, rowid, subject, message)
+            VALUES ('delete', OLD.id, OLD.subject, OLD.message);
+        END""")
+    connection.exec_driver_sql("""
+        CREATE TRIGGER message_update_fts
+        AFTER UPDATE OF subject, message ON message
+        BEGIN
+            INSERT INTO message_fts (message_fts, rowid, subject, message)
+            VALUES ('delete', OLD.id, OLD.subject, OLD.message);
+            INSERT INTO message_fts (rowid, subject, message)
+            VALUES (NEW.id, NEW.subject, NEW.message);
+        END""")
+
+
+@migration
+def index_senders_and_dates(connection: Connection) -> None:
+    """Index messages by sender and by recipient in date order."""
+    connection.exec_driver_sql("""
+        CREATE INDEX ix_message_sender_datetime
+        ON message (sender, datetime)""")
+    connection.exec_driver_sql("""
+        CREATE INDEX ix_message_recipient_datetime
+        ON message (recipient, datetime)""")
+
+
+@migration
+def track_previous_login(connection: Connection) -> None:
+    """Keep each user's previous login time."""
+    # A login updates login_last and returns the old value in one upsert,
+    # and an upsert's RETURNING only sees the new row
+    connection.exec_driver_sql("""
+        ALTER TABLE user ADD COLUMN login_previous DATETIME""")
+
+
+@migration
+def record_command_metrics(connection: Connection) -> None:
+    """Keep the time and cost of each command callers run."""
+    connection.exec_driver_sql("""
+        CREATE TABLE command_metric (
+            id INTEGER NOT NULL,
+            datetime DATETIME NOT NULL,
+            command VARCHAR NOT NULL,
+            seconds FLOAT NOT NULL,
+            statements INTEGER NOT NULL,
+            rows INTEGER NOT NULL,
+            bytes INTEGER NOT NULL,
+            PRIMARY KEY (id)
+        )""")
+    connection.exec_driver_sql("""
+        CREATE INDEX ix_command_metric_datetime
+        ON command_metric (datetime)""")
+
+
+@migration
+def never_reuse_message_ids(connection: Connection) -> None:
+    """Number messages with AUTOINCREMENT, so IDs are never reused."""
+    # Without AUTOINCREMENT, SQLite numbers a new message after the highest
+    # ID in the table, so deleting the newest message hands its ID out
+    # again, to be confused with the archived message or read state that
+    # still carries it. SQLite can't add AUTOINCREMENT to a table, so
+    # rebuild it, keeping its indexes and triggers.
+    schema = connection.exec_driver_sql("""
+        SELECT sql FROM sqlite_master
+        WHERE tbl_name = 'message' AND type IN ('index', 'trigger')
+        AND sql IS NOT NULL""").scalars().all()
+    connection.exec_driver_sql("""
+        CREATE TABLE message_new (
+            id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+            sender VARCHAR NOT NULL,
+            recipient VARCHAR NOT NULL,
+            subject VARCHAR NOT NULL,
+            message VARCHAR NOT NULL,
+            datetime DATETIME NOT NULL,
+            is_private BOOLEAN NOT NULL
+        )""")
+    connection.exec_driver_sql("""
+        INSERT INTO message_new
+        (id, sender, recipient, subject, message, datetime, is_private)
+        SELECT id, sender, recipient, subject, message, datetime, is_private
+        FROM message""")
+    connection.exec_driver_sql("DROP TABLE message")
+    connection.exec_driver_sql("ALTER TABLE message_new RENAME TO message")
+    for sql in schema:
+        connection.exec_driver_sql(sql)
+    # A message that was read and then deleted may have been the newest,
+    # so start numbering after every ID anyone has read, too
+    highest = 0
+    for bitmap in connection.exec_driver_sql(
+            "SELECT bitmap FROM read_state").scalars():
+        runs = ReadSet.from_bytes(bitmap or b'').runs
+        if runs:
+            highest = max(highest, runs[-1][1])
+    # Copying the messages left a sequence only if there were any
+    if highest and not connection.exec_driver_sql(
+            "UPDATE sqlite_sequence SET seq = MAX(seq, ?) "
+            "WHERE name = 'message'", (highest,)).rowcount:
+        connection.exec_driver_sql(
+            "INSERT INTO sqlite_sequence (name, seq) VALUES ('message', ?)",
+            (highest,))
+
+
+# The version a fully migrated database is at
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(connection: Connection) -> int:
+    return connection.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def reserve_message_ids(connection: Connection, highest: int) -> None:
+    """Make sure new messages are numbered after highest.
+
+    Messages are numbered after the highest ID ever handed out (see
+    never_reuse_message_ids), so this is for IDs that messages.db never
+    handed out itself, but that an archive or read state already uses.
+    """
+    if not highest:
+        return
+    # There is no sequence until the first message is inserted
+    if not connection.exec_driver_sql(
+            "UPDATE sqlite_sequence SET seq = MAX(seq, ?) "
+            "WHERE name = 'message'", (highest,)).rowcount:
+        connection.exec_driver_sql(
+            "INSERT INTO sqlite_sequence (name, seq) VALUES ('message', ?)",
+            (highest,))
+
+
+def migrate(engine: Engine, target: int = None) -> list:
+    """Apply any migrations the database has not had yet.
+
+    :param engine: the engine for the database to migrate
+    :param target: the version to stop at, if not the latest
+    :returns: the versions that were applied
+
+    """
+    applied = []
+    target = SCHEMA_VERSION if target is None else target
+    # Manage the transaction by hand so that DDL is transactional
+    with engine.connect().execution_options(
+            isolation_level='AUTOCOMMIT') as connection:
+        version = schema_version(connection)
+        if version > SCHEMA_VERSION:
+            raise RuntimeError(
+                f"database schema version {version} is newer than this "
+                f"version of rsbbs supports ({SCHEMA_VERSION})")
+        if version >= target:
+            return applied
+
+        # Take the write lock before looking again, so that when several
+        # processes start at once only one of them migrates
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            version = schema_version(connection)
+            for function in MIGRATIONS[version:target]:
+                version += 1
+                logging.info(f"migrating database to schema version "
+                             f"{version}: {function.__doc__}")
+                function(connection)
+                connection.exec_driver_sql(f"PRAGMA user_version = {version}")
+                applied.append(version)
+            connection.exec_driver_sql("COMMIT")
+        except Exception:
+            connection.exec_driver_sql("ROLLBACK")
+            raise
+    return applied
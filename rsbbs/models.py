@@ -18,50 +18,102 @@
 
 from datetime import datetime, timezone
 
-from sqlalchemy import Boolean, DateTime, String, Integer,\
-    Table, ForeignKey, Column
+from sqlalchemy import Boolean, DateTime, Float, String, Integer,\
+    ForeignKey, Index, LargeBinary
 
 from sqlalchemy.orm import DeclarativeBase, Mapped
-from sqlalchemy.orm import mapped_column, relationship
+from sqlalchemy.orm import mapped_column
 
 
 class Base(DeclarativeBase):
     pass
 
 
-# Define the association table that links users and messages
-user_message_table = Table('user_message', Base.metadata,
-                           Column('user_id',
-                                  Integer, ForeignKey('user.id')),
-                           Column('message_id',
-                                  Integer, ForeignKey('message.id')))
-
-
 # Messages
 
 class Message(Base):
     __tablename__ = 'message'
+    __table_args__ = (
+        # Mailbox lookups. Entries end with the message ID, so a mailbox can
+        # be paged through in ID order. Listing public messages reads most
+        # of the table, so is_private is not worth an index.
+        Index('ix_message_recipient', 'recipient'),
+        # The list filters: messages from or to a callsign in a date window
+        Index('ix_message_sender_datetime', 'sender', 'datetime'),
+        Index('ix_message_recipient_datetime', 'recipient', 'datetime'),
+        # IDs are never reused, so an archived message or read state can't
+        # be mistaken for a new message
+        {'sqlite_autoincrement': True},
+    )
     id: Mapped[int] = mapped_column(primary_key=True)
     sender: Mapped[str] = mapped_column(String)
     recipient: Mapped[str] = mapped_column(String)
     subject: Mapped[str] = mapped_column(String)
-    message: Mapped[str] = mapped_column(String)
+    # Bodies are most of the table, and only reading a message needs one
+    message: Mapped[str] = mapped_column(String, deferred=True)
     datetime: Mapped[DateTime] = mapped_column(
-        DateTime, default=datetime.now(timezone.utc))
+        DateTime, default=lambda: datetime.now(timezone.utc))
     is_private: Mapped[bool] = mapped_column(Boolean)
 
 
+# Subjects and bodies are also indexed for full-text search by the
+# message_fts FTS5 table, which has no model (see rsbbs.search).
+
+
 # Users
 
 class User(Base):
     __tablename__ = 'user'
     id: Mapped[int] = mapped_column(primary_key=True)
-    callsign: Mapped[str] = mapped_column(String)
+    callsign: Mapped[str] = mapped_column(String, unique=True, index=True)
     given_name: Mapped[str] = mapped_column(String, nullable=True)
     family_name: Mapped[str] = mapped_column(String, nullable=True)
     login_count: Mapped[int] = mapped_column(Integer)
     login_last: Mapped[DateTime] = mapped_column(
-        DateTime, default=datetime.now(timezone.utc))
-    messages = relationship('Message',
-                            secondary=user_message_table,
-                            backref='read_by')
+        DateTime, default=lambda: datetime.now(timezone.utc))
+    # The login before login_last, if any
+    login_previous: Mapped[DateTime] = mapped_column(
+        DateTime, nullable=True)
+
+
+# Which messages each user has read, as a compressed bitmap of message IDs
+# (see rsbbs.readstate)
+
+class ReadState(Base):
+    __tablename__ = 'read_state'
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('user.id'), primary_key=True)
+    bitmap: Mapped[bytes] = mapped_column(LargeBinary)
+
+
+# Unread mail. A message has a row here for as long as the user it is
+# addressed to has not read it, and each callsign's mailbox counts its rows.
+# Triggers (see rsbbs.migrations) keep both up to date as messages come and
+# go; reading a message removes its row (see rsbbs.mailbox).
+
+class UnreadMessage(Base):
+    __tablename__ = 'unread_message'
+    __table_args__ = {'sqlite_with_rowid': False}
+    callsign: Mapped[str] = mapped_column(String, primary_key=True)
+    message_id: Mapped[int] = mapped_column(
+        ForeignKey('message.id'), primary_key=True)
+
+
+class Mailbox(Base):
+    __tablename__ = 'mailbox'
+    callsign: Mapped[str] = mapped_column(String, primary_key=True)
+    unread_count: Mapped[int] = mapped_column(Integer, default=0)
+
+
+# How long each command a caller ran took, and what it cost (see
+# rsbbs.metrics)
+
+class CommandMetric(Base):
+    __tablename__ = 'command_metric'
+    id: Mapped[int] = mapped_column(primary_key=True)
+    datetime: Mapped[DateTime] = mapped_column(DateTime, index=True)
+    command: Mapped[str] = mapped_column(String)
+    seconds: Mapped[float] = mapped_column(Float)
+    statements: Mapped[int] = mapped_column(Integer)
+    rows: Mapped[int] = mapped_column(Integer)
+    bytes: Mapped[int] = mapped_column(Integer)
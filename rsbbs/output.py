@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Output to the caller, gathered into packet-sized writes.
+#
+# Under ax25d, each write to stdout goes out as at least one AX.25 frame,
+# and every frame costs its own header, checksum and flags on air. Writing
+# a line at a time sends a stream of short frames. PacketWriter holds
+# output until it has a full frame's worth (paclen bytes) and writes that
+# in one go, so frames go out full. The rest goes out when the BBS waits
+# for the caller, or after a short delay if it is still busy.
+
+import sys
+import threading
+
+
+class PacketWriter():
+    """Writes text to stdout in chunks of paclen bytes.
+
+    Streams without a binary buffer underneath (such as a StringIO) are
+    written to directly.
+
+    :param paclen: the most bytes to write at once; 0 writes through
+    :param delay: seconds to hold a partial chunk before writing it anyway
+    :param stream: the text stream to write to, if not sys.stdout
+
+    """
+
+    def __init__(self, paclen: int = 256, delay: float = 0.2,
+                 encoding: str = 'utf-8', stream=None) -> None:
+        self.stream = stream
+        self.paclen = paclen
+        self.delay = delay
+        self.encoding = encoding
+        # Bytes written so far, for measuring commands (see rsbbs.metrics)
+        self.bytes_written = 0
+        self._pending = bytearray()
+        self._stream = None
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def write(self, text: str) -> None:
+        stream = self.stream or sys.stdout
+        data = text.encode(self.encoding)
+        self.bytes_written += len(data)
+        if not self.paclen or not hasattr(stream, 'buffer'):
+            self.flush()
+            stream.write(text)
+            stream.flush()
+            return
+        with self._lock:
+            if stream is not self._stream:
+                # Whatever was pending belongs to the old stream
+                self._flush()
+                self._stream = stream
+            self._pending += data
+            if len(self._pending) >= self.paclen:
+                full = len(self._pending) - len(self._pending) % self.paclen
+                self._write(bytes(self._pending[:full]))
+                del self._pending[:full]
+            if self._pending and self._timer is None and self.delay:
+                self._timer = threading.Timer(self.delay, self._flush_later)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        """Write whatever is pending now."""
+        with self._lock:
+            self._flush()
+
+    def _flush_later(self) -> None:
+        try:
+            self.flush()
+        except OSError:
+            # The caller has gone; the next write will find out
+            pass
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._pending:
+            self._write(bytes(self._pending))
+            self._pending.clear()
+
+    def _write(self, data: bytes) -> None:
+        if self._stream.closed:
+            # Nobody left to write to
+            return
+        # Anything written to the text layer goes first
+        self._stream.flush()
+        buffer = self._stream.buffer
+        for start in range(0, len(data), self.paclen):
+            buffer.write(data[start:start + self.paclen])
+            buffer.flush()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import re
+
+from datetime import date, datetime, time, timedelta, timezone
+
+import sqlalchemy
+
+from rsbbs.models import Message
+
+
+# The columns a message list shows, which leave out the message body
+SUMMARY_COLUMNS = (Message.id, Message.recipient, Message.sender,
+                   Message.datetime, Message.subject)
+
+# Help text for the arguments of the list commands
+RANGE_HELP = ("N (the newest N), <ID (older than ID), ID- (from ID on) or "
+              "FIRST-LAST")
+DATE_HELP = ("YYYY-MM-DD, today, yesterday, a day of the week, or Nd for N "
+             "days ago")
+CRITERIA_HELP = (f"Messages to list: {RANGE_HELP}, and any of from:CALL, "
+                 f"to:CALL, since:DATE and before:DATE, where DATE is "
+                 f"{DATE_HELP}")
+
+_RANGE = re.compile(
+    r'^(?:(?P<count>\d+)'
+    r'|<(?P<before>\d+)'
+    r'|(?P<first>\d+)-(?P<last>\d+)?)$')
+
+_FILTER = re.compile(r'^(?P<key>from|to|since|before):(?P<value>.*)$', re.I)
+
+_DAYS_AGO = re.compile(r'^(?P<days>\d+)d$')
+
+_WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday',
+             'saturday', 'sunday']
+
+
+def parse_date(value: str, today: date) -> date:
+    """Parse the date in a since: or before: filter.
+
+    :param value: the date as the caller wrote it
+    :param today: the date that relative dates count back from
+    :raises ValueError: if the date can't be understood
+
+    """
+    value = value.lower()
+    if value == 'today':
+        return today
+    if value == 'yesterday':
+        return today - timedelta(days=1)
+    for weekday, name in enumerate(_WEEKDAYS):
+        if len(value) >= 3 and name.startswith(value):
+            # The most recent one, which may be today
+            return today - timedelta(days=(today.weekday() - weekday) % 7)
+    match = _DAYS_AGO.match(value)
+    if match:
+        return today - timedelta(days=int(match['days']))
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}'. Use {DATE_HELP}.")
+
+
+class Filter():
+    """A from:, to:, since: or before: term given to a list command."""
+
+    def __init__(self, key: str, value: str, today: date = None) -> None:
+        self.key = key.lower()
+        self.value = value
+        if not value:
+            raise ValueError(f"Nothing after '{self.key}:'.")
+        if self.key == 'from':
+            self.criterion = Message.sender == value.upper()
+        elif self.key == 'to':
+            self.criterion = Message.recipient == value.upper()
+        else:
+            today = today or datetime.now(timezone.utc).date()
+            # Times are stored in UTC without a zone
+            moment = datetime.combine(parse_date(value, today), time())
+            if self.key == 'since':
+                self.criterion = Message.datetime >= moment
+            else:
+                self.criterion = Message.datetime < moment
+
+    def __str__(self) -> str:
+        return f"{self.key}:{self.value}"
+
+
+class Page():
+    """A page of messages for the list commands.
+
+    Pages are bounded by message ID rather than by an offset, so fetching a
+    page costs the same however far back it is. Counts and '<ID' page back
+    from the newest message; 'ID-' and 'FIRST-LAST' page forward. Filters
+    narrow down which messages are paged through.
+    """
+
+    def __init__(self, command: str, limit: int, first: int = None,
+                 last: int = None, before: int = None,
+                 filters: list = ()) -> None:
+        self.command = command
+        self.limit = limit
+        self.first = first
+        self.last = last
+        self.before = before
+        self.filters = list(filters)
+
+    @classmethod
+    def from_args(cls, args, page_size: int, today: date = None) -> 'Page':
+        """Parse a list command's range and filters.
+
+        :param args: the parsed command, with its criteria argument
+        :param page_size: how many messages to show if not specified
+        :param today: the date that relative dates count back from
+        :raises ValueError: if the criteria can't be understood
+
+        """
+        # More of the archive is listed by the same command
+        command = args.command
+        if getattr(args, 'archive', False):
+            command += ' --archive'
+        filters = []
+        spec = None
+        for term in args.criteria:
+            match = _FILTER.match(term)
+            if match:
+                filters.append(Filter(match['key'], match['value'], today))
+            elif spec is None:
+                spec = term
+            else:
+                raise ValueError(f"Give just one range, not '{spec}' and "
+                                 f"'{term}'.")
+        if not spec:
+            return cls(command, page_size, filters=filters)
+        match = _RANGE.match(spec)
+        if not match:
+            raise ValueError(f"Invalid range '{spec}'. Use {RANGE_HELP}.")
+        if match['count']:
+            return cls(command, int(match['count']), filters=filters)
+        if match['before']:
+            return cls(command, page_size, before=int(match['before']),
+                       filters=filters)
+        first = int(match['first'])
+        last = int(match['last']) if match['last'] else None
+        if last is not None and last < first:
+            raise ValueError(f"Invalid range '{spec}'. Use {RANGE_HELP}.")
+        return cls(command, page_size, first=first, last=last,
+                   filters=filters)
+
+    @property
+    def newest_first(self) -> bool:
+        return self.first is None
+
+    def apply(self, statement: sqlalchemy.Select,
+              column=Message.id) -> sqlalchemy.Select:
+        """Restrict a statement to this page.
+
+        :param statement: a statement selecting messages
+        :param column: the message ID column to page on
+
+        """
+        for filter_ in self.filters:
+            statement = statement.where(filter_.criterion)
+        if self.first is not None:
+            statement = statement.where(column >= self.first)
+        if self.last is not None:
+            statement = statement.where(column <= self.last)
+        if self.before is not None:
+            statement = statement.where(column < self.before)
+        statement = statement.order_by(
+            column.desc() if self.newest_first else column)
+        if self.limit:
+            # Fetch one extra to learn whether there is another page
+            statement = statement.limit(self.limit + 1)
+        return statement
+
+    def next(self, last_id: int) -> str:
+        """The command that lists the page after the one ending at last_id."""
+        command = ' '.join([self.command] + [str(f) for f in self.filters])
+        if self.newest_first:
+            return f"{command} <{last_id}"
+        return f"{command} {last_id + 1}-{self.last or ''}"
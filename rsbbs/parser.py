@@ -18,6 +18,8 @@
 
 import argparse
 
+from rsbbs.dispatch import Dispatcher, UsageError
+
 
 class BBSArgumentParser(argparse.ArgumentParser):
     # Override the error handler to prevent spewing error cruft over the air
@@ -52,24 +54,47 @@ class SortedHelpFormatter(argparse.HelpFormatter):
         self._dedent()
 
 
-class Parser(BBSArgumentParser):
-
-    def __init__(self):
-        self._init_parser()
-
-    # The only thing anyone should ever access from Parser is its parser
-    # attribute, so let's save everyone a step.
-    def __getattribute__(self, attr):
-        try:
-            return object.__getattribute__(self, attr)
-        except AttributeError:
-            return getattr(self.parser, attr)
+class Parser():
+    """The BBS's commands.
 
-    def _init_parser(self):
-        self.sort_actions = True
+    Input lines are parsed by the dispatcher (see rsbbs.dispatch); an
+    argparse tree of the same commands is built only when help is wanted.
+    """
 
+    def __init__(self):
+        self.dispatcher = Dispatcher()
+        # Plugins add their commands with subparsers.add_parser(), as they
+        # would to argparse
+        self.subparsers = self.dispatcher
+        self._parser = None
+        self._parser_commands = 0
+        self._help_parsers = {}
+
+    # Help comes from the argparse tree, so let callers reach it as they
+    # would the parser itself.
+    def __getattr__(self, attr):
+        # Only called for attributes the Parser lacks; its own private ones
+        # are never the argparse parser's, even before __init__ sets them
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return getattr(self.parser, attr)
+
+    @property
+    def parser(self) -> BBSArgumentParser:
+        """An argparse parser for the commands, for rendering help."""
+        self._update_help()
+        return self._parser
+
+    def _update_help(self) -> None:
+        # Rebuild the argparse tree if commands were added since it was built
+        commands = self.dispatcher.commands
+        if self._parser is None or self._parser_commands != len(commands):
+            self._parser, self._help_parsers = self._init_parser(commands)
+            self._parser_commands = len(commands)
+
+    def _init_parser(self, commands: list) -> tuple:
         # Root parser for BBS commands
-        self.parser = BBSArgumentParser(
+        parser = BBSArgumentParser(
             description='BBS Main Menu',
             prog='',
             add_help=False,
@@ -77,10 +102,47 @@ class Parser(BBSArgumentParser):
             formatter_class=SortedHelpFormatter,
         )
 
-        # We will create a subparser for each individual command
-        self.subparsers = self.parser.add_subparsers(
+        # A subparser for each individual command
+        subparsers = parser.add_subparsers(
             title='Commands',
             dest='command')
-
-        # Plugins will then add a subparser for each command, so we're done
-        # here
+        for command in commands:
+            spec = command.spec
+            subparser = subparsers.add_parser(
+                name=spec['name'],
+                aliases=spec['aliases'],
+                help=spec['help'])
+            for argument in spec['arguments']:
+                subparser.add_argument(*argument['args'],
+                                       **argument['kwargs'])
+            subparser.set_defaults(func=command.func, **spec['defaults'])
+        return parser, subparsers.choices
+
+    def format_command_help(self, alias: str) -> str:
+        """Help for one command, by any of its names."""
+        self._update_help()
+        return self._help_parsers[alias].format_help()
+
+    def add_command(self, command: dict, func) -> None:
+        """Add a command described by a plugin manifest entry.
+
+        :param command: the command's entry from the plugin manifest
+        :param func: the function to run when the command is entered
+
+        """
+        self.dispatcher.add(command, func)
+
+    def parse_args(self, words: list) -> argparse.Namespace:
+        """Parse an input line split into words.
+
+        :returns: the command's arguments, with func set to the function to
+            run it, or None for an empty line
+        :raises UsageError: if the line can't be run; its message, or the
+            command's help if that was asked for, is for the caller
+
+        """
+        if words and ('-h' in words[1:] or '--help' in words[1:]):
+            command = self.dispatcher.lookup(words[0])
+            if not ({'-h', '--help'} & set(command.grammar[0])):
+                raise UsageError(self.format_command_help(words[0]))
+        return self.dispatcher.parse(words)
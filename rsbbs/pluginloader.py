@@ -17,17 +17,59 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import importlib
+import json
 import os
 
 
+class CommandRecorder():
+    """Stands in for Parser to record the commands a plugin registers.
+
+    Plugins register their commands with parser.subparsers.add_parser(), so
+    this object is its own subparsers.
+    """
+
+    def __init__(self) -> None:
+        self.subparsers = self
+        self.commands = []
+
+    def add_parser(self, name: str, aliases: list = [],
+                   help: str = None) -> 'RecordedCommand':
+        command = RecordedCommand(name, aliases, help)
+        self.commands.append(command)
+        return command
+
+
+class RecordedCommand():
+
+    def __init__(self, name: str, aliases: list, help: str) -> None:
+        self.func = None
+        self.spec = {
+            'name': name,
+            'aliases': list(aliases),
+            'help': help,
+            'arguments': [],
+            'defaults': {},
+        }
+
+    def add_argument(self, *args, **kwargs) -> None:
+        self.spec['arguments'].append({'args': list(args), 'kwargs': kwargs})
+
+    def set_defaults(self, func=None, **kwargs) -> None:
+        self.func = func
+        self.spec['defaults'].update(kwargs)
+
+
 class PluginLoader():
 
     def __init__(self, api) -> None:
         self.api = api
         self.plugins = []
         self.plugins_dir = os.path.join(os.path.dirname(__file__), 'plugins')
+        self.manifest_file = os.path.join(self.plugins_dir, 'manifest.json')
         self._prefix = 'rsbbs.plugins'
         self._identifier = 'plugin'
+        self._handlers = {}
+        self._lazy_plugins = set()
 
     @property
     def _plugin_dirs(self) -> list:
@@ -38,25 +80,100 @@ class PluginLoader():
                        and not d.startswith('__')]
         return plugin_dirs
 
-    def load_plugin(self, plugin_dir) -> None:
+    @property
+    def manifest(self) -> dict:
+        """The commands each plugin registers, keyed by plugin directory.
+
+        Plugins without an entry (such as ones added after the manifest was
+        generated) are loaded at startup instead.
+        """
         try:
-            # Import the module containing the plugin class
-            plugin_module = importlib.import_module(
-                f"{self._prefix}.{plugin_dir}.{self._identifier}")
+            with open(self.manifest_file, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _import_plugin_class(self, plugin_dir) -> type:
+        # Import the module containing the plugin class
+        plugin_module = importlib.import_module(
+            f"{self._prefix}.{plugin_dir}.{self._identifier}")
+
+        # Get a reference to the plugin class
+        return plugin_module.Plugin
 
-            # Get a reference to the plugin class
-            plugin_class = plugin_module.Plugin
+    def _init_plugin(self, plugin_dir, parser) -> None:
+        # Initialize an instance of the plugin class, passing api as an
+        # argument, and have it register its commands with parser
+        plugin = self._import_plugin_class(plugin_dir)(self.api)
+        plugin.init_parser(parser)
+
+        # Add the loaded plugin to the list of plugins
+        self.plugins.append(plugin)
+
+    def load_plugin(self, plugin_dir) -> None:
+        """Load a plugin now and register its commands with the parser."""
+        self._init_plugin(plugin_dir, self.api.parser)
 
-            # Initialize an instance of the plugin class, passing api as an
-            # argument
-            plugin = plugin_class(self.api)
+    def _load_lazy_plugin(self, plugin_dir) -> None:
+        # The parser already has this plugin's commands from the manifest, so
+        # just collect the plugin's handlers for them
+        recorder = CommandRecorder()
+        self._init_plugin(plugin_dir, recorder)
+        for command in recorder.commands:
+            self._handlers[command.spec['name']] = command.func
+        self._lazy_plugins.discard(plugin_dir)
 
-            # Add the loaded plugin to the list of plugins
-            self.plugins.append(plugin)
-        except Exception:
-            raise
+    def _lazy_handler(self, plugin_dir, name):
+        def handler(args):
+            if name not in self._handlers:
+                self._load_lazy_plugin(plugin_dir)
+            return self._handlers[name](args)
+        return handler
 
     def load_plugins(self) -> None:
+        """Register every plugin's commands.
+
+        Commands listed in the manifest are registered without importing
+        their plugin, which is loaded the first time one of its commands
+        runs.
+        """
+        manifest = self.manifest
         # Loop over each plugin directory
         for plugin_dir in self._plugin_dirs:
-            self.load_plugin(plugin_dir)
+            if plugin_dir not in manifest:
+                self.load_plugin(plugin_dir)
+                continue
+            self._lazy_plugins.add(plugin_dir)
+            for command in manifest[plugin_dir]:
+                self.api.parser.add_command(
+                    command,
+                    self._lazy_handler(plugin_dir, command['name']))
+
+    def preload_plugins(self) -> None:
+        """Load every plugin that is still waiting for its first command."""
+        for plugin_dir in sorted(self._lazy_plugins):
+            self._load_lazy_plugin(plugin_dir)
+
+    def generate_manifest(self) -> dict:
+        """Record the commands registered by every plugin."""
+        manifest = {}
+        for plugin_dir in sorted(self._plugin_dirs):
+            plugin_class = self._import_plugin_class(plugin_dir)
+            # Registering commands needs no api, so skip the plugin's own
+            # initialization, which may touch files or the database
+            plugin = plugin_class.__new__(plugin_class)
+            recorder = CommandRecorder()
+            plugin.init_parser(recorder)
+            manifest[plugin_dir] = [c.spec for c in recorder.commands]
+        return manifest
+
+    def write_manifest(self) -> None:
+        with open(self.manifest_file, 'w') as f:
+            json.dump(self.generate_manifest(), f, indent=2)
+            f.write('\n')
+
+
+if __name__ == "__main__":
+    # Regenerate the manifest after adding or changing a plugin's commands:
+    #   python -m rsbbs.pluginloader
+    PluginLoader(None).write_manifest()
@@ -26,7 +26,6 @@ class Plugin():
 
     def __init__(self, api: Console) -> None:
         self.api = api
-        self.init_parser(api.parser)
         logging.info(f"Plugin {__name__} loaded")
 
     def init_parser(self, parser: Parser) -> None:
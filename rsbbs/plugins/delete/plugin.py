@@ -18,19 +18,17 @@
 
 import logging
 
-import sqlalchemy
 import sqlalchemy.exc
 
+from rsbbs import queries
 from rsbbs.console import Console
 from rsbbs.parser import Parser
-from rsbbs.models import Message
 
 
 class Plugin():
 
     def __init__(self, api: Console) -> None:
         self.api = api
-        self.init_parser(api.parser)
         logging.info(f"plugin {__name__} loaded")
 
     def init_parser(self, parser: Parser) -> None:
@@ -45,14 +43,9 @@ class Plugin():
     def delete(self, number) -> None:
         with self.api.controller.session() as session:
             try:
-                statement = sqlalchemy.delete(Message).where(
-                    sqlalchemy.and_(
-                        Message.recipient == self.api.config.calling_station,
-                        Message.id == number,
-                    ))
-                result = session.execute(
-                    statement,
-                    execution_options={"prebuffer_rows": True})
+                result = session.execute(queries.DELETE_MESSAGE, {
+                    'id': number,
+                    'callsign': self.api.config.calling_station})
                 count = result.rowcount
                 session.commit()
                 if count > 0:
@@ -17,18 +17,16 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import logging
-import sqlalchemy
 
+from rsbbs import queries
 from rsbbs.console import Console
 from rsbbs.parser import Parser
-from rsbbs.models import Message
 
 
 class Plugin():
 
     def __init__(self, api: Console) -> None:
         self.api = api
-        self.init_parser(api.parser)
         logging.info(f"plugin {__name__} loaded")
 
     def init_parser(self, parser: Parser) -> None:
@@ -41,12 +39,9 @@ class Plugin():
     def delete_mine(self) -> None:
         with self.api.controller.session() as session:
             try:
-                statement = sqlalchemy.delete(Message).where(
-                    Message.recipient == self.api.config.calling_station
-                    )
                 result = session.execute(
-                    statement,
-                    execution_options={"prebuffer_rows": True})
+                    queries.DELETE_MINE,
+                    {'callsign': self.api.config.calling_station})
                 count = result.rowcount
                 session.commit()
                 if count > 0:
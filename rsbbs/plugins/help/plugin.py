@@ -24,7 +24,6 @@ class Plugin():
 
     def __init__(self, api: Console) -> None:
         self.api = api
-        self.init_parser(api.parser)
         if api.config.debug:
             print(f"Plugin {__name__} loaded")
 
@@ -39,4 +38,4 @@ class Plugin():
         """Show a log of stations that have been heard by this station,
         also known as the 'mheard' (linux) or 'jheard' (KPC, etc.) log.
         """
-        self.api.parser.print_help()
+        self.api.write_output(self.api.parser.format_help())
@@ -31,7 +31,6 @@ class Plugin():
 
     def __init__(self, api: Console) -> None:
         self.api = api
-        self.init_parser(api.parser)
         self.init_file()
         logging.info(f"Plugin {__name__} loaded")
 
@@ -19,16 +19,16 @@
 import logging
 import sqlalchemy
 
+from rsbbs import queries
 from rsbbs.console import Console
+from rsbbs.pagination import CRITERIA_HELP, Page
 from rsbbs.parser import Parser
-from rsbbs.models import Message
 
 
 class Plugin():
 
     def __init__(self, api: Console) -> None:
         self.api = api
-        self.init_parser(api.parser)
         logging.info(f"plugin {__name__} loaded")
 
     def init_parser(self, parser: Parser) -> None:
@@ -36,28 +36,31 @@ class Plugin():
             name='list',
             aliases=['l'],
             help='List all available messages')
+        subparser.add_argument(
+            '-a', '--archive',
+            action='store_true',
+            help='List archived messages instead')
+        subparser.add_argument('criteria', nargs='*', help=CRITERIA_HELP)
         subparser.set_defaults(func=self.run)
 
-    def list(self, args) -> sqlalchemy.ChunkedIteratorResult:
-        """List all messages."""
-        with self.api.controller.session() as session:
-            try:
-                # Using or_ and is_ etc. to distinguish from python operators
-                statement = sqlalchemy.select(Message).where(
-                    sqlalchemy.or_(
-                        (Message.is_private.is_(False)),
-                        (Message.recipient.__eq__(
-                            self.api.config.calling_station)))
-                    )
-                result = session.execute(
-                    statement,
-                    execution_options={"prebuffer_rows": True})
-                logging.info("list messages")
-            except Exception:
-                raise
-        return result
+    def list(self, args, page: Page) -> sqlalchemy.Select:
+        """Select all messages the caller may see."""
+        return page.apply(queries.LIST_VISIBLE)
 
     def run(self, args) -> None:
         """List all public messages and messages private to the caller."""
-        result = self.list(args)
-        self.api.print_message_list(result)
+        try:
+            page = Page.from_args(args, self.api.config.list_page_size)
+        except ValueError as e:
+            self.api.write_output(str(e))
+            return
+        if args.archive and not self.api.controller.has_archive:
+            self.api.write_output("No messages have been archived.")
+            return
+        with self.api.controller.stream(
+                self.list(args, page),
+                {'callsign': self.api.config.calling_station},
+                archived=args.archive) as result:
+            logging.info("list archived messages" if args.archive
+                         else "list messages")
+            self.api.print_message_list(result, page)
@@ -19,16 +19,16 @@
 import logging
 import sqlalchemy
 
+from rsbbs import queries
 from rsbbs.console import Console
+from rsbbs.pagination import CRITERIA_HELP, Page
 from rsbbs.parser import Parser
-from rsbbs.models import Message
 
 
 class Plugin():
 
     def __init__(self, api: Console) -> None:
         self.api = api
-        self.init_parser(api.parser)
         logging.info(f"plugin {__name__} loaded")
 
     def init_parser(self, parser: Parser) -> None:
@@ -36,25 +36,23 @@ class Plugin():
             name='listmine',
             aliases=['lm'],
             help='List messages addressed to you')
+        subparser.add_argument('criteria', nargs='*', help=CRITERIA_HELP)
         subparser.set_defaults(func=self.run)
 
-    def list_mine(self, args) -> sqlalchemy.ChunkedIteratorResult:
-        with self.api.controller.session() as session:
-            try:
-                callsign = self.api.config.calling_station
-                statement = sqlalchemy.select(Message).where(
-                    Message.recipient == callsign)
-                result = session.execute(
-                    statement,
-                    execution_options={"prebuffer_rows": True})
-                logging.info("list my messages")
-                return result
-            except Exception:
-                raise
+    def list_mine(self, args, page: Page) -> sqlalchemy.Select:
+        return page.apply(queries.LIST_MINE)
 
     def run(self, args):
         """List only messages addressed to the calling station's callsign,
         including public and private messages.
         """
-        result = self.list_mine(args)
-        self.api.print_message_list(result)
+        try:
+            page = Page.from_args(args, self.api.config.list_page_size)
+        except ValueError as e:
+            self.api.write_output(str(e))
+            return
+        with self.api.controller.stream(
+                self.list_mine(args, page),
+                {'callsign': self.api.config.calling_station}) as result:
+            logging.info("list my messages")
+            self.api.print_message_list(result, page)
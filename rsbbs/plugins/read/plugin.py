@@ -20,16 +20,16 @@ import logging
 import sqlalchemy
 import sqlalchemy.exc
 
+from rsbbs import queries
 from rsbbs.console import Console
+from rsbbs.mailbox import mark_read
 from rsbbs.parser import Parser
-from rsbbs.models import Message, User
 
 
 class Plugin():
 
     def __init__(self, api: Console) -> None:
         self.api = api
-        self.init_parser(api.parser)
         logging.info(f"plugin {__name__} loaded")
 
     def init_parser(self, parser: Parser) -> None:
@@ -41,28 +41,39 @@ class Plugin():
         subparser.set_defaults(func=self.run)
 
     def read_message(self, number) -> None:
+        params = {'id': number, 'callsign': self.api.user.callsign}
         with self.api.controller.session() as session:
             try:
-                statement = sqlalchemy.select(Message).where(
-                    sqlalchemy.or_(
-                        sqlalchemy.and_(
-                            Message.id == number,
-                            Message.recipient == self.api.user.callsign),
-                        sqlalchemy.and_(
-                            Message.id == number,
-                            sqlalchemy.not_(Message.is_private))))
-                result = session.execute(statement).one()
-                self.api.print_message(result)
-                logging.info("read message")
-                session.commit()
-                user = session.get(User, self.api.user.id)
-                user.messages.append(result[0])
-                logging.info(f"User {user.id} read message {result[0].id}")
-                session.commit()
+                result = session.execute(queries.READ_MESSAGE, params).one()
             except sqlalchemy.exc.NoResultFound:
-                self.api.write_output("Message not found.")
+                result = None
             except Exception as e:
                 logging.error(e)
+                return
+            if result is not None:
+                try:
+                    self.api.print_message(result)
+                    logging.info("read message")
+                finally:
+                    # Read once shown, even if the caller stops partway
+                    mark_read(session, self.api.user, [result[0].id])
+                    logging.info(f"User {self.api.user.id} "
+                                 f"read message {result[0].id}")
+                    session.commit()
+                return
+        # Not in the message table, so it may have been archived. Archived
+        # messages are not tracked as read.
+        if not self.api.controller.has_archive:
+            self.api.write_output("Message not found.")
+            return
+        with self.api.controller.archive() as session:
+            result = session.execute(
+                queries.READ_MESSAGE, params).one_or_none()
+            if result is None:
+                self.api.write_output("Message not found.")
+                return
+            self.api.print_message(result)
+            logging.info("read archived message")
 
     def run(self, args) -> None:
         """Read a message.
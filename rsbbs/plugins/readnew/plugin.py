@@ -17,18 +17,17 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import logging
-import sqlalchemy
 
+from rsbbs import queries
 from rsbbs.console import Console
+from rsbbs.mailbox import ReadReceipts
 from rsbbs.parser import Parser
-from rsbbs.models import Message, User
 
 
 class Plugin():
 
     def __init__(self, api: Console) -> None:
         self.api = api
-        self.init_parser(api.parser)
         logging.info(f"plugin {__name__} loaded")
 
     def init_parser(self, parser: Parser) -> None:
@@ -38,38 +37,38 @@ class Plugin():
             help='Read all unread messages addressed to you')
         subparser.set_defaults(func=self.run)
 
-    def list_mine(self, args) -> sqlalchemy.ChunkedIteratorResult:
+    def list_mine(self, args) -> list:
+        """The IDs of the messages to read, oldest first."""
         with self.api.controller.session() as session:
-            try:
-                callsign = self.api.config.calling_station
-                statement = sqlalchemy.select(Message).where(
-                    Message.recipient == callsign).where(
-                    ~Message.read_by.any(User.id == self.api.user.id)
-                    )
-                result = session.execute(
-                    statement,
-                    execution_options={"prebuffer_rows": True})
-                logging.info("read message")
-                return result
-            except Exception:
-                raise
+            return session.execute(
+                queries.UNREAD_MESSAGE_IDS,
+                {'callsign': self.api.config.calling_station}
+            ).scalars().all()
 
     def run(self, args) -> None:
         """Read all messages addressed to the calling station's callsign,
         in sequence."""
-        result = self.list_mine(args)
-        messages = result.all()
-        count = len(messages)
+        # Only the IDs are fetched up front. Each message is loaded when its
+        # turn comes, so no query stays open while the caller reads.
+        message_ids = self.list_mine(args)
+        count = len(message_ids)
         if count > 0:
             self.api.write_output(f"Reading {count} messages:")
-            for message in messages:
-                self.api.print_message(message)
-                with self.api.controller.session() as session:
-                    user = session.get(User, self.api.user.id)
-                    user.messages.append(message[0])
-                    session.commit()
-                    logging.info(f"User {self.api.user.id} "
-                                 f"read message {message[0].id }")
-                self.api.read_enter("Enter to continue...")
+            # Messages are recorded as read a batch at a time, and the rest
+            # when the loop ends or the caller disconnects
+            with ReadReceipts(self.api.controller.engine, self.api.user,
+                              self.api.config.read_receipt_batch) as receipts:
+                for message_id in message_ids:
+                    with self.api.controller.session() as session:
+                        message = session.execute(
+                            queries.MESSAGE,
+                            {'id': message_id}).one_or_none()
+                    if message is None:
+                        # Deleted since the list was fetched
+                        continue
+                    # Read once shown, even if the caller stops partway
+                    receipts.add(message_id)
+                    self.api.print_message(message)
+                    self.api.read_enter("Enter to continue...")
         else:
             self.api.write_output("No messages to read.")
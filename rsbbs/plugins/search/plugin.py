@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+
+from rsbbs.console import Console
+from rsbbs.parser import Parser
+from rsbbs.search import select_matches
+
+
+class Plugin():
+
+    def __init__(self, api: Console) -> None:
+        self.api = api
+        logging.info(f"plugin {__name__} loaded")
+
+    def init_parser(self, parser: Parser) -> None:
+        subparser = parser.subparsers.add_parser(
+            name='search',
+            aliases=['f'],
+            help='Find messages by words in their subject or text')
+        subparser.add_argument('-n', '--limit',
+                               help='Show at most this many matches')
+        subparser.add_argument('words', nargs='+',
+                               help='Words to find, best matches first. '
+                               'End a word with * to find words that '
+                               'start with it')
+        subparser.set_defaults(func=self.run)
+
+    def run(self, args) -> None:
+        """List the messages that best match some words."""
+        limit = self.api.config.list_page_size
+        if args.limit:
+            if not args.limit.isdigit():
+                self.api.write_output("The limit must be a number.")
+                return
+            limit = int(args.limit)
+        try:
+            statement = select_matches(
+                args.words, self.api.config.calling_station, limit)
+        except ValueError as e:
+            self.api.write_output(str(e))
+            return
+        with self.api.controller.stream(statement) as result:
+            logging.info("search messages")
+            self.api.print_message_list(result)
@@ -27,7 +27,6 @@ class Plugin():
 
     def __init__(self, api: Console) -> None:
         self.api = api
-        self.init_parser(api.parser)
         logging.info(f"plugin {__name__} loaded")
 
     def init_parser(self, parser: Parser) -> None:
@@ -77,4 +76,4 @@ class Plugin():
         try:
             self.send(args, is_private=True)
         except Exception as e:
-            print(e)
+            self.api.write_output(str(e))
@@ -18,21 +18,17 @@
 
 import logging
 import re
-import sqlalchemy
-import sqlalchemy.orm
 import subprocess
 
-from rsbbs import __version__
+from rsbbs import __version__, queries
 from rsbbs.console import Console
 from rsbbs.parser import Parser
-from rsbbs.models import Message, User
 
 
 class Plugin():
 
     def __init__(self, api: Console) -> None:
         self.api = api
-        self.init_parser(api.parser)
         logging.info(f"Plugin {__name__} loaded")
 
     def init_parser(self, parser: Parser) -> None:
@@ -45,8 +41,8 @@ class Plugin():
     def get_message_count(self) -> int:
         with self.api.controller.session() as session:
             try:
-                count = session.execute(sqlalchemy.select(
-                    sqlalchemy.func.count(Message.id))).scalar_one()
+                count = session.execute(
+                    queries.COUNT_MESSAGES).scalar_one()
                 return int(count)
             except Exception as e:
                 logging.error(e)
@@ -54,8 +50,8 @@ class Plugin():
     def get_user_count(self) -> int:
         with self.api.controller.session() as session:
             try:
-                count = session.execute(sqlalchemy.select(
-                    sqlalchemy.func.count(User.id))).scalar_one()
+                count = session.execute(
+                    queries.COUNT_USERS).scalar_one()
                 return int(count)
             except Exception as e:
                 logging.error(e)
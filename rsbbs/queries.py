@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The statements the commands run, built once.
+#
+# Building a statement costs more than running it on a small database, and
+# the first run of each also compiles it to SQL. Statements here are built
+# when the module is imported, with bound parameters for the values that
+# change from call to call, so a command only binds its values. The engine
+# caches the SQL each one compiles to. A resident daemon compiles them all
+# once with warm() before it forks, so every caller starts with a warm
+# cache.
+
+import logging
+
+import sqlalchemy
+
+from sqlalchemy import Engine, bindparam
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session, undefer
+
+from rsbbs.mailbox import select_unread, select_unread_ids
+from rsbbs.models import Mailbox, Message, UnreadMessage, User
+from rsbbs.pagination import SUMMARY_COLUMNS, Page
+
+
+# Reading
+
+# A message the caller may read: public, or addressed to them
+# (params: id, callsign)
+READ_MESSAGE = sqlalchemy.select(Message).where(
+    Message.id == bindparam('id'),
+    sqlalchemy.or_(
+        Message.recipient == bindparam('callsign'),
+        sqlalchemy.not_(Message.is_private))).options(
+    undefer(Message.message))
+
+# A whole message (params: id)
+MESSAGE = sqlalchemy.select(Message).where(
+    Message.id == bindparam('id')).options(undefer(Message.message))
+
+# The IDs of the messages addressed to a callsign, oldest first
+# (params: callsign)
+MY_MESSAGE_IDS = sqlalchemy.select(Message.id).where(
+    Message.recipient == bindparam('callsign')).order_by(Message.id)
+
+# The IDs of a callsign's unread messages, oldest first (params: callsign)
+UNREAD_MESSAGE_IDS = select_unread_ids(bindparam('callsign'))
+
+
+# Listing; each is paged with Page.apply() (params: callsign)
+
+LIST_VISIBLE = sqlalchemy.select(*SUMMARY_COLUMNS).where(
+    sqlalchemy.or_(
+        Message.is_private.is_(False),
+        Message.recipient == bindparam('callsign')))
+
+LIST_MINE = sqlalchemy.select(*SUMMARY_COLUMNS).where(
+    Message.recipient == bindparam('callsign'))
+
+LIST_UNREAD = select_unread(bindparam('callsign'), *SUMMARY_COLUMNS)
+
+
+# Deleting
+
+# A message addressed to the caller (params: id, callsign)
+DELETE_MESSAGE = sqlalchemy.delete(Message).where(
+    Message.recipient == bindparam('callsign'),
+    Message.id == bindparam('id'))
+
+# Every message addressed to the caller (params: callsign)
+DELETE_MINE = sqlalchemy.delete(Message).where(
+    Message.recipient == bindparam('callsign'))
+
+
+# Users
+
+# Record a login, returning the user and their unread count; see
+# rsbbs.user.User.record_login (params: callsign, now). RETURNING needs
+# SQLite 3.35; before that, RECORD_LOGIN records it and LOGGED_IN reads
+# them back (params: callsign).
+_login = insert(User).values(
+    callsign=bindparam('callsign'), login_count=1,
+    login_last=bindparam('now'))
+_unread_count = sqlalchemy.select(Mailbox.unread_count).where(
+    Mailbox.callsign == bindparam('callsign')).scalar_subquery()
+RECORD_LOGIN = _login.on_conflict_do_update(
+    index_elements=[User.callsign],
+    set_={'login_count': User.login_count + 1,
+          'login_previous': User.login_last,
+          'login_last': _login.excluded.login_last})
+LOGIN = RECORD_LOGIN.returning(User, _unread_count)
+LOGGED_IN = sqlalchemy.select(User, _unread_count).where(
+    User.callsign == bindparam('callsign'))
+
+
+# Statistics
+
+COUNT_MESSAGES = sqlalchemy.select(sqlalchemy.func.count(Message.id))
+
+COUNT_USERS = sqlalchemy.select(sqlalchemy.func.count(User.id))
+
+
+def _warm_statements() -> list:
+    # The queries as the commands run them, with the names of their
+    # parameters, listing the first page
+    page = Page('', 20)
+    return [
+        (READ_MESSAGE, ['id', 'callsign']),
+        (MESSAGE, ['id']),
+        (MY_MESSAGE_IDS, ['callsign']),
+        (UNREAD_MESSAGE_IDS, ['callsign']),
+        (page.apply(LIST_VISIBLE), ['callsign']),
+        (page.apply(LIST_MINE), ['callsign']),
+        (page.apply(LIST_UNREAD, UnreadMessage.message_id), ['callsign']),
+        (COUNT_MESSAGES, []),
+        (COUNT_USERS, []),
+    ]
+
+
+def warm(engine: Engine) -> int:
+    """Compile the queries into the engine's statement cache by running
+    them with empty parameters, which match nothing.
+
+    Statements that write are left to compile on first use.
+
+    :returns: how many were compiled
+
+    """
+    statements = _warm_statements()
+    with Session(engine) as session:
+        for statement, names in statements:
+            # The cache is keyed on the parameter names too
+            session.execute(statement, {name: None for name in names}).all()
+        session.rollback()
+    logging.info(f"compiled {len(statements)} queries")
+    return len(statements)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Which messages each user has read, kept as one compressed bitmap per user.
+#
+# Callers tend to read messages in runs (readmine, readunread, or just
+# working down the list), so the set of message IDs a user has read is
+# stored as runs of consecutive IDs. Each run is two varints: the gap since
+# the end of the previous run and the run's length. A regular who has read
+# thousands of bulletins usually needs only a few dozen bytes.
+
+from bisect import bisect_right
+from typing import Iterable, Iterator
+
+import sqlalchemy
+
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from rsbbs.models import ReadState
+
+
+class ReadSet():
+    """A set of message IDs stored as sorted, non-overlapping runs."""
+
+    def __init__(self, message_ids: Iterable = ()) -> None:
+        # Parallel lists of the first and last ID in each run
+        self._starts = []
+        self._ends = []
+        self.update(message_ids)
+
+    def __contains__(self, message_id: int) -> bool:
+        i = bisect_right(self._starts, message_id) - 1
+        return i >= 0 and message_id <= self._ends[i]
+
+    def __iter__(self) -> Iterator:
+        for start, end in zip(self._starts, self._ends):
+            yield from range(start, end + 1)
+
+    def __len__(self) -> int:
+        return sum(end - start + 1
+                   for start, end in zip(self._starts, self._ends))
+
+    def __eq__(self, other) -> bool:
+        return (isinstance(other, ReadSet)
+                and self._starts == other._starts
+                and self._ends == other._ends)
+
+    def __repr__(self) -> str:
+        return f"ReadSet({self.runs!r})"
+
+    @property
+    def runs(self) -> list:
+        """The (first, last) message IDs of each run."""
+        return list(zip(self._starts, self._ends))
+
+    def add(self, message_id: int) -> None:
+        i = bisect_right(self._starts, message_id) - 1
+        if i >= 0 and message_id <= self._ends[i]:
+            return
+        after_previous = i >= 0 and self._ends[i] == message_id - 1
+        before_next = (i + 1 < len(self._starts)
+                       and self._starts[i + 1] == message_id + 1)
+        if after_previous and before_next:
+            # Fills the gap between two runs
+            self._ends[i] = self._ends[i + 1]
+            del self._starts[i + 1]
+            del self._ends[i + 1]
+        elif after_previous:
+            self._ends[i] = message_id
+        elif before_next:
+            self._starts[i + 1] = message_id
+        else:
+            self._starts.insert(i + 1, message_id)
+            self._ends.insert(i + 1, message_id)
+
+    def update(self, message_ids: Iterable) -> None:
+        # In order, most IDs extend the last run rather than shifting others
+        for message_id in sorted(message_ids):
+            self.add(message_id)
+
+    @classmethod
+    def from_runs(cls, runs: Iterable) -> 'ReadSet':
+        """Make a set from (first, last) runs, which may overlap."""
+        read_set = cls()
+        for start, end in sorted(runs):
+            if read_set._ends and start <= read_set._ends[-1] + 1:
+                read_set._ends[-1] = max(read_set._ends[-1], end)
+            else:
+                read_set._starts.append(start)
+                read_set._ends.append(end)
+        return read_set
+
+    def to_bytes(self) -> bytes:
+        data = bytearray()
+        previous_end = -1
+        for start, end in zip(self._starts, self._ends):
+            _write_varint(data, start - previous_end - 1)
+            _write_varint(data, end - start)
+            previous_end = end
+        return bytes(data)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'ReadSet':
+        read_set = cls()
+        position = 0
+        previous_end = -1
+        while position < len(data):
+            gap, position = _read_varint(data, position)
+            length, position = _read_varint(data, position)
+            start = previous_end + gap + 1
+            previous_end = start + length
+            read_set._starts.append(start)
+            read_set._ends.append(previous_end)
+        return read_set
+
+
+def _write_varint(data: bytearray, value: int) -> None:
+    while value >= 0x80:
+        data.append((value & 0x7f) | 0x80)
+        value >>= 7
+    data.append(value)
+
+
+def _read_varint(data: bytes, position: int) -> tuple:
+    value = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def load(session: Session, user_id: int) -> ReadSet:
+    """Load the set of messages a user has read."""
+    bitmap = session.execute(
+        sqlalchemy.select(ReadState.bitmap).where(
+            ReadState.user_id == user_id)).scalar_one_or_none()
+    return ReadSet.from_bytes(bitmap or b'')
+
+
+def has_read(session: Session, user_id: int, message_id: int) -> bool:
+    return message_id in load(session, user_id)
+
+
+def mark_read(session: Session, user_id: int, message_ids: list) -> None:
+    """Add messages to the set a user has read; the caller commits."""
+    if not message_ids:
+        return
+    # Writing first takes the database's write lock, so another session
+    # can't update the same bitmap between our read and our write
+    session.execute(
+        insert(ReadState).values(user_id=user_id, bitmap=b'')
+        .on_conflict_do_nothing())
+    read_set = load(session, user_id)
+    read_set.update(message_ids)
+    session.execute(
+        sqlalchemy.update(ReadState).where(
+            ReadState.user_id == user_id).values(
+            bitmap=read_set.to_bytes()))
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Purging messages that the retention policies no longer keep.
+#
+# Purging runs while callers are using the BBS, so it deletes in small
+# batches, each in its own short transaction, and lets others write in
+# between. The triggers on the message table take deleted messages out of
+# the unread and full-text indexes as it goes.
+
+import logging
+
+from datetime import datetime, timedelta, timezone
+
+import sqlalchemy
+
+from sqlalchemy import Engine
+from sqlalchemy.orm import Session
+
+from rsbbs.models import Message
+
+
+class Retention():
+    """Applies the retention policies in the retention section of the
+    configuration to a database.
+
+    :param engine: the database to purge
+    :param policy: the retention settings
+
+    """
+
+    def __init__(self, engine: Engine, policy: dict) -> None:
+        self.engine = engine
+        self.max_age_days = policy.get('max_age_days')
+        self.keep_private_days = policy.get('keep_private_days')
+        self.max_per_recipient = policy.get('max_per_recipient')
+        self.batch_size = policy.get('batch_size') or 500
+
+    def _delete_batches(self, select_ids: sqlalchemy.Select) -> int:
+        # Delete the selected messages batch_size at a time, committing
+        # after each batch, until none are left
+        total = 0
+        while True:
+            with Session(self.engine) as session:
+                ids = select_ids.order_by(Message.id).limit(self.batch_size)
+                count = session.execute(
+                    sqlalchemy.delete(Message).where(
+                        Message.id.in_(ids.scalar_subquery()))).rowcount
+                session.commit()
+            total += count
+            if count < self.batch_size:
+                return total
+
+    def purge_expired(self, now: datetime = None) -> int:
+        """Delete messages older than their maximum age.
+
+        :param now: the time to measure ages from, if not the current time
+        :returns: how many messages were deleted
+
+        """
+        # Times are stored in UTC without a zone
+        now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+        expired = []
+        if self.max_age_days is not None:
+            cutoff = now - timedelta(days=self.max_age_days)
+            if self.keep_private_days is None:
+                expired.append(Message.datetime < cutoff)
+            else:
+                expired.append(sqlalchemy.and_(
+                    Message.is_private.is_(False),
+                    Message.datetime < cutoff))
+        if self.keep_private_days is not None:
+            cutoff = now - timedelta(days=self.keep_private_days)
+            expired.append(sqlalchemy.and_(
+                Message.is_private.is_(True),
+                Message.datetime < cutoff))
+        if not expired:
+            return 0
+        return self._delete_batches(
+            sqlalchemy.select(Message.id).where(sqlalchemy.or_(*expired)))
+
+    def purge_excess(self) -> int:
+        """Delete all but the newest max_per_recipient messages to each
+        recipient.
+
+        :returns: how many messages were deleted
+
+        """
+        if not self.max_per_recipient:
+            return 0
+        with Session(self.engine) as session:
+            recipients = session.execute(
+                sqlalchemy.select(Message.recipient).group_by(
+                    Message.recipient).having(
+                    sqlalchemy.func.count() > self.max_per_recipient)
+            ).scalars().all()
+        total = 0
+        for recipient in recipients:
+            with Session(self.engine) as session:
+                oldest_kept = session.execute(
+                    sqlalchemy.select(Message.id).where(
+                        Message.recipient == recipient).order_by(
+                        Message.id.desc()).offset(
+                        self.max_per_recipient - 1).limit(1)).scalar()
+            if oldest_kept is None:
+                continue
+            total += self._delete_batches(
+                sqlalchemy.select(Message.id).where(
+                    Message.recipient == recipient,
+                    Message.id < oldest_kept))
+        return total
+
+    def reclaim_space(self) -> int:
+        """Return free pages to the file system.
+
+        Databases created with auto_vacuum=INCREMENTAL can do this a few
+        pages at a time. An older database is converted with one full
+        VACUUM, which holds the database until it is done.
+
+        :returns: how many pages were freed
+
+        """
+        with self.engine.connect().execution_options(
+                isolation_level='AUTOCOMMIT') as connection:
+            # 2 is INCREMENTAL
+            if connection.exec_driver_sql(
+                    "PRAGMA auto_vacuum").scalar() != 2:
+                logging.warning("converting database to incremental "
+                                "vacuum with a full VACUUM")
+                pages = connection.exec_driver_sql(
+                    "PRAGMA freelist_count").scalar()
+                connection.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+                connection.exec_driver_sql("VACUUM")
+                return pages
+            freed = 0
+            while True:
+                pages = connection.exec_driver_sql(
+                    "PRAGMA freelist_count").scalar()
+                if not pages:
+                    return freed
+                batch = min(pages, self.batch_size)
+                # Each step of this pragma frees one page, and only
+                # executescript() steps it to the end
+                connection.connection.driver_connection.executescript(
+                    f"PRAGMA incremental_vacuum({batch})")
+                freed += batch
+
+    def run(self, now: datetime = None) -> dict:
+        """Apply every policy, then tidy up after the deleted messages.
+
+        :param now: the time to measure ages from, if not the current time
+        :returns: what was done, by step
+
+        """
+        summary = {
+            'expired': self.purge_expired(now),
+            'excess': self.purge_excess(),
+        }
+        summary['pages'] = self.reclaim_space()
+        logging.info(f"retention purged {summary['expired']} expired and "
+                     f"{summary['excess']} excess messages and freed "
+                     f"{summary['pages']} pages")
+        return summary
@@ -18,10 +18,17 @@
 
 import logging
 
+from rsbbs import metrics
+from rsbbs.archive import Archive
 from rsbbs.config import Config
 from rsbbs.console import Console
 from rsbbs.controller import Controller
+from rsbbs.daemon import Daemon
 from rsbbs.logger import Logger
+from rsbbs.retention import Retention
+from rsbbs.server import Server
+from rsbbs.session import run_stdio
+from rsbbs.transfer import export_file, import_file
 
 from rsbbs.args import parse_args
 
@@ -44,6 +51,79 @@ def main():
 
     # Start logging
     logger = Logger(config)
+
+    # Upgrade the database and exit
+    if args.migrate:
+        controller = Controller(config)
+        print(f"Applied {len(controller.migrations_applied)} migrations; "
+              f"database schema is at version {controller.schema_version}")
+        return
+
+    # Apply the retention policies and exit
+    if args.purge:
+        controller = Controller(config)
+        summary = Retention(controller.engine, config.retention).run()
+        print(f"Purged {summary['expired']} expired and "
+              f"{summary['excess']} excess messages; freed "
+              f"{summary['pages']} pages")
+        return
+
+    # Move old messages into the archive and exit
+    if args.archive:
+        controller = Controller(config)
+        archived = Archive(controller.engine, config.archive_path,
+                           config.archive['after_days'],
+                           config.archive['batch_size']).run()
+        print(f"Archived {archived} messages to {config.archive_path}")
+        return
+
+    # Report command timings and exit
+    if args.command_stats:
+        controller = Controller(config)
+        days = config.metrics['keep_days']
+        print(f"Commands run in the last {days} days" if days
+              else "Commands run")
+        print(f"{'COMMAND': <12} {'RUNS': >6} {'P50 MS': >8} "
+              f"{'P95 MS': >8} {'SQL/RUN': >8} {'ROWS/RUN': >9} "
+              f"{'BYTES/RUN': >10}")
+        for command in metrics.report(controller.engine, days):
+            count = command['count']
+            print(f"{command['command']: <12} {count: >6} "
+                  f"{command['p50'] * 1000: >8.1f} "
+                  f"{command['p95'] * 1000: >8.1f} "
+                  f"{command['statements'] / count: >8.1f} "
+                  f"{command['rows'] / count: >9.1f} "
+                  f"{command['bytes'] / count: >10.0f}")
+        return
+
+    # Copy the database out to a file and exit
+    if args.export_file:
+        controller = Controller(config)
+        counts = export_file(controller.engine, args.export_file)
+        logging.info(f"exported {counts} to {args.export_file}")
+        return
+
+    # Load a file written by --export and exit
+    if args.import_file:
+        controller = Controller(config)
+        counts = import_file(controller.engine, args.import_file)
+        logging.info(f"imported {counts} from {args.import_file}")
+        print(", ".join(f"{count} {kind}" for kind, count in counts.items())
+              + " records imported")
+        return
+
+    # Stay resident and let rsbbs-client hand us callers
+    if args.daemon:
+        logging.info("daemon starting")
+        Daemon(config).serve_forever()
+        return
+
+    # Answer callers over the network
+    if args.serve:
+        logging.info("server starting")
+        Server(config).run()
+        return
+
     logging.info("caller connected")
 
     # Init the controller
@@ -56,8 +136,8 @@ def main():
     # Init the UI console
     console = Console(config, controller, user)
 
-    # Start the app
-    console.run()
+    # Start the app, signing the caller off if they go quiet
+    run_stdio(console)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Full-text search over message subjects and bodies.
+#
+# The message_fts FTS5 table (see rsbbs.migrations) indexes the words in
+# each message, stemmed so that "antennas" finds "antenna". Matches are
+# ranked with BM25, counting a word in the subject for more than one in the
+# body.
+
+import sqlalchemy
+
+from rsbbs.models import Message
+from rsbbs.pagination import SUMMARY_COLUMNS
+
+
+# How much more a match in the subject counts than one in the body
+SUBJECT_WEIGHT = 4.0
+
+_fts = sqlalchemy.table('message_fts', sqlalchemy.column('rowid'))
+_fts_all = sqlalchemy.literal_column('message_fts')
+
+
+def match_query(words: list) -> str:
+    """Turn the words a caller typed into an FTS5 query.
+
+    Every word must match. Each is quoted, so punctuation is just a word
+    separator rather than query syntax, except that a trailing '*' matches
+    any word that starts with it.
+
+    :param words: the words to search for
+    :raises ValueError: if there is nothing to search for
+
+    """
+    terms = []
+    for word in words:
+        prefix = word.endswith('*')
+        word = word.rstrip('*')
+        if not word:
+            continue
+        term = '"' + word.replace('"', '""') + '"'
+        terms.append(term + '*' if prefix else term)
+    if not terms:
+        raise ValueError("Nothing to search for.")
+    return ' '.join(terms)
+
+
+def select_matches(words: list, callsign: str,
+                   limit: int = None) -> sqlalchemy.Select:
+    """Select the best matches for some words among the messages a callsign
+    may see: public ones and their own private ones.
+
+    :param words: the words to search for
+    :param callsign: who is searching
+    :param limit: the most matches to select, if any
+
+    """
+    statement = sqlalchemy.select(*SUMMARY_COLUMNS).select_from(_fts).join(
+        Message, Message.id == _fts.c.rowid).where(
+        _fts_all.op('MATCH')(match_query(words)),
+        sqlalchemy.or_(Message.is_private.is_(False),
+                       Message.recipient == callsign)).order_by(
+        sqlalchemy.func.bm25(_fts_all, SUBJECT_WEIGHT, 1.0))
+    if limit:
+        statement = statement.limit(limit)
+    return statement
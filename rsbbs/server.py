@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import asyncio
+import contextvars
+import logging
+import os
+import re
+import signal
+
+from rsbbs import logger, queries
+from rsbbs.config import Config
+from rsbbs.console import Console
+from rsbbs.controller import Controller
+from rsbbs.session import CallerSession
+from rsbbs.user import User
+
+
+# A callsign with an optional SSID, such as W1AW or K1ABC-7
+CALLSIGN = re.compile(r'^[A-Z0-9]{3,7}(-[0-9]{1,2})?$', re.I)
+
+# Tries a caller gets at giving a callsign before being disconnected
+CALLSIGN_TRIES = 3
+
+
+class Server():
+    """Serve callers over TCP and a Unix socket, many at once, in one
+    process.
+
+    Without ax25d to say who is calling, each caller is asked for their
+    callsign first. Callers share the configuration, the database engine
+    and the plugins, which are loaded once; each gets a console, a user and
+    a database session of their own (see rsbbs.session).
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.config = config
+        self.options = config.server
+        self.controller = Controller(config)
+        queries.warm(self.controller.engine)
+        Console(config, self.controller, None).pluginloader.preload_plugins()
+        self.listeners = []
+        self.sessions = set()
+
+    @property
+    def addresses(self) -> list:
+        """Where the server is listening."""
+        return [sock.getsockname()
+                for listener in self.listeners
+                for sock in listener.sockets]
+
+    async def start(self) -> None:
+        """Start listening on the configured TCP port and Unix socket."""
+        if self.options['tcp_port'] is not None:
+            self.listeners.append(await asyncio.start_server(
+                self._handle, self.options['tcp_host'],
+                self.options['tcp_port']))
+        path = self.options['unix_socket']
+        if path:
+            # Clear out a socket left behind by a previous server
+            if os.path.exists(path):
+                os.unlink(path)
+            self.listeners.append(
+                await asyncio.start_unix_server(self._handle, path))
+            os.chmod(path, 0o600)
+        if not self.listeners:
+            raise ValueError("set server tcp_port or unix_socket to serve")
+        logging.info(f"server listening on {self.addresses}")
+
+    async def stop(self) -> None:
+        """Stop listening and disconnect every caller."""
+        for listener in self.listeners:
+            listener.close()
+        sessions = list(self.sessions)
+        for task in sessions:
+            task.cancel()
+        await asyncio.gather(*sessions, return_exceptions=True)
+        for listener in self.listeners:
+            await listener.wait_closed()
+        path = self.options['unix_socket']
+        if path and os.path.exists(path):
+            os.unlink(path)
+        self.listeners = []
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            await asyncio.gather(*(listener.serve_forever()
+                                   for listener in self.listeners))
+        finally:
+            await self.stop()
+
+    def run(self) -> None:
+        """Serve until interrupted or terminated."""
+        async def main():
+            task = asyncio.current_task()
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGTERM, task.cancel)
+            await self.serve_forever()
+        try:
+            asyncio.run(main())
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            pass
+        logging.info("server stopped")
+
+    async def _handle(self, reader: asyncio.StreamReader,
+                      writer: asyncio.StreamWriter) -> None:
+        if len(self.sessions) >= self.options['max_sessions']:
+            logging.warning("all sessions in use; turned a caller away")
+            writer.write(b"All lines are busy, try again later. 73!\r\n")
+            await self._hang_up(writer)
+            return
+        task = asyncio.current_task()
+        self.sessions.add(task)
+        try:
+            callsign = await self._ask_callsign(reader, writer)
+            if callsign:
+                await self._run_session(callsign, reader, writer)
+            else:
+                await self._hang_up(writer)
+        except ConnectionError:
+            pass
+        finally:
+            self.sessions.discard(task)
+
+    async def _ask_callsign(self, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter) -> str:
+        for _ in range(CALLSIGN_TRIES):
+            writer.write(b"Callsign:\r\n")
+            await writer.drain()
+            try:
+                line = await asyncio.wait_for(reader.readline(),
+                                              self.config.idle_timeout)
+            except asyncio.TimeoutError:
+                return None
+            if not line:
+                return None
+            callsign = line.decode(errors='replace').strip()
+            if CALLSIGN.match(callsign):
+                return callsign.upper()
+        return None
+
+    async def _run_session(self, callsign: str,
+                           reader: asyncio.StreamReader,
+                           writer: asyncio.StreamWriter) -> None:
+        logger.caller.set(callsign)
+        config = self.config.for_caller(callsign)
+        controller = self.controller.for_caller(config)
+        user = User(config, controller)
+        # In a thread, carrying the caller's context along for its log lines
+        await asyncio.get_running_loop().run_in_executor(
+            None, contextvars.copy_context().run, user.record_login)
+        logging.info("caller connected")
+        console = Console(config, controller, user)
+        await CallerSession(console, reader, writer,
+                            config.idle_timeout,
+                            config.session_timeout).run()
+
+    async def _hang_up(self, writer: asyncio.StreamWriter) -> None:
+        try:
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# One caller's session, from connection to sign-off, with time limits.
+#
+# The console and the plugins are ordinary blocking code: they read a line
+# and write output as they go. A session runs them in a thread of their
+# own, while an asyncio event loop owns the connection. Each read and write
+# the console makes is handed to the loop, which can give up on a read
+# after idle_timeout seconds and end the whole session after
+# session_timeout. Either way the caller is told, the console sees the end
+# of its input, and it unwinds the way it would for a caller who hung up,
+# closing its database sessions on the way out.
+#
+# The loop reads and writes asyncio streams, so the same session works on
+# stdin and stdout or on a network connection.
+
+import asyncio
+import contextvars
+import io
+import logging
+import os
+import socket
+import stat
+import sys
+import threading
+
+from rsbbs.console import Console
+
+
+# Seconds a disconnected console gets to wind up before its connection is
+# cut, in case it is stuck writing to a link that has gone quiet
+GRACE = 5
+
+
+class _Output(io.RawIOBase):
+    """The console's stdout, writing to the session's connection."""
+
+    def __init__(self, session: 'CallerSession') -> None:
+        self.session = session
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self.session.closed:
+            raise BrokenPipeError("the caller has been disconnected")
+        self.session.call(self.session.send(bytes(data)))
+        return len(data)
+
+
+class _Input():
+    """The console's stdin, reading from the session's connection."""
+
+    def __init__(self, session: 'CallerSession') -> None:
+        self.session = session
+
+    def readline(self) -> str:
+        if self.session.closed:
+            return ''
+        return self.session.call(self.session.receive())
+
+
+class CallerSession():
+    """Serve one caller over a pair of asyncio streams.
+
+    :param console: the console for this caller
+    :param reader: the stream the caller's input arrives on
+    :param writer: the stream the caller's output goes to
+    :param idle_timeout: seconds to wait for input before signing the
+        caller off, or None to wait forever
+    :param session_timeout: seconds before signing the caller off, or None
+
+    """
+
+    def __init__(self, console: Console,
+                 reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 idle_timeout: float = None,
+                 session_timeout: float = None) -> None:
+        self.console = console
+        self.reader = reader
+        self.writer = writer
+        self.idle_timeout = idle_timeout
+        self.session_timeout = session_timeout
+        self.closed = False
+        self.loop = None
+        self.thread = None
+
+    #
+    # The event loop's side
+    #
+
+    async def run(self) -> None:
+        """Run the console until the caller signs off or times out.
+
+        If the task running this is cancelled, the caller is disconnected
+        and the console is left to finish before the cancellation goes on.
+        """
+        self.loop = asyncio.get_running_loop()
+        finished = self.loop.create_future()
+        # The console's thread runs in this task's context, so it logs as
+        # the same caller
+        self.thread = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(self._run_console, finished),
+            name=f"session {self.console.user.callsign}", daemon=True)
+        self.thread.start()
+        try:
+            await asyncio.wait_for(asyncio.shield(finished),
+                                   self.session_timeout)
+        except asyncio.TimeoutError:
+            logging.info("session time limit reached")
+            self.close("Session time limit reached. 73!")
+            await self._wind_up(finished)
+        except asyncio.CancelledError:
+            self.close("The BBS is shutting down. 73!")
+            await self._wind_up(finished)
+            raise
+        finally:
+            if finished.done():
+                self.thread.join()
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+
+    async def _wind_up(self, finished: asyncio.Future) -> None:
+        try:
+            await asyncio.wait_for(asyncio.shield(finished), GRACE)
+        except asyncio.TimeoutError:
+            self.writer.transport.abort()
+            await finished
+
+    def close(self, notice: str = None) -> None:
+        """Disconnect the caller, telling them why."""
+        if self.closed:
+            return
+        self.closed = True
+        if notice:
+            self.writer.write(f"\r\n{notice}\r\n".encode())
+        # Anything waiting for input gets the end of it instead
+        self.reader.feed_eof()
+
+    async def receive(self) -> str:
+        """Read a line from the caller, or '' at the end of input."""
+        if self.closed:
+            return ''
+        try:
+            line = await asyncio.wait_for(self.reader.readline(),
+                                          self.idle_timeout)
+        except asyncio.TimeoutError:
+            logging.info("caller idle too long")
+            self.close("No input for a while, disconnecting. 73!")
+            return ''
+        except ConnectionError:
+            return ''
+        return line.decode(errors='replace')
+
+    async def send(self, data: bytes) -> None:
+        """Write to the caller, waiting while the link catches up."""
+        if self.closed:
+            raise BrokenPipeError("the caller has been disconnected")
+        self.writer.write(data)
+        await self.writer.drain()
+
+    #
+    # The console's side
+    #
+
+    def call(self, coroutine):
+        """Run a coroutine on the event loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def _run_console(self, finished: asyncio.Future) -> None:
+        console = self.console
+        console.stdin = _Input(self)
+        console.output.stream = io.TextIOWrapper(
+            io.BufferedWriter(_Output(self)), newline='')
+        try:
+            console.run()
+        except (SystemExit, ConnectionError):
+            # Signed off, hung up or disconnected
+            pass
+        except Exception as e:
+            logging.error(f"session ended with error: {e}")
+        finally:
+            console.controller.session().close()
+            self.loop.call_soon_threadsafe(finished.set_result, None)
+
+
+def _waitable(file) -> bool:
+    # The event loop can wait on pipes, sockets and terminals, but not on
+    # regular files or /dev/null
+    try:
+        fd = file.fileno()
+        mode = os.fstat(fd).st_mode
+    except (OSError, ValueError):
+        return False
+    return stat.S_ISFIFO(mode) or stat.S_ISSOCK(mode) or os.isatty(fd)
+
+
+class _SocketWriter():
+    """The parts of asyncio.StreamWriter a session uses, on a socket.
+
+    Under ax25d, stdin and stdout are one AX.25 socket. asyncio's stream
+    transports only take SOCK_STREAM sockets, and a pipe transport would
+    take the caller's input for them hanging up, so the socket is read and
+    written with the event loop's socket operations instead.
+    """
+
+    def __init__(self, sock: socket.socket,
+                 reader: asyncio.StreamReader) -> None:
+        self.sock = sock
+        self.transport = self
+        self._buffer = bytearray()
+        self._lock = asyncio.Lock()
+        self._receiving = asyncio.get_running_loop().create_task(
+            self._receive(reader))
+
+    async def _receive(self, reader: asyncio.StreamReader) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                data = await loop.sock_recv(self.sock, 4096)
+                if not data:
+                    break
+                reader.feed_data(data)
+        except OSError:
+            pass
+        reader.feed_eof()
+
+    def write(self, data: bytes) -> None:
+        self._buffer += data
+
+    async def drain(self) -> None:
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            while self._buffer:
+                data = bytes(self._buffer)
+                self._buffer.clear()
+                await loop.sock_sendall(self.sock, data)
+
+    def close(self) -> None:
+        pass
+
+    async def wait_closed(self) -> None:
+        try:
+            await self.drain()
+        finally:
+            self._receiving.cancel()
+            self.sock.close()
+
+    def abort(self) -> None:
+        self._buffer.clear()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+async def _open_stdio() -> tuple:
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    stdin = os.fstat(sys.stdin.fileno())
+    stdout = os.fstat(sys.stdout.fileno())
+    # Duplicates, so that closing the session leaves sys.stdin and
+    # sys.stdout alone
+    if stat.S_ISSOCK(stdout.st_mode) and os.path.samestat(stdin, stdout):
+        sock = socket.socket(fileno=os.dup(sys.stdout.fileno()))
+        sock.setblocking(False)
+        return reader, _SocketWriter(sock, reader)
+    await loop.connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader),
+        os.fdopen(os.dup(sys.stdin.fileno()), 'rb', buffering=0))
+    transport, protocol = await loop.connect_write_pipe(
+        lambda: asyncio.StreamReaderProtocol(asyncio.StreamReader()),
+        os.fdopen(os.dup(sys.stdout.fileno()), 'wb', buffering=0))
+    return reader, asyncio.StreamWriter(transport, protocol, reader, loop)
+
+
+async def _serve_stdio(console: Console) -> None:
+    reader, writer = await _open_stdio()
+    await CallerSession(console, reader, writer,
+                        console.config.idle_timeout,
+                        console.config.session_timeout).run()
+
+
+def run_stdio(console: Console) -> None:
+    """Serve the caller on stdin and stdout, as under ax25d.
+
+    Input from or output to a regular file (a script, say) can't be waited
+    on, so then the console runs directly, with no time limits.
+    """
+    if not (_waitable(sys.stdin) and _waitable(sys.stdout)):
+        console.run()
+        return
+    sys.stdout.flush()
+    asyncio.run(_serve_stdio(console))
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Logging statements that take too long, with how SQLite ran them.
+#
+# Echoing every statement (debug mode) writes to stdout, which goes over the
+# air. The slow query log instead writes only statements slower than a
+# threshold, with their parameters, time and EXPLAIN QUERY PLAN, to a file
+# of its own in the log directory, so that a scan of a whole table shows up
+# with the plan that caused it. The time is that of executing the statement
+# and fetching its first rows; a query whose rows are streamed keeps
+# running as they are fetched.
+
+import logging
+import os
+import sqlite3
+import time
+
+import platformdirs
+
+from sqlalchemy import Engine, event
+
+from rsbbs import logger
+
+
+# Statements that EXPLAIN QUERY PLAN can explain
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'REPLACE')
+
+log = logging.getLogger('rsbbs.slowquery')
+log.setLevel(logging.INFO)
+# Slow queries go to their own file only
+log.propagate = False
+_handler = None
+
+
+def log_path(app_name: str) -> str:
+    """Where the slow query log goes: the user log directory."""
+    return os.path.join(platformdirs.user_log_dir(appname=app_name),
+                        'slow_queries.log')
+
+
+def _open(path: str) -> None:
+    # One process logs slow queries to one file
+    global _handler
+    if _handler is not None:
+        if _handler.baseFilename == os.path.abspath(path):
+            return
+        log.removeHandler(_handler)
+        _handler.close()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _handler = logging.FileHandler(path, delay=True)
+    _handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+    log.addHandler(_handler)
+
+
+def explain(dbapi_connection, statement: str, parameters) -> list:
+    """The query plan for a statement, as indented lines.
+
+    :param dbapi_connection: the sqlite3 connection to explain it on
+    :param statement: the statement, as sent to SQLite
+    :param parameters: its parameters
+
+    """
+    # A plain cursor, so that the plan isn't counted as rows a command
+    # fetched (see rsbbs.metrics)
+    cursor = sqlite3.Cursor(dbapi_connection)
+    try:
+        rows = cursor.execute(f"EXPLAIN QUERY PLAN {statement}",
+                              parameters).fetchall()
+    finally:
+        cursor.close()
+    depth = {0: -1}
+    lines = []
+    for id_, parent, _, detail in rows:
+        depth[id_] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[id_] + detail)
+    return lines
+
+
+class SlowQueryLog():
+    """Log an engine's statements that take longer than a threshold.
+
+    :param engine: the engine whose statements to time
+    :param threshold_ms: how many milliseconds make a statement slow
+    :param path: the file to log them to
+
+    """
+
+    def __init__(self, engine: Engine, threshold_ms: float,
+                 path: str) -> None:
+        self.threshold = (threshold_ms or 0) / 1000
+        self.path = path
+        _open(path)
+        event.listen(engine, 'before_cursor_execute', self._before)
+        event.listen(engine, 'after_cursor_execute', self._after)
+
+    def _before(self, connection, cursor, statement, parameters, context,
+                executemany) -> None:
+        # On the statement's execution context, which goes away with it if
+        # the statement fails and _after is never called
+        if context is not None:
+            context._slow_query_start = time.perf_counter()
+
+    def _after(self, connection, cursor, statement, parameters, context,
+               executemany) -> None:
+        start = getattr(context, '_slow_query_start', None)
+        if start is None:
+            return
+        seconds = time.perf_counter() - start
+        if seconds < self.threshold:
+            return
+        try:
+            self.log(cursor.connection, statement, parameters, executemany,
+                     seconds)
+        except Exception as e:
+            # Never fail a caller's command over its log entry
+            logging.error(f"could not log slow query: {e}")
+
+    def log(self, dbapi_connection, statement: str, parameters,
+            executemany: bool, seconds: float) -> None:
+        entry = [f"{seconds * 1000:.1f} ms"]
+        caller = logger.caller.get()
+        if caller:
+            entry.append(f"caller {caller}")
+        if executemany:
+            entry.append(f"{len(parameters)} times")
+            # The rest are much the same, and there may be thousands
+            parameters = parameters[0] if parameters else ()
+        entry = [", ".join(entry), statement.strip()]
+        entry.append(f"parameters: {parameters!r}")
+        if statement.lstrip().upper().startswith(EXPLAINABLE):
+            try:
+                plan = explain(dbapi_connection, statement, parameters)
+            except sqlite3.Error as e:
+                plan = [f"(could not explain: {e})"]
+            entry.append("plan:")
+            entry.extend('  ' + line for line in plan)
+        log.info('\n'.join(entry) + '\n')
@@ -0,0 +1,357 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Exporting and importing messages, users and read state.
+#
+# JSONL files have one record per line: users, then messages, then each
+# user's read state as runs of message IDs. mbox files have just the
+# messages, for reading in a mail client or importing elsewhere. Both are
+# streamed, so memory use doesn't depend on the size of the database, and
+# imports insert in batches, each batch in one transaction.
+
+import email.utils
+import json
+import logging
+import re
+import sys
+
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, TextIO
+
+import sqlalchemy
+
+from sqlalchemy import Engine
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from rsbbs.migrations import reserve_message_ids
+from rsbbs.models import Message, ReadState, UnreadMessage, User
+from rsbbs.readstate import ReadSet
+
+
+# Rows inserted per transaction
+BATCH_SIZE = 5000
+
+_USER_COLUMNS = ('callsign', 'given_name', 'family_name', 'login_count',
+                 'login_last')
+_MESSAGE_COLUMNS = ('id', 'sender', 'recipient', 'subject', 'message',
+                    'datetime', 'is_private')
+
+# Lines in an mbox body that could be mistaken for the start of a message
+_FROM_LINE = re.compile(r'^>*From ')
+
+
+@contextmanager
+def _open(path: str, mode: str) -> Iterator:
+    # '-' is stdin or stdout
+    if path == '-':
+        yield sys.stdout if mode == 'w' else sys.stdin
+    else:
+        with open(path, mode, encoding='utf-8', newline='') as f:
+            yield f
+
+
+def _is_mbox(path: str) -> bool:
+    return path.lower().endswith('.mbox')
+
+
+def _stream(session: Session, statement: sqlalchemy.Select) -> Iterator:
+    return session.execute(
+        statement, execution_options={'yield_per': BATCH_SIZE})
+
+
+#
+# Export
+#
+
+def export_file(engine: Engine, path: str) -> dict:
+    """Export the database to a JSONL file, or an mbox file if path ends
+    in .mbox.
+
+    :returns: how many of each kind of record were written
+
+    """
+    with _open(path, 'w') as f:
+        if _is_mbox(path):
+            return export_mbox(engine, f)
+        return export_jsonl(engine, f)
+
+
+def export_jsonl(engine: Engine, f: TextIO) -> dict:
+    counts = {'user': 0, 'message': 0, 'read': 0}
+
+    def write(record_type, record):
+        f.write(json.dumps({'type': record_type, **record}) + '\n')
+        counts[record_type] += 1
+
+    with Session(engine) as session:
+        users = sqlalchemy.select(
+            *(getattr(User, c) for c in _USER_COLUMNS)).order_by(User.id)
+        for row in _stream(session, users):
+            user = row._asdict()
+            user['login_last'] = user['login_last'].isoformat()
+            write('user', user)
+
+        messages = sqlalchemy.select(
+            *(getattr(Message, c) for c in _MESSAGE_COLUMNS)).order_by(
+            Message.id)
+        for row in _stream(session, messages):
+            message = row._asdict()
+            message['datetime'] = message['datetime'].isoformat()
+            write('message', message)
+
+        reads = sqlalchemy.select(User.callsign, ReadState.bitmap).join(
+            ReadState, ReadState.user_id == User.id).order_by(User.id)
+        for callsign, bitmap in _stream(session, reads):
+            write('read', {'callsign': callsign,
+                           'runs': ReadSet.from_bytes(bitmap).runs})
+    return counts
+
+
+def export_mbox(engine: Engine, f: TextIO) -> dict:
+    count = 0
+    with Session(engine) as session:
+        messages = sqlalchemy.select(
+            *(getattr(Message, c) for c in _MESSAGE_COLUMNS)).order_by(
+            Message.id)
+        for message in _stream(session, messages):
+            sent = message.datetime.replace(tzinfo=timezone.utc)
+            f.write(f"From {message.sender} "
+                    f"{sent.strftime('%a %b %d %H:%M:%S %Y')}\n")
+            f.write(f"From: {message.sender}\n")
+            f.write(f"To: {message.recipient}\n")
+            f.write(f"Subject: {message.subject}\n")
+            f.write(f"Date: {email.utils.format_datetime(sent)}\n")
+            f.write(f"X-RSBBS-Id: {message.id}\n")
+            if message.is_private:
+                f.write("X-RSBBS-Private: yes\n")
+            f.write("\n")
+            for line in message.message.splitlines():
+                if _FROM_LINE.match(line):
+                    line = '>' + line
+                f.write(line + '\n')
+            f.write("\n")
+            count += 1
+    return {'message': count}
+
+
+#
+# Import
+#
+
+def import_file(engine: Engine, path: str) -> dict:
+    """Import a file written by export_file().
+
+    Users already in the database are left as they are. Messages keep
+    their IDs when the database has never had any, and are otherwise
+    numbered after every ID it has handed out.
+
+    :returns: how many of each kind of record were read
+
+    """
+    with _open(path, 'r') as f:
+        if _is_mbox(path):
+            return import_messages(engine, _parse_mbox(f))
+        return import_jsonl(engine, f)
+
+
+def _message_id_offset(engine: Engine) -> int:
+    # Number imported messages after every ID ever handed out, including
+    # those of deleted and archived messages, which are never reused
+    with engine.connect() as connection:
+        highest = connection.execute(
+            sqlalchemy.select(sqlalchemy.func.max(Message.id))).scalar()
+        sequence = connection.exec_driver_sql(
+            "SELECT seq FROM sqlite_sequence "
+            "WHERE name = 'message'").scalar()
+        return max(highest or 0, sequence or 0)
+
+
+def _parse_time(value: str) -> datetime:
+    # Times are stored in UTC without a zone
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+class _Batches():
+    """Collects rows for each of the given insert statements and inserts
+    them BATCH_SIZE at a time, each batch in one transaction.
+    """
+
+    def __init__(self, engine: Engine, **statements) -> None:
+        self.engine = engine
+        self.statements = statements
+        self.pending = {name: [] for name in statements}
+
+    def add(self, name: str, row: dict) -> None:
+        rows = self.pending[name]
+        rows.append(row)
+        if len(rows) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        if not any(self.pending.values()):
+            return
+        with self.engine.begin() as connection:
+            for name, rows in self.pending.items():
+                if rows:
+                    connection.execute(self.statements[name], rows)
+                    rows.clear()
+
+
+def import_jsonl(engine: Engine, lines: Iterable) -> dict:
+    counts = {'user': 0, 'message': 0, 'read': 0}
+    offset = _message_id_offset(engine)
+    batches = _Batches(engine,
+                       user=insert(User).on_conflict_do_nothing(),
+                       message=sqlalchemy.insert(Message))
+    reads = []
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        record_type = record.get('type')
+        if record_type == 'user':
+            user = {c: record.get(c) for c in _USER_COLUMNS}
+            user['login_count'] = user['login_count'] or 0
+            user['login_last'] = _parse_time(user['login_last'])
+            batches.add('user', user)
+        elif record_type == 'message':
+            message = {c: record[c] for c in _MESSAGE_COLUMNS}
+            message['id'] += offset
+            message['datetime'] = _parse_time(message['datetime'])
+            batches.add('message', message)
+        elif record_type == 'read':
+            reads.append((record['callsign'],
+                          [(first + offset, last + offset)
+                           for first, last in record['runs']]))
+            if len(reads) >= BATCH_SIZE:
+                batches.flush()
+                _import_read_state(engine, reads)
+        else:
+            logging.warning(f"import skipped line {number}: unknown record "
+                            f"type {record_type!r}")
+            continue
+        counts[record_type] += 1
+    # Read state refers to users and messages, so insert those first
+    batches.flush()
+    _import_read_state(engine, reads)
+    return counts
+
+
+_select_read_state = sqlalchemy.select(User.id, ReadState.bitmap).outerjoin(
+    ReadState, ReadState.user_id == User.id).where(
+    User.callsign == sqlalchemy.bindparam('callsign'))
+
+_upsert_read_state = insert(ReadState).values(
+    user_id=sqlalchemy.bindparam('user_id'),
+    bitmap=sqlalchemy.bindparam('bitmap'))
+_upsert_read_state = _upsert_read_state.on_conflict_do_update(
+    index_elements=[ReadState.user_id],
+    set_={'bitmap': _upsert_read_state.excluded.bitmap})
+
+# Messages in a run of read ones are no longer unread
+_delete_unread_run = sqlalchemy.delete(UnreadMessage).where(
+    UnreadMessage.callsign == sqlalchemy.bindparam('callsign'),
+    UnreadMessage.message_id.between(sqlalchemy.bindparam('first'),
+                                     sqlalchemy.bindparam('last')))
+
+
+def _import_read_state(engine: Engine, reads: list) -> None:
+    # Merge each (callsign, runs) into the user's read state, in one
+    # transaction, and empty the list
+    with engine.begin() as connection:
+        for callsign, runs in reads:
+            row = connection.execute(_select_read_state,
+                                     {'callsign': callsign}).first()
+            if row is None:
+                logging.warning(f"import skipped read state for unknown "
+                                f"user {callsign}")
+                continue
+            user_id, bitmap = row
+            existing = ReadSet.from_bytes(bitmap or b'').runs
+            connection.execute(_upsert_read_state, {
+                'user_id': user_id,
+                'bitmap': ReadSet.from_runs(existing + runs).to_bytes()})
+            if runs:
+                connection.execute(_delete_unread_run, [
+                    {'callsign': callsign, 'first': first, 'last': last}
+                    for first, last in runs])
+                # Read runs may reach past the last message exported, over
+                # messages deleted before then; a new message must not
+                # take one of those IDs and be read already
+                reserve_message_ids(connection, runs[-1][1])
+    reads.clear()
+
+
+def import_messages(engine: Engine, messages: Iterable) -> dict:
+    """Insert messages, given as dicts of column values without IDs."""
+    count = 0
+    batches = _Batches(engine, message=sqlalchemy.insert(Message))
+    for message in messages:
+        batches.add('message', message)
+        count += 1
+    batches.flush()
+    return {'message': count}
+
+
+def _parse_mbox(lines: Iterable) -> Iterator:
+    # Yield each message in an mbox file as a dict of column values
+    headers = None
+    body = []
+
+    def message():
+        # The blank line before the next From line belongs to the format
+        if body and body[-1] == '':
+            body.pop()
+        sent = email.utils.parsedate_to_datetime(headers['date'])
+        return {
+            'sender': headers.get('from', ''),
+            'recipient': headers.get('to', ''),
+            'subject': headers.get('subject', ''),
+            'message': '\n'.join(body) + '\n' if body else '',
+            'datetime': sent.astimezone(timezone.utc).replace(tzinfo=None),
+            'is_private': headers.get('x-rsbbs-private') == 'yes',
+        }
+
+    in_headers = False
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if line.startswith('From '):
+            if headers is not None:
+                yield message()
+            headers = {}
+            body = []
+            in_headers = True
+        elif headers is None:
+            continue
+        elif in_headers:
+            if line == '':
+                in_headers = False
+            else:
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+        else:
+            if _FROM_LINE.match(line[1:]) and line.startswith('>'):
+                line = line[1:]
+            body.append(line)
+    if headers is not None:
+        yield message()
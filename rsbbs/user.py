@@ -18,11 +18,15 @@
 
 import logging
 import sqlalchemy
+import sqlite3
 
 from typing import Any
 
 from datetime import datetime, timezone
 
+from sqlalchemy.dialects.sqlite import insert
+
+from rsbbs import queries
 from rsbbs.config import Config
 from rsbbs.controller import Controller
 from rsbbs.models import User as SAUser
@@ -32,57 +36,60 @@ class User():
     def __init__(self, config: Config, controller: Controller):
         self.controller = controller
         self.callsign = config.args.calling_station.upper()
-        self._user = self.get_or_create_user()
+        # Loaded by record_login(), or on first use if there is no login
+        self._user = None
+        self.unread_count = None
 
     def __getattr__(self, __name: str) -> Any:
+        if self._user is None:
+            self._user = self.get_or_create_user()
         return getattr(self._user, __name)
 
     def get_or_create_user(self):
         with self.controller.session() as session:
             session.expire_on_commit = False
             try:
-                statement = sqlalchemy.select(SAUser).where(
-                    SAUser.callsign == self.callsign)
-                exopts = {"prebuffer_rows": True}
-                result = session.execute(statement,
-                                         execution_options=exopts)
-                result = result.one_or_none()
-                if result:
-                    user = result[0]
-                    logging.info(f"User {result[0].callsign} found.")
-                    session.commit()
-                else:
-                    logging.info("User not found.")
-                    user = SAUser(
-                        callsign=self.callsign,
-                        login_count=1,
-                    )
-                    session.add(user)
-                    session.commit()
-                    logging.info("User added.")
+                session.execute(
+                    insert(SAUser).values(callsign=self.callsign,
+                                          login_count=0)
+                    .on_conflict_do_nothing())
+                user = session.execute(sqlalchemy.select(SAUser).where(
+                    SAUser.callsign == self.callsign)).scalar_one()
+                session.commit()
                 return user
             except Exception as e:
                 logging.error(e)
                 raise
 
     def record_login(self):
+        """Create or update the user for a new login.
+
+        This is one statement: an upsert that returns the user, with the
+        time of their previous login, and how many unread messages they
+        have for the greeting. SQLite before 3.35 can't return them, so
+        there they are selected after the upsert.
+        """
+        params = {'callsign': self.callsign,
+                  'now': datetime.now(timezone.utc)}
+        options = {'populate_existing': True}
         with self.controller.session() as session:
+            session.expire_on_commit = False
             try:
-                statement = sqlalchemy.select(SAUser).where(
-                    SAUser.callsign == self.callsign)
-                exopts = {"prebuffer_rows": True}
-                result = session.execute(statement,
-                                         execution_options=exopts)
-                result = result.one_or_none()
-                if result:
-                    user = result[0]
-                    self.login_last = user.login_last
-                    user.login_count = user.login_count + 1
-                    user.login_last = datetime.now(timezone.utc)
-                    session.commit()
-                    logging.info("User updated.")
+                if sqlite3.sqlite_version_info >= (3, 35):
+                    user, unread_count = session.execute(
+                        queries.LOGIN, params,
+                        execution_options=options).one()
                 else:
-                    logging.info("User not found.")
+                    session.execute(queries.RECORD_LOGIN, params)
+                    user, unread_count = session.execute(
+                        queries.LOGGED_IN, params,
+                        execution_options=options).one()
+                session.commit()
             except Exception as e:
                 logging.error(e)
                 raise
+        self._user = user
+        # A new user's last login is this one
+        self.login_last = user.login_previous or user.login_last
+        self.unread_count = unread_count or 0
+        logging.info(f"User {user.callsign} logged in.")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+from argparse import Namespace
+
+from rsbbs.config import Config
+
+
+class StationTestCase(unittest.TestCase):
+    """Test case with a Config whose files all live in a temporary
+    directory instead of the real user config, data and log directories.
+    """
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.tmpdir = tmpdir.name
+
+        environ = unittest.mock.patch.dict(os.environ, {
+            'HOME': self.tmpdir,
+            'XDG_CONFIG_HOME': os.path.join(self.tmpdir, 'config'),
+            'XDG_DATA_HOME': os.path.join(self.tmpdir, 'data'),
+            'XDG_STATE_HOME': os.path.join(self.tmpdir, 'state'),
+        })
+        environ.start()
+        self.addCleanup(environ.stop)
+
+    def make_config(self, **kwargs) -> Config:
+        args = Namespace(
+            archive=None,
+            calling_station='N0CALL',
+            command_stats=None,
+            config_file=None,
+            daemon=None,
+            debug=False,
+            export_file=None,
+            import_file=None,
+            log_level='INFO',
+            migrate=None,
+            purge=None,
+            serve=None,
+            show_config=None,
+            socket=None)
+        for key, value in kwargs.items():
+            setattr(args, key, value)
+        return Config(app_name='rsbbs', args=args)
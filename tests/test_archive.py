@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import io
+import os
+import re
+import unittest.mock
+
+from datetime import datetime, timedelta
+
+import sqlalchemy
+
+from sqlalchemy.orm import Session
+
+from rsbbs.archive import Archive
+from rsbbs.console import Console
+from rsbbs.controller import Controller
+from rsbbs.models import Message
+from rsbbs.user import User
+
+from tests.support import StationTestCase
+
+
+NOW = datetime(2023, 6, 1)
+
+
+class TestArchive(StationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        config = self.make_config(calling_station='W1AW')
+        config._config['archive'] = {'after_days': 30, 'batch_size': 4}
+        self.config = config
+        self.controller = Controller(config)
+        self.engine = self.controller.engine
+        self.addCleanup(self.engine.dispose)
+        # 1-6 are 100 days old, 7-9 are new; 2 and 8 are private to K1ABC
+        with self.engine.begin() as connection:
+            connection.execute(sqlalchemy.insert(Message), [
+                {'sender': 'K1ABC', 'recipient': 'K1ABC' if n in (2, 8)
+                 else 'W1AW', 'subject': f"hello {n}",
+                 'message': f"body {n}", 'is_private': n in (2, 8),
+                 'datetime': NOW - timedelta(days=100 if n <= 6 else 1)}
+                for n in range(1, 10)])
+        self.archive = Archive(self.engine, config.archive_path, 30,
+                               batch_size=4)
+        user = User(config, self.controller)
+        self.console = Console(config, self.controller, user)
+
+    def command(self, line: str) -> str:
+        with unittest.mock.patch('sys.stdout', new=io.StringIO()) as out:
+            args = self.console.parser.parse_args(line.split())
+            args.func(args)
+        return out.getvalue()
+
+    def listed(self, transcript: str) -> list:
+        return [int(n) for n in re.findall(r'^(\d+) ', transcript, re.M)]
+
+    def hot_ids(self) -> list:
+        with self.engine.connect() as connection:
+            return connection.execute(sqlalchemy.select(Message.id).order_by(
+                Message.id)).scalars().all()
+
+    def test_old_messages_move(self):
+        self.assertEqual(self.archive.run(NOW), 6)
+        self.assertEqual(self.hot_ids(), [7, 8, 9])
+        with self.controller.archive() as session:
+            self.assertEqual(session.execute(
+                sqlalchemy.select(Message.id).order_by(Message.id))
+                .scalars().all(), list(range(1, 7)))
+        # Nothing left to move, and the archive is left detached
+        self.assertEqual(self.archive.run(NOW), 0)
+        with self.engine.connect() as connection:
+            self.assertNotIn('archive', [
+                row[1] for row in connection.exec_driver_sql(
+                    "PRAGMA database_list")])
+
+    def send(self, subject: str) -> None:
+        with Session(self.engine) as session:
+            session.add(Message(sender='W1AW', recipient='K1ABC',
+                                subject=subject, message='body',
+                                is_private=False))
+            session.commit()
+
+    def archived(self) -> list:
+        with self.controller.archive() as session:
+            return session.execute(
+                sqlalchemy.select(Message.id, Message.subject)
+                .order_by(Message.id)).all()
+
+    def test_newest_message_is_archived_too(self):
+        self.assertEqual(self.archive.run(NOW + timedelta(days=365)), 9)
+        self.assertEqual(self.hot_ids(), [])
+        self.send('new')
+        self.assertEqual(self.hot_ids(), [10])
+
+    def test_deleting_the_newest_message_frees_no_ids(self):
+        self.archive.run(NOW)
+        # The caller deletes the newest message, then more arrive
+        with self.engine.begin() as connection:
+            connection.execute(sqlalchemy.delete(Message).where(
+                Message.id == 9))
+        self.send('new 1')
+        self.send('new 2')
+        self.assertEqual(self.hot_ids(), [7, 8, 10, 11])
+        self.archive.run(datetime(2100, 1, 1))
+        archived = self.archived()
+        self.assertEqual([id_ for id_, _ in archived],
+                         [1, 2, 3, 4, 5, 6, 7, 8, 10, 11])
+        self.assertEqual(archived[0], (1, 'hello 1'))
+
+    def test_ids_in_the_archive_are_reserved(self):
+        # A database that reused IDs before it was migrated
+        self.archive.run(NOW + timedelta(days=365))
+        with self.engine.begin() as connection:
+            connection.exec_driver_sql(
+                "UPDATE sqlite_sequence SET seq = 3 WHERE name = 'message'")
+        self.archive.run(NOW)
+        self.send('new')
+        self.assertEqual(self.hot_ids(), [10])
+
+    def test_read_does_not_create_the_archive(self):
+        self.assertIn("Message not found.", self.command('r 9999'))
+        self.assertFalse(os.path.exists(self.config.archive_path))
+        self.assertIn("No messages have been archived.",
+                      self.command('l --archive'))
+        self.assertFalse(os.path.exists(self.config.archive_path))
+
+        # Nor is an archive looked in once archiving is turned off
+        self.archive.run(NOW)
+        self.config._config['archive'] = {'after_days': None}
+        self.assertIn("Message not found.", self.command('r 3'))
+
+    def test_list_archive(self):
+        self.archive.run(NOW)
+        self.assertEqual(self.listed(self.command('l')), [9, 7])
+        self.assertEqual(self.listed(self.command('l --archive')),
+                         [6, 5, 4, 3, 1])
+        transcript = self.command('l -a 2 to:W1AW')
+        self.assertEqual(self.listed(transcript), [6, 5])
+        self.assertIn("More: l --archive to:W1AW <5", transcript)
+
+    def test_read_falls_back_to_archive(self):
+        self.archive.run(NOW)
+        transcript = self.command('r 3')
+        self.assertIn("Message: 3", transcript)
+        self.assertIn("body 3", transcript)
+        # Private messages stay private in the archive
+        self.assertIn("Message not found.", self.command('r 2'))
+        self.assertIn("Message not found.", self.command('r 99'))
+
+    def test_everyday_queries_skip_the_archive(self):
+        self.archive.run(NOW)
+        statements = []
+        sqlalchemy.event.listen(
+            self.engine, 'before_cursor_execute',
+            lambda *args: statements.append(args[2]))
+        self.command('l')
+        self.command('r 7')
+        self.assertFalse([s for s in statements if 'archive' in s.lower()])
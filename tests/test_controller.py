@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import multiprocessing
+
+import sqlalchemy
+
+from rsbbs.controller import Controller
+from rsbbs.models import Message
+
+from tests.support import StationTestCase
+
+
+ROUNDS = 50
+
+
+def send_messages(config, worker):
+    """Send messages one transaction at a time, as the send plugin does."""
+    controller = Controller(config)
+    for n in range(ROUNDS):
+        with controller.session() as session:
+            session.add(Message(
+                sender=f"K{worker}ABC",
+                recipient="W1AW",
+                subject=f"Message {n}",
+                message="Contention test",
+                is_private=False))
+            session.commit()
+
+
+def list_messages(config, worker):
+    """List messages, as the list plugin does."""
+    controller = Controller(config)
+    statement = sqlalchemy.select(Message).where(
+        sqlalchemy.or_(Message.is_private.is_(False),
+                       Message.recipient == "W1AW"))
+    for n in range(ROUNDS):
+        with controller.session() as session:
+            session.execute(statement).all()
+
+
+class TestController(StationTestCase):
+
+    def test_connection_profile(self):
+        config = self.make_config()
+        controller = Controller(config)
+        with controller.engine.connect() as connection:
+            def pragma(name):
+                return connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+            self.assertEqual(pragma('journal_mode'), 'wal')
+            self.assertEqual(pragma('synchronous'), 1)
+            self.assertEqual(pragma('busy_timeout'),
+                             config.sqlite['busy_timeout'])
+            self.assertEqual(pragma('cache_size'),
+                             config.sqlite['cache_size'])
+
+    def test_invalid_setting_is_refused(self):
+        config = self.make_config()
+        config.sqlite['journal_mode'] = 'WAL; DROP TABLE message'
+        with self.assertRaises(ValueError):
+            Controller(config)
+
+    def test_for_caller(self):
+        config = self.make_config(calling_station='W1AW')
+        controller = Controller(config)
+        self.addCleanup(controller.engine.dispose)
+        caller_config = config.for_caller('k1abc')
+        caller = controller.for_caller(caller_config)
+        # The caller has a configuration and session of their own, but
+        # shares the engine
+        self.assertEqual(caller_config.calling_station, 'K1ABC')
+        self.assertEqual(config.calling_station, 'W1AW')
+        self.assertEqual(caller_config.args.calling_station, 'k1abc')
+        self.assertEqual(config.args.calling_station, 'W1AW')
+        self.assertEqual(caller_config.db_path, config.db_path)
+        self.assertIs(caller.engine, controller.engine)
+        self.assertIsNot(caller.session(), controller.session())
+        self.assertEqual(caller.migrations_applied, [])
+        self.assertEqual(caller.has_archive, controller.has_archive)
+
+    def test_concurrent_processes(self):
+        config = self.make_config()
+        controller = Controller(config)
+
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=target, args=(config, worker))
+            for worker in range(4)
+            for target in (send_messages, list_messages)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(timeout=60)
+        self.assertEqual([p.exitcode for p in processes],
+                         [0] * len(processes))
+
+        with controller.session() as session:
+            count = session.execute(sqlalchemy.select(
+                sqlalchemy.func.count(Message.id))).scalar_one()
+        self.assertEqual(count, 4 * ROUNDS)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+from rsbbs import client
+from rsbbs.daemon import Daemon
+
+from tests.support import StationTestCase
+
+
+class TestDaemon(StationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.socket_path = os.path.join(self.tmpdir, 'rsbbs.sock')
+        config = self.make_config(daemon=True, socket=self.socket_path)
+        daemon = Daemon(config)
+
+        context = multiprocessing.get_context('fork')
+        self.process = context.Process(target=daemon.serve_forever)
+        self.process.start()
+        self.addCleanup(self.process.join)
+        self.addCleanup(self.process.terminate)
+
+        deadline = time.monotonic() + 10
+        while not os.path.exists(self.socket_path):
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def call(self, callsign: str, commands: bytes) -> str:
+        """Connect as a caller via the client and return the transcript."""
+        ours, theirs = socket.socketpair()
+        with ours, theirs:
+            thread = threading.Thread(
+                target=client.connect,
+                args=(self.socket_path, callsign,
+                      ours.fileno(), ours.fileno()))
+            thread.start()
+            theirs.sendall(commands)
+            theirs.shutdown(socket.SHUT_WR)
+            thread.join(timeout=10)
+            self.assertFalse(thread.is_alive())
+            ours.close()
+
+            transcript = []
+            while True:
+                chunk = theirs.recv(4096)
+                if not chunk:
+                    break
+                transcript.append(chunk)
+        return b''.join(transcript).decode()
+
+    def test_session(self):
+        transcript = self.call('k1abc', b'l\r\nb\r\n')
+        self.assertIn("Welcome to Really Simple BBS, K1ABC", transcript)
+        self.assertIn("MSG#", transcript)
+        self.assertIn("Bye!", transcript)
+
+    def test_sessions_get_their_own_caller(self):
+        self.call('k1abc', b's\r\nw1aw\r\nhello\r\nbody\r\n/ex\r\nb\r\n')
+        transcript = self.call('w1aw', b'lm\r\nb\r\n')
+        self.assertIn("Welcome to Really Simple BBS, W1AW", transcript)
+        self.assertRegex(transcript, r"1\s+W1AW\s+K1ABC\s+\S+\s+hello")
+
+    def test_caller_hangs_up(self):
+        transcript = self.call('k1abc', b'')
+        self.assertIn("Welcome to Really Simple BBS, K1ABC", transcript)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import io
+import json
+import os
+import unittest
+import unittest.mock
+
+from rsbbs.console import Console
+from rsbbs.controller import Controller
+from rsbbs.dispatch import UsageError
+from rsbbs.parser import Parser
+from rsbbs.user import User
+
+from tests.support import StationTestCase
+
+
+MANIFEST = os.path.join(os.path.dirname(__file__), '..', 'rsbbs',
+                        'plugins', 'manifest.json')
+
+
+class TestDispatch(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = Parser()
+        with open(MANIFEST) as f:
+            for commands in json.load(f).values():
+                for command in commands:
+                    self.parser.add_command(command, print)
+
+    def assertUsageError(self, line: str, message: str) -> None:
+        with self.assertRaises(UsageError) as raised:
+            self.parser.parse_args(line.split())
+        self.assertIn(message, str(raised.exception))
+
+    def test_same_arguments_as_argparse(self):
+        for line in ['b', 'r 12', 'k 3', 'l', 'l 5', 'l -a from:W1AW 5',
+                     'l from:W1AW --archive', 'lu since:today',
+                     'f antenna', 'f -n 5 antenna tuner', 'f --limit=2 a*',
+                     'sp --callsign w1aw --subject hi --message 73',
+                     's --subject hi', 'r -5', 'l -- -a']:
+            with self.subTest(line=line):
+                ours = vars(self.parser.parse_args(line.split()))
+                theirs = vars(self.parser.parser.parse_args(line.split()))
+                self.assertEqual(ours, theirs)
+
+    def test_errors(self):
+        self.assertUsageError('zz', "Unknown command zz")
+        self.assertUsageError('r', "r: missing number\r\nUsage: r number")
+        self.assertUsageError('r 1 2', "r: unexpected 2")
+        self.assertUsageError('l --bogus', "l: unknown option --bogus")
+        self.assertUsageError('f -n', "f: -n needs a value")
+        self.assertUsageError('f -n 5', "f: missing words")
+        self.assertUsageError('l -a=yes', "l: -a takes no value")
+
+    def test_empty_line(self):
+        self.assertIsNone(self.parser.parse_args([]))
+
+    def test_command_help(self):
+        self.assertUsageError('r -h', "Message number to read")
+
+    def test_eager_plugin_type(self):
+        command = self.parser.subparsers.add_parser('count', aliases=['c'])
+        command.add_argument('number', type=int)
+        command.add_argument('--step', type=int, default=1)
+        command.set_defaults(func=print)
+        args = self.parser.parse_args(['c', '7', '--step', '2'])
+        self.assertEqual((args.number, args.step, args.func), (7, 2, print))
+        self.assertUsageError('c seven', "c: bad number seven")
+        self.assertIn("count (c)", self.parser.format_help())
+
+
+class TestConsoleErrors(StationTestCase):
+
+    def test_error_goes_to_the_caller(self):
+        config = self.make_config(calling_station='W1AW')
+        controller = Controller(config)
+        self.addCleanup(controller.engine.dispose)
+        user = User(config, controller)
+        user.record_login()
+        console = Console(config, controller, user)
+        with unittest.mock.patch('sys.stdout', new=io.StringIO()) as out, \
+                unittest.mock.patch('sys.stdin',
+                                    new=io.StringIO('zz\n\nr\n')):
+            console.run()
+        self.assertIn("Unknown command zz. For help, enter 'h'",
+                      out.getvalue())
+        self.assertIn("r: missing number", out.getvalue())
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import tempfile
+import unittest
+
+import sqlalchemy
+
+from sqlalchemy.orm import Session
+
+from rsbbs import mailbox, migrations
+from rsbbs.models import Message, User
+
+
+class TestMailbox(unittest.TestCase):
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.engine = sqlalchemy.create_engine(
+            'sqlite:///' + os.path.join(tmpdir.name, 'messages.db'))
+        self.addCleanup(self.engine.dispose)
+
+    def send(self, session, recipient, count=1, is_private=False):
+        messages = [Message(sender='K1ABC', recipient=recipient,
+                            subject='hello', message='body',
+                            is_private=is_private)
+                    for _ in range(count)]
+        session.add_all(messages)
+        session.commit()
+        return [message.id for message in messages]
+
+    def unread_ids(self, session, callsign):
+        return [message.id for message in session.execute(
+            mailbox.select_unread(callsign)).scalars()]
+
+    def test_unread_lifecycle(self):
+        migrations.migrate(self.engine)
+        with Session(self.engine) as session:
+            user = User(callsign='W1AW', login_count=1)
+            session.add(user)
+            ids = self.send(session, 'W1AW', 3)
+            self.send(session, 'N0CALL', 2)
+            self.assertEqual(mailbox.unread_count(session, 'W1AW'), 3)
+            self.assertEqual(mailbox.unread_count(session, 'N0CALL'), 2)
+            self.assertEqual(mailbox.unread_count(session, 'K1ABC'), 0)
+
+            # Reading twice counts once
+            mailbox.mark_read(session, user, ids[:1])
+            mailbox.mark_read(session, user, ids[:1])
+            session.commit()
+            self.assertEqual(mailbox.unread_count(session, 'W1AW'), 2)
+            self.assertEqual(self.unread_ids(session, 'W1AW'), ids[1:])
+
+            # Deleting an unread message takes it off the count
+            session.execute(sqlalchemy.delete(Message).where(
+                Message.id == ids[2]))
+            session.commit()
+            self.assertEqual(mailbox.unread_count(session, 'W1AW'), 1)
+            self.assertEqual(self.unread_ids(session, 'W1AW'), ids[1:2])
+
+            # Deleting a read message leaves it alone
+            session.execute(sqlalchemy.delete(Message).where(
+                Message.id == ids[0]))
+            session.commit()
+            self.assertEqual(mailbox.unread_count(session, 'W1AW'), 1)
+
+    def test_migration_counts_existing_mail(self):
+        migrations.migrate(self.engine, 2)
+        with Session(self.engine) as session:
+            # The user model has columns this schema version doesn't
+            user_id = session.execute(sqlalchemy.text(
+                "INSERT INTO user (callsign, login_count, login_last) "
+                "VALUES ('W1AW', 1, '2023-01-01') RETURNING id")).scalar()
+            ids = self.send(session, 'W1AW', 3)
+            session.execute(
+                sqlalchemy.text("INSERT INTO user_message "
+                                "VALUES (:user_id, :message_id)"),
+                [{'user_id': user_id, 'message_id': id_}
+                 for id_ in ids[:2]])
+            session.commit()
+
+        migrations.migrate(self.engine)
+        with Session(self.engine) as session:
+            self.assertEqual(mailbox.unread_count(session, 'W1AW'), 1)
+            self.assertEqual(self.unread_ids(session, 'W1AW'), ids[2:])
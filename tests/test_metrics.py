@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import io
+import time
+import unittest
+import unittest.mock
+
+from datetime import datetime, timedelta, timezone
+
+import sqlalchemy
+
+from rsbbs import metrics
+from rsbbs.console import Console
+from rsbbs.controller import Controller
+from rsbbs.models import CommandMetric, Message
+from rsbbs.user import User
+
+from tests.support import StationTestCase
+
+
+class TestPercentile(unittest.TestCase):
+
+    def test_nearest_rank(self):
+        values = list(range(1, 21))
+        self.assertEqual(metrics.percentile(values, 50), 10)
+        self.assertEqual(metrics.percentile(values, 95), 19)
+        self.assertEqual(metrics.percentile(values, 100), 20)
+        self.assertEqual(metrics.percentile([7], 95), 7)
+        self.assertIsNone(metrics.percentile([], 50))
+
+
+class TestCommandMetrics(StationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.config = self.make_config(calling_station='W1AW')
+        self.controller = Controller(self.config)
+        self.engine = self.controller.engine
+        self.addCleanup(self.engine.dispose)
+        with self.engine.begin() as connection:
+            connection.execute(sqlalchemy.insert(Message), [
+                {'sender': 'K1ABC', 'recipient': 'W1AW',
+                 'subject': f"hello {n}", 'message': 'body',
+                 'is_private': False}
+                for n in range(5)])
+        user = User(self.config, self.controller)
+        user.record_login()
+        self.console = Console(self.config, self.controller, user)
+
+    def call(self, commands: str) -> None:
+        with unittest.mock.patch('sys.stdout', new=io.StringIO()), \
+                unittest.mock.patch('sys.stdin', new=io.StringIO(commands)):
+            self.console.run()
+
+    def stored(self) -> list:
+        with self.engine.connect() as connection:
+            return connection.execute(sqlalchemy.select(CommandMetric)
+                                      .order_by(CommandMetric.id)).all()
+
+    def test_commands_are_measured_and_stored(self):
+        with self.assertLogs(level='INFO') as logs:
+            self.call('l\nr 2\nr 3\nzz\n')
+        samples = self.stored()
+        self.assertEqual([s.command for s in samples],
+                         ['list', 'read', 'read'])
+        listing = samples[0]
+        self.assertGreater(listing.seconds, 0)
+        self.assertGreater(listing.statements, 0)
+        self.assertEqual(listing.rows, 5)
+        self.assertGreater(listing.bytes, 5 * len("hello 0"))
+        self.assertTrue(any("command read: 2 run(s)" in line
+                            for line in logs.output))
+
+        report = {c['command']: c for c in metrics.report(self.engine, 1)}
+        self.assertEqual(report['read']['count'], 2)
+        self.assertLessEqual(report['read']['p50'], report['read']['p95'])
+
+    def test_waiting_for_input_is_not_counted(self):
+        class SlowCaller(io.StringIO):
+            # Takes a while to type each line
+            def readline(self, *args):
+                time.sleep(0.1)
+                return super().readline(*args)
+
+        with unittest.mock.patch('sys.stdout', new=io.StringIO()), \
+                unittest.mock.patch('sys.stdin', new=SlowCaller(
+                    's\nK1ABC\nhello\nbody\n/ex\n')):
+            self.console.run()
+        sample, = self.stored()
+        self.assertEqual(sample.command, 'send')
+        # Four lines of input took 0.4 seconds to arrive
+        self.assertLess(sample.seconds, 0.2)
+        self.assertGreater(sample.seconds, 0)
+
+    def test_only_commands_are_counted(self):
+        # The greeting's queries run outside any command
+        self.call('')
+        self.assertEqual(self.stored(), [])
+
+    def test_old_samples_are_pruned(self):
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        with self.engine.begin() as connection:
+            connection.execute(sqlalchemy.insert(CommandMetric), [
+                {'datetime': now - timedelta(days=days),
+                 'command': 'list', 'seconds': 1.0, 'statements': 1,
+                 'rows': 1, 'bytes': 1}
+                for days in (1, 31)])
+        self.call('l\n')
+        self.assertEqual(len(self.stored()), 2)
+
+    def test_disabled(self):
+        self.config._config['metrics'] = {'enabled': False, 'keep_days': 30}
+        self.console = Console(self.config, self.controller,
+                               self.console.user)
+        self.call('l\n')
+        self.assertEqual(self.stored(), [])
+
+    def test_disabled_engine_does_not_count(self):
+        self.config._config['metrics'] = {'enabled': False, 'keep_days': 30}
+        controller = Controller(self.config)
+        self.addCleanup(controller.engine.dispose)
+        with controller.engine.connect() as connection:
+            self.assertNotIsInstance(connection.connection.driver_connection,
+                                     metrics.Connection)
+        self.assertFalse(sqlalchemy.event.contains(
+            controller.engine, 'before_cursor_execute',
+            metrics.count_statement))
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import sqlite3
+import tempfile
+import unittest
+import unittest.mock
+
+import sqlalchemy
+
+from sqlalchemy.orm import Session
+
+from rsbbs import migrations, readstate
+from rsbbs.models import Base
+
+
+# The schema as created by rsbbs before it had migrations
+UNVERSIONED_SCHEMA = """
+CREATE TABLE message (
+    id INTEGER NOT NULL, sender VARCHAR NOT NULL, recipient VARCHAR NOT NULL,
+    subject VARCHAR NOT NULL, message VARCHAR NOT NULL,
+    datetime DATETIME NOT NULL, is_private BOOLEAN NOT NULL,
+    PRIMARY KEY (id));
+CREATE TABLE user (
+    id INTEGER NOT NULL, callsign VARCHAR NOT NULL, given_name VARCHAR,
+    family_name VARCHAR, login_count INTEGER NOT NULL,
+    login_last DATETIME NOT NULL, PRIMARY KEY (id));
+CREATE TABLE user_message (
+    user_id INTEGER, message_id INTEGER,
+    FOREIGN KEY(user_id) REFERENCES user (id),
+    FOREIGN KEY(message_id) REFERENCES message (id));
+INSERT INTO message VALUES
+    (1, 'K1ABC', 'W1AW', 'hello', 'body', '2023-01-01 00:00:00', 0);
+INSERT INTO user VALUES
+    (1, 'W1AW', NULL, NULL, 3, '2023-01-01 00:00:00'),
+    (2, 'K1ABC', NULL, NULL, 1, '2023-01-01 00:00:00'),
+    (3, 'W1AW', NULL, NULL, 1, '2023-01-02 00:00:00');
+INSERT INTO user_message VALUES (1, 1), (1, 1), (3, 1), (NULL, 1);
+"""
+
+
+class TestMigrations(unittest.TestCase):
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.db_path = os.path.join(tmpdir.name, 'messages.db')
+        self.engine = sqlalchemy.create_engine('sqlite:///' + self.db_path)
+        self.addCleanup(self.engine.dispose)
+
+    def version(self) -> int:
+        with self.engine.connect() as connection:
+            return migrations.schema_version(connection)
+
+    def test_new_database(self):
+        applied = migrations.migrate(self.engine)
+        self.assertEqual(applied,
+                         list(range(1, migrations.SCHEMA_VERSION + 1)))
+        self.assertEqual(self.version(), migrations.SCHEMA_VERSION)
+
+    def test_current_database_is_left_alone(self):
+        migrations.migrate(self.engine)
+        self.assertEqual(migrations.migrate(self.engine), [])
+
+    def test_unversioned_database_keeps_its_data(self):
+        with sqlite3.connect(self.db_path) as connection:
+            connection.executescript(UNVERSIONED_SCHEMA)
+        migrations.migrate(self.engine)
+        self.assertEqual(self.version(), migrations.SCHEMA_VERSION)
+        with self.engine.connect() as connection:
+            subject = connection.exec_driver_sql(
+                "SELECT subject FROM message WHERE id = 1").scalar()
+        self.assertEqual(subject, 'hello')
+
+    def test_duplicate_users_are_merged(self):
+        with sqlite3.connect(self.db_path) as connection:
+            connection.executescript(UNVERSIONED_SCHEMA)
+        migrations.migrate(self.engine)
+        with Session(self.engine) as session:
+            users = session.execute(sqlalchemy.text(
+                "SELECT id, callsign FROM user ORDER BY id")).all()
+            self.assertEqual(users, [(1, 'W1AW'), (2, 'K1ABC')])
+            self.assertEqual(list(readstate.load(session, 1)), [1])
+            self.assertEqual(list(readstate.load(session, 2)), [])
+
+    def test_read_ids_are_not_reused(self):
+        # Before IDs were reserved, the newest message, which W1AW had read,
+        # was deleted
+        with sqlite3.connect(self.db_path) as connection:
+            connection.executescript(UNVERSIONED_SCHEMA)
+        migrations.migrate(self.engine, migrations.SCHEMA_VERSION - 1)
+        with self.engine.begin() as connection:
+            connection.exec_driver_sql(
+                "UPDATE read_state SET bitmap = ? WHERE user_id = 1",
+                (readstate.ReadSet([1, 2]).to_bytes(),))
+        migrations.migrate(self.engine)
+        with self.engine.begin() as connection:
+            connection.exec_driver_sql(
+                "INSERT INTO message (sender, recipient, subject, message, "
+                "datetime, is_private) VALUES ('K1ABC', 'W1AW', 'new', "
+                "'body', '2023-01-03 00:00:00', 0)")
+            self.assertEqual(connection.exec_driver_sql(
+                "SELECT MAX(id) FROM message").scalar(), 3)
+
+    def test_newer_database_is_refused(self):
+        with sqlite3.connect(self.db_path) as connection:
+            connection.execute(
+                f"PRAGMA user_version = {migrations.SCHEMA_VERSION + 1}")
+        with self.assertRaises(RuntimeError):
+            migrations.migrate(self.engine)
+
+    def test_failed_migration_rolls_back(self):
+        def broken(connection):
+            connection.exec_driver_sql("CREATE TABLE scratch (id INTEGER)")
+            raise ValueError("broken")
+        migrations.migrate(self.engine)
+        migrations.MIGRATIONS.append(broken)
+        self.addCleanup(migrations.MIGRATIONS.remove, broken)
+        with unittest.mock.patch.object(
+                migrations, 'SCHEMA_VERSION', len(migrations.MIGRATIONS)):
+            with self.assertRaises(ValueError):
+                migrations.migrate(self.engine)
+        self.assertEqual(self.version(), len(migrations.MIGRATIONS) - 1)
+        self.assertNotIn('scratch',
+                         sqlalchemy.inspect(self.engine).get_table_names())
+
+    def test_migrations_match_models(self):
+        migrations.migrate(self.engine)
+        inspector = sqlalchemy.inspect(self.engine)
+        # Full-text indexes and their shadow tables have no models
+        with self.engine.connect() as connection:
+            virtual_tables = connection.exec_driver_sql(
+                "SELECT name FROM sqlite_master "
+                "WHERE sql LIKE 'CREATE VIRTUAL TABLE%'").scalars().all()
+        tables = {name for name in inspector.get_table_names()
+                  if not any(name == v or name.startswith(v + '_')
+                             for v in virtual_tables)}
+        self.assertEqual(tables, set(Base.metadata.tables))
+        for name, table in Base.metadata.tables.items():
+            with self.subTest(table=name):
+                self.assertEqual(
+                    {c['name'] for c in inspector.get_columns(name)},
+                    {c.name for c in table.columns})
+                self.assertEqual(
+                    {(i['name'], bool(i['unique']))
+                     for i in inspector.get_indexes(name)},
+                    {(i.name, i.unique) for i in table.indexes})
+                self.assertEqual(
+                    inspector.get_pk_constraint(name)['constrained_columns'],
+                    [c.name for c in table.primary_key])
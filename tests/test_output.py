@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import io
+import threading
+import unittest
+import unittest.mock
+
+from rsbbs.console import Console
+from rsbbs.controller import Controller
+from rsbbs.output import PacketWriter
+from rsbbs.user import User
+
+from tests.support import StationTestCase
+
+
+class Link(io.RawIOBase):
+    """A stdout buffer that records each write, as a frame on the air."""
+
+    def __init__(self):
+        self.frames = []
+        self.written = threading.Event()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.frames.append(bytes(data))
+        self.written.set()
+        return len(data)
+
+
+def stdout(link: Link) -> io.TextIOWrapper:
+    return io.TextIOWrapper(io.BufferedWriter(link), newline='')
+
+
+class TestPacketWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.link = Link()
+        patch = unittest.mock.patch('sys.stdout', new=stdout(self.link))
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_full_frames(self):
+        writer = PacketWriter(paclen=64, delay=0)
+        lines = [f"{n: <5} W1AW      K1ABC     hello\r\n" for n in range(20)]
+        for line in lines:
+            writer.write(line)
+        self.assertTrue(self.link.frames)
+        self.assertTrue(all(len(f) == 64 for f in self.link.frames))
+        writer.flush()
+        self.assertEqual(b''.join(self.link.frames), ''.join(lines).encode())
+        self.assertLess(len(self.link.frames[-1]), 64)
+
+    def test_long_write(self):
+        writer = PacketWriter(paclen=16, delay=0)
+        writer.write('x' * 40)
+        writer.flush()
+        self.assertEqual([len(f) for f in self.link.frames], [16, 16, 8])
+
+    def test_flush_after_delay(self):
+        writer = PacketWriter(paclen=256, delay=0.01)
+        writer.write('ENTER COMMAND >\r\n')
+        self.assertTrue(self.link.written.wait(5))
+        self.assertEqual(self.link.frames, [b'ENTER COMMAND >\r\n'])
+
+    def test_write_through(self):
+        writer = PacketWriter(paclen=0)
+        writer.write('one\r\n')
+        writer.write('two\r\n')
+        self.assertEqual(self.link.frames, [b'one\r\n', b'two\r\n'])
+
+    def test_text_stream(self):
+        # No binary buffer to write to, as in the command tests
+        writer = PacketWriter(paclen=256, delay=0)
+        with unittest.mock.patch('sys.stdout', new=io.StringIO()) as out:
+            writer.write('hello\r\n')
+            self.assertEqual(out.getvalue(), 'hello\r\n')
+
+
+class TestConsoleOutput(StationTestCase):
+
+    def test_prompt_flushes(self):
+        config = self.make_config(calling_station='W1AW')
+        config._config['output_delay'] = 0
+        controller = Controller(config)
+        self.addCleanup(controller.engine.dispose)
+        console = Console(config, controller, User(config, controller))
+        link = Link()
+        with unittest.mock.patch('sys.stdout', new=stdout(link)), \
+                unittest.mock.patch('sys.stdin', new=io.StringIO('K1ABC\n')):
+            console.write_output('Message to K1ABC')
+            self.assertEqual(link.frames, [])
+            self.assertEqual(console.read_line('To:'), 'K1ABC')
+        self.assertEqual(link.frames, [b'Message to K1ABC\r\nTo:\r\n'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import io
+import unittest.mock
+
+import sqlalchemy
+
+from rsbbs import mailbox
+from rsbbs.console import Console, OutputAborted
+from rsbbs.controller import Controller
+from rsbbs.models import Message
+from rsbbs.user import User
+
+from tests.support import StationTestCase
+
+
+MORE = "-- More"
+
+
+class TestPager(StationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.config = self.make_config(calling_station='W1AW')
+        self.config._config['screen_lines'] = 5
+        self.controller = Controller(self.config)
+        self.engine = self.controller.engine
+        self.addCleanup(self.engine.dispose)
+        user = User(self.config, self.controller)
+        user.record_login()
+        self.console = Console(self.config, self.controller, user)
+
+    def send(self, count: int, body: str = 'body') -> None:
+        with self.engine.begin() as connection:
+            connection.execute(sqlalchemy.insert(Message), [
+                {'sender': 'K1ABC', 'recipient': 'W1AW',
+                 'subject': f"hello {n}", 'message': body,
+                 'is_private': False}
+                for n in range(count)])
+
+    def command(self, line: str, stdin: str = '') -> str:
+        self.out = io.StringIO()
+        with unittest.mock.patch('sys.stdout', new=self.out), \
+                unittest.mock.patch('sys.stdin', new=io.StringIO(stdin)):
+            args = self.console.parser.parse_args(line.split())
+            args.func(args)
+        return self.out.getvalue()
+
+    def test_continue(self):
+        self.send(10)
+        output = self.command('l 10', '\n\n')
+        self.assertEqual(output.count(MORE), 2)
+        for n in range(1, 11):
+            self.assertIn(f"hello {n - 1}", output)
+
+    def test_quit_closes_the_cursor(self):
+        self.send(30)
+        with self.assertRaises(OutputAborted):
+            self.command('l 0', 'q\n')
+        lines = self.out.getvalue().splitlines()
+        # The header, four messages and the prompt
+        self.assertEqual(len(lines), 6)
+        self.assertTrue(lines[-1].startswith(MORE))
+        self.assertEqual(self.engine.pool.checkedout(), 0)
+
+    def test_skip_and_quit_reading(self):
+        self.send(3, '\r\n'.join(f"line {n}" for n in range(10)))
+        with self.assertRaises(OutputAborted):
+            # Skip the rest of the first message, go on to the second and
+            # quit partway through it
+            self.command('rm', 's\n\nq\n')
+        output = self.out.getvalue()
+        self.assertIn("Message: 2", output)
+        self.assertNotIn("Message: 3", output)
+        self.assertNotIn("line 9", output)
+        # The messages the caller started reading count as read
+        with self.engine.connect() as connection:
+            unread = connection.execute(
+                mailbox.select_unread_ids('W1AW')).scalars().all()
+        self.assertEqual(unread, [3])
+
+    def test_short_output(self):
+        self.send(2)
+        output = self.command('l')
+        self.assertNotIn(MORE, output)
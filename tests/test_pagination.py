@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import io
+import re
+import unittest.mock
+
+from argparse import Namespace
+from datetime import date, datetime
+
+import sqlalchemy
+
+from rsbbs.console import Console
+from rsbbs.controller import Controller
+from rsbbs.models import Message
+from rsbbs.pagination import Page, parse_date
+
+from tests.support import StationTestCase
+
+
+class TestPage(StationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        config = self.make_config()
+        # Nobody is there to answer a more prompt
+        config._config['screen_lines'] = 0
+        self.controller = Controller(config)
+        self.addCleanup(self.controller.engine.dispose)
+        self.console = Console(config, self.controller, None)
+        with self.controller.session() as session:
+            session.add_all(
+                Message(sender='K1ABC', recipient='N0CALL',
+                        subject=f"hello {n}", message='body',
+                        is_private=False)
+                for n in range(50))
+            session.commit()
+
+    def command(self, line: str) -> str:
+        with unittest.mock.patch('sys.stdout', new=io.StringIO()) as out:
+            args = self.console.parser.parse_args(line.split())
+            args.func(args)
+        return out.getvalue()
+
+    def listed(self, transcript: str) -> list:
+        return [int(n) for n in re.findall(r'^(\d+) ', transcript, re.M)]
+
+    def test_parse(self):
+        def parse(spec):
+            criteria = [spec] if spec else []
+            page = Page.from_args(Namespace(command='l', criteria=criteria),
+                                  20)
+            return page.limit, page.first, page.last, page.before
+
+        self.assertEqual(parse(None), (20, None, None, None))
+        self.assertEqual(parse('5'), (5, None, None, None))
+        self.assertEqual(parse('<30'), (20, None, None, 30))
+        self.assertEqual(parse('30-'), (20, 30, None, None))
+        self.assertEqual(parse('30-40'), (20, 30, 40, None))
+        for spec in ('x', '-5', '40-30', '<', '5-<6'):
+            with self.assertRaises(ValueError):
+                parse(spec)
+
+    def test_page_back_from_newest(self):
+        transcript = self.command('l')
+        self.assertEqual(self.listed(transcript), list(range(50, 30, -1)))
+        self.assertIn("More: l <31", transcript)
+
+        transcript = self.command('list <31')
+        self.assertEqual(self.listed(transcript), list(range(30, 10, -1)))
+        self.assertIn("More: list <11", transcript)
+
+        transcript = self.command('l <11')
+        self.assertEqual(self.listed(transcript), list(range(10, 0, -1)))
+        self.assertNotIn("More:", transcript)
+
+    def test_page_forward(self):
+        transcript = self.command('lm 15-')
+        self.assertEqual(self.listed(transcript), list(range(15, 35)))
+        self.assertIn("More: lm 35-", transcript)
+
+        transcript = self.command('lm 35-45')
+        self.assertEqual(self.listed(transcript), list(range(35, 46)))
+        self.assertNotIn("More:", transcript)
+
+        transcript = self.command('lu 10-40')
+        self.assertEqual(self.listed(transcript), list(range(10, 30)))
+        self.assertIn("More: lu 30-40", transcript)
+
+    def test_count(self):
+        transcript = self.command('l 3')
+        self.assertEqual(self.listed(transcript), [50, 49, 48])
+        self.assertIn("More: l <48", transcript)
+
+    def test_invalid_range(self):
+        transcript = self.command('l 9-1')
+        self.assertIn("Invalid range '9-1'", transcript)
+        self.assertEqual(self.listed(transcript), [])
+
+    def test_parse_date(self):
+        # A Wednesday
+        today = date(2023, 6, 14)
+        self.assertEqual(parse_date('today', today), today)
+        self.assertEqual(parse_date('Yesterday', today), date(2023, 6, 13))
+        self.assertEqual(parse_date('monday', today), date(2023, 6, 12))
+        self.assertEqual(parse_date('wed', today), today)
+        self.assertEqual(parse_date('thu', today), date(2023, 6, 8))
+        self.assertEqual(parse_date('10d', today), date(2023, 6, 4))
+        self.assertEqual(parse_date('2023-01-31', today), date(2023, 1, 31))
+        for value in ('mo', 'someday', '2023-02-30', 'd'):
+            with self.assertRaises(ValueError):
+                parse_date(value, today)
+
+    def test_filters(self):
+        with self.controller.session() as session:
+            session.add_all([
+                Message(sender='W5XYZ', recipient='ALL', subject='swap',
+                        message='body', is_private=False,
+                        datetime=datetime(2023, 6, day))
+                for day in range(1, 11)])
+            session.add(Message(sender='W5XYZ', recipient='K1ABC',
+                                subject='secret', message='body',
+                                is_private=True,
+                                datetime=datetime(2023, 6, 5)))
+            session.commit()
+        # Messages 51-60 are from W5XYZ to ALL on June 1-10, and 61 is
+        # private to someone else
+        self.assertEqual(self.listed(self.command('l from:w5xyz')),
+                         list(range(60, 50, -1)))
+        self.assertEqual(self.listed(self.command('lm from:W5XYZ')), [])
+        self.assertEqual(
+            self.listed(self.command('l to:ALL since:2023-06-04 '
+                                     'before:2023-06-07')),
+            [56, 55, 54])
+
+        transcript = self.command('l 2 from:W5XYZ before:2023-06-07')
+        self.assertEqual(self.listed(transcript), [56, 55])
+        self.assertIn("More: l from:W5XYZ before:2023-06-07 <55",
+                      transcript)
+
+        transcript = self.command('l since:2023-06-09 from:W5XYZ 52-')
+        self.assertEqual(self.listed(transcript), [59, 60])
+
+        for line, error in (('l from:', "Nothing after 'from:'"),
+                            ('l since:someday', "Invalid date 'someday'"),
+                            ('l 5 <10', "Give just one range")):
+            with self.subTest(line=line):
+                self.assertIn(error, self.command(line))
+
+    def test_filters_use_indexes(self):
+        page = Page.from_args(
+            Namespace(command='l', criteria=['from:W5XYZ', 'since:mon']),
+            20)
+        statement = page.apply(sqlalchemy.select(Message.id))
+        with self.controller.engine.connect() as connection:
+            plan = ' '.join(row[3] for row in connection.execute(
+                sqlalchemy.text(f"EXPLAIN QUERY PLAN {statement}"),
+                statement.compile().params))
+        self.assertIn('ix_message_sender_datetime (sender=? AND datetime>?)',
+                      plan)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import io
+import sys
+import unittest
+import unittest.mock
+
+from types import SimpleNamespace
+
+from rsbbs.parser import Parser
+from rsbbs.pluginloader import PluginLoader
+
+
+class TestPluginLoader(unittest.TestCase):
+
+    def setUp(self):
+        # Forget any plugins imported by earlier tests
+        for name in list(sys.modules):
+            if name.startswith('rsbbs.plugins.'):
+                del sys.modules[name]
+        self.api = SimpleNamespace(
+            parser=Parser(),
+            config=SimpleNamespace(debug=False),
+            write_output=lambda output: sys.stdout.write(output + '\r\n'))
+        self.loader = PluginLoader(self.api)
+
+    def imported_plugins(self) -> set:
+        return {name.split('.')[2]
+                for name in sys.modules
+                if name.startswith('rsbbs.plugins.')
+                and name.endswith('.plugin')}
+
+    def test_manifest_is_current(self):
+        self.assertEqual(
+            self.loader.manifest, self.loader.generate_manifest(),
+            "plugin manifest is stale; run python -m rsbbs.pluginloader")
+
+    def test_load_plugins_imports_nothing(self):
+        self.loader.load_plugins()
+        self.assertEqual(self.imported_plugins(), set())
+        self.assertEqual(self.loader.plugins, [])
+
+    @unittest.mock.patch('sys.stdout', new_callable=io.StringIO)
+    def test_command_loads_its_plugin(self, mock_stdout):
+        self.loader.load_plugins()
+        args = self.api.parser.parse_args(['?'])
+        args.func(args)
+        self.assertEqual(self.imported_plugins(), {'help'})
+        self.assertIn("Sign off and disconnect", mock_stdout.getvalue())
+
+        # Only the first command pays for loading
+        args.func(args)
+        self.assertEqual(len(self.loader.plugins), 1)
+
+    def test_plugins_missing_from_manifest_load_eagerly(self):
+        manifest = self.loader.manifest
+        del manifest['help']
+        with unittest.mock.patch.object(PluginLoader, 'manifest', manifest):
+            self.loader.load_plugins()
+        self.assertEqual(self.imported_plugins(), {'help'})
+        args = self.api.parser.parse_args(['h'])
+        self.assertIs(args.func.__self__, self.loader.plugins[0])
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import io
+import unittest.mock
+
+from rsbbs import queries
+from rsbbs.console import Console
+from rsbbs.controller import Controller
+from rsbbs.models import Message
+from rsbbs.user import User
+
+from tests.support import StationTestCase
+
+
+class TestQueries(StationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        config = self.make_config(calling_station='W1AW')
+        self.controller = Controller(config)
+        self.engine = self.controller.engine
+        self.addCleanup(self.engine.dispose)
+        with self.controller.session() as session:
+            session.add(Message(sender='K1ABC', recipient='W1AW',
+                                subject='hello', message='body',
+                                is_private=True))
+            session.commit()
+        user = User(config, self.controller)
+        user.record_login()
+        self.console = Console(config, self.controller, user)
+
+    def command(self, line: str) -> str:
+        with unittest.mock.patch('sys.stdout', new=io.StringIO()) as out:
+            args = self.console.parser.parse_args(line.split())
+            args.func(args)
+        return out.getvalue()
+
+    def test_commands_use_the_warm_cache(self):
+        self.assertEqual(queries.warm(self.engine), 9)
+        # The statement cache is the engine's, keyed by statement shape.
+        # Reading also records the message as read, which isn't warmed.
+        cache = self.engine._compiled_cache
+        compiled = len(cache)
+        for line in ('l', 'lm', 'lu', 'st'):
+            with self.subTest(line=line):
+                self.assertIn('hello' if line != 'st' else 'Messages: 1',
+                              self.command(line))
+                self.assertEqual(len(cache), compiled)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import io
+import unittest.mock
+
+import sqlalchemy
+
+from rsbbs import mailbox
+from rsbbs.console import Console
+from rsbbs.controller import Controller
+from rsbbs.models import Message
+from rsbbs.user import User
+
+from tests.support import StationTestCase
+
+
+class TestReadReceipts(StationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.config = self.make_config(calling_station='W1AW')
+        self.controller = Controller(self.config)
+        self.engine = self.controller.engine
+        self.addCleanup(self.engine.dispose)
+        with self.engine.begin() as connection:
+            connection.execute(sqlalchemy.insert(Message), [
+                {'sender': 'K1ABC', 'recipient': 'W1AW',
+                 'subject': f"hello {n}", 'message': 'body',
+                 'is_private': True}
+                for n in range(7)])
+        user = User(self.config, self.controller)
+        user.record_login()
+        self.console = Console(self.config, self.controller, user)
+        self.commits = 0
+
+        def count(connection):
+            self.commits += 1
+        sqlalchemy.event.listen(self.engine, 'commit', count)
+
+    def command(self, line: str, stdin: str) -> str:
+        with unittest.mock.patch('sys.stdout', new=io.StringIO()) as out, \
+                unittest.mock.patch('sys.stdin', new=io.StringIO(stdin)):
+            args = self.console.parser.parse_args(line.split())
+            args.func(args)
+        return out.getvalue()
+
+    def unread(self) -> list:
+        with self.engine.connect() as connection:
+            return connection.execute(
+                mailbox.select_unread_ids('W1AW')).scalars().all()
+
+    def test_group_commit(self):
+        self.config._config['read_receipt_batch'] = 3
+        self.command('ru', '\n' * 7)
+        self.assertEqual(self.unread(), [])
+        # Every third message, and the last one at the end
+        self.assertEqual(self.commits, 3)
+
+    def test_commit_at_end(self):
+        self.config._config['read_receipt_batch'] = 0
+        self.command('rm', '\n' * 7)
+        self.assertEqual(self.unread(), [])
+        self.assertEqual(self.commits, 1)
+
+    def test_disconnect(self):
+        # The caller reads two messages and hangs up at the third prompt
+        self.config._config['read_receipt_batch'] = 0
+        with self.assertRaises(SystemExit):
+            self.command('ru', '\n\n')
+        self.assertEqual(self.unread(), [4, 5, 6, 7])
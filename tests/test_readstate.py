@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import random
+import tempfile
+import unittest
+
+import sqlalchemy
+
+from sqlalchemy.orm import Session
+
+from rsbbs import migrations, readstate
+from rsbbs.models import Message, User
+from rsbbs.readstate import ReadSet
+
+
+class TestReadSet(unittest.TestCase):
+
+    def test_runs(self):
+        read_set = ReadSet([5, 1, 2, 3, 9, 7])
+        self.assertEqual(read_set.runs, [(1, 3), (5, 5), (7, 7), (9, 9)])
+        read_set.add(6)
+        self.assertEqual(read_set.runs, [(1, 3), (5, 7), (9, 9)])
+        read_set.update([4, 8])
+        self.assertEqual(read_set.runs, [(1, 9)])
+        self.assertEqual(len(read_set), 9)
+
+    def test_membership(self):
+        ids = random.Random(1).sample(range(1, 5000), 1500)
+        read_set = ReadSet(ids)
+        self.assertEqual(list(read_set), sorted(ids))
+        for message_id in range(0, 5001):
+            self.assertEqual(message_id in read_set, message_id in ids)
+
+    def test_round_trip(self):
+        for ids in ([], [0], [1, 2, 3], [127, 128, 300, 2 ** 40],
+                    random.Random(2).sample(range(100000), 5000)):
+            with self.subTest(ids=ids[:5]):
+                read_set = ReadSet(ids)
+                self.assertEqual(ReadSet.from_bytes(read_set.to_bytes()),
+                                 read_set)
+
+    def test_compact(self):
+        # Reading everything, or nearly, takes next to no space
+        self.assertEqual(len(ReadSet(range(1, 100001)).to_bytes()), 4)
+        ids = [n for n in range(1, 100001) if n % 1000]
+        self.assertLess(len(ReadSet(ids).to_bytes()), 500)
+
+
+class TestReadStateStore(unittest.TestCase):
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.engine = sqlalchemy.create_engine(
+            'sqlite:///' + os.path.join(tmpdir.name, 'messages.db'))
+        self.addCleanup(self.engine.dispose)
+        migrations.migrate(self.engine)
+
+    def test_mark_read(self):
+        with Session(self.engine) as session:
+            user = User(callsign='W1AW', login_count=1)
+            session.add(user)
+            session.commit()
+            user_id = user.id
+            self.assertFalse(readstate.has_read(session, user_id, 1))
+
+            readstate.mark_read(session, user_id, [1])
+            readstate.mark_read(session, user_id, [2, 3, 10])
+            session.commit()
+
+        with Session(self.engine) as session:
+            self.assertTrue(readstate.has_read(session, user_id, 2))
+            self.assertFalse(readstate.has_read(session, user_id, 4))
+            self.assertEqual(list(readstate.load(session, user_id)),
+                             [1, 2, 3, 10])
+
+    def test_new_message_is_not_read_after_a_deletion(self):
+        with Session(self.engine) as session:
+            user = User(callsign='W1AW', login_count=1)
+            message = Message(sender='K1ABC', recipient='W1AW',
+                              subject='hello', message='body',
+                              is_private=False)
+            session.add_all([user, message])
+            session.commit()
+            readstate.mark_read(session, user.id, [message.id])
+            session.delete(message)
+            session.commit()
+
+            # The new message doesn't take the deleted one's ID, nor its
+            # read bit
+            message = Message(sender='K1ABC', recipient='W1AW',
+                              subject='again', message='body',
+                              is_private=False)
+            session.add(message)
+            session.commit()
+            self.assertEqual(message.id, 2)
+            self.assertFalse(readstate.has_read(session, user.id, 2))
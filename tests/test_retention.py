@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+
+from datetime import datetime, timedelta
+
+import sqlalchemy
+
+from sqlalchemy.orm import Session
+
+from rsbbs import mailbox, migrations, readstate
+from rsbbs.controller import Controller
+from rsbbs.models import Message, User
+from rsbbs.retention import Retention
+
+from tests.support import StationTestCase
+
+
+NOW = datetime(2023, 6, 1)
+
+
+class TestRetention(StationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.controller = Controller(self.make_config())
+        self.engine = self.controller.engine
+        self.addCleanup(self.engine.dispose)
+
+    def send(self, recipient: str, days_old: int, count: int = 1,
+             is_private: bool = False, body: str = 'body') -> None:
+        with self.engine.begin() as connection:
+            connection.execute(sqlalchemy.insert(Message), [
+                {'sender': 'K1ABC', 'recipient': recipient,
+                 'subject': 'hello', 'message': body,
+                 'is_private': is_private,
+                 'datetime': NOW - timedelta(days=days_old)}
+                for _ in range(count)])
+
+    def ids(self) -> list:
+        with self.engine.connect() as connection:
+            return connection.execute(sqlalchemy.select(Message.id).order_by(
+                Message.id)).scalars().all()
+
+    def test_max_age(self):
+        self.send('W1AW', 100, 3)                   # 1-3
+        self.send('W1AW', 100, 2, is_private=True)  # 4-5
+        self.send('W1AW', 50, 2, is_private=True)   # 6-7
+        self.send('W1AW', 10, 2)                    # 8-9
+        retention = Retention(self.engine, {'max_age_days': 30,
+                                            'batch_size': 2})
+        self.assertEqual(retention.purge_expired(NOW), 7)
+        self.assertEqual(self.ids(), [8, 9])
+
+    def test_keep_private(self):
+        self.send('W1AW', 100, 3)                   # 1-3
+        self.send('W1AW', 100, 2, is_private=True)  # 4-5
+        self.send('W1AW', 50, 2, is_private=True)   # 6-7
+        self.send('W1AW', 10, 2)                    # 8-9
+        retention = Retention(self.engine, {'max_age_days': 30,
+                                            'keep_private_days': 60})
+        self.assertEqual(retention.purge_expired(NOW), 5)
+        self.assertEqual(self.ids(), [6, 7, 8, 9])
+
+        # Private messages can also expire with no limit on public ones
+        retention = Retention(self.engine, {'keep_private_days': 20})
+        self.assertEqual(retention.purge_expired(NOW), 2)
+        self.assertEqual(self.ids(), [8, 9])
+
+    def test_max_per_recipient(self):
+        self.send('W1AW', 5, 5)     # 1-5
+        self.send('K1ABC', 5, 2)    # 6-7
+        self.send('W1AW', 1, 2)     # 8-9
+        retention = Retention(self.engine, {'max_per_recipient': 3,
+                                            'batch_size': 1})
+        self.assertEqual(retention.purge_excess(), 4)
+        self.assertEqual(self.ids(), [5, 6, 7, 8, 9])
+        with Session(self.engine) as session:
+            self.assertEqual(mailbox.unread_count(session, 'W1AW'), 3)
+
+    def test_purging_the_newest_message_frees_no_ids(self):
+        self.send('W1AW', 100, 4)   # 1-4
+        with Session(self.engine) as session:
+            user = User(callsign='W1AW', login_count=1)
+            session.add(user)
+            session.flush()
+            mailbox.mark_read(session, user, [1, 2, 3, 4])
+            session.commit()
+            user_id = user.id
+
+        Retention(self.engine, {'max_age_days': 30}).run(NOW)
+        self.assertEqual(self.ids(), [])
+        # A new message is numbered after the purged ones, and is unread
+        self.send('W1AW', 0)
+        self.assertEqual(self.ids(), [5])
+        with Session(self.engine) as session:
+            self.assertFalse(readstate.has_read(session, user_id, 5))
+            self.assertEqual(mailbox.unread_count(session, 'W1AW'), 1)
+
+    def test_purged_messages_leave_the_indexes(self):
+        self.send('W1AW', 100, 2, body='sporadic')
+        self.send('W1AW', 1, body='sporadic')
+        Retention(self.engine, {'max_age_days': 30}).run(NOW)
+        with self.engine.connect() as connection:
+            self.assertEqual(connection.exec_driver_sql(
+                "SELECT rowid FROM message_fts "
+                "WHERE message_fts MATCH 'sporadic'").scalars().all(), [3])
+            self.assertEqual(connection.exec_driver_sql(
+                "SELECT message_id FROM unread_message").scalars().all(),
+                [3])
+
+    def test_space_is_reclaimed_incrementally(self):
+        self.send('W1AW', 100, 200, body='x' * 2000)
+        with self.engine.connect() as connection:
+            self.assertEqual(connection.exec_driver_sql(
+                "PRAGMA auto_vacuum").scalar(), 2)
+            connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        size = os.path.getsize(self.controller.config.db_path)
+        summary = Retention(self.engine, {'max_age_days': 30}).run(NOW)
+        self.assertGreater(summary['pages'], 0)
+        with self.engine.connect() as connection:
+            self.assertEqual(connection.exec_driver_sql(
+                "PRAGMA freelist_count").scalar(), 0)
+            connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.assertLess(os.path.getsize(self.controller.config.db_path),
+                        size)
+
+    def test_older_database_is_converted(self):
+        engine = sqlalchemy.create_engine(
+            'sqlite:///' + os.path.join(self.tmpdir, 'old.db'))
+        self.addCleanup(engine.dispose)
+        migrations.migrate(engine)
+        Retention(engine, {}).run(NOW)
+        with engine.connect() as connection:
+            self.assertEqual(connection.exec_driver_sql(
+                "PRAGMA auto_vacuum").scalar(), 2)
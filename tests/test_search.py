@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import io
+import os
+import re
+import unittest.mock
+
+import sqlalchemy
+
+from rsbbs import migrations
+from rsbbs.console import Console
+from rsbbs.controller import Controller
+from rsbbs.models import Message
+
+from tests.support import StationTestCase
+
+
+MESSAGES = [
+    # id, recipient, subject, body, is_private
+    (1, 'K1ABC', 'Antenna party', 'Bring a shovel.', False),
+    (2, 'K1ABC', 'Net tonight', 'Topic: antennas for 2m.', False),
+    (3, 'W1AW', 'Antenna for sale', 'Private offer.', True),
+    (4, 'N0CALL', 'Your antenna', 'It is ready.', True),
+    (5, 'K1ABC', 'Swap meet', 'Tables at 8. Antennae welcome.', False),
+]
+
+
+class TestSearch(StationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        config = self.make_config()
+        self.controller = Controller(config)
+        self.addCleanup(self.controller.engine.dispose)
+        self.console = Console(config, self.controller, None)
+        with self.controller.engine.begin() as connection:
+            connection.execute(sqlalchemy.insert(Message), [
+                {'id': id_, 'sender': 'K1ABC', 'recipient': recipient,
+                 'subject': subject, 'message': body, 'is_private': private}
+                for id_, recipient, subject, body, private in MESSAGES])
+
+    def search(self, line: str) -> list:
+        with unittest.mock.patch('sys.stdout', new=io.StringIO()) as out:
+            args = self.console.parser.parse_args(line.split())
+            args.func(args)
+        self.transcript = out.getvalue()
+        return [int(n) for n in re.findall(r'^(\d+) ', self.transcript,
+                                           re.M)]
+
+    def test_ranked_and_visible(self):
+        # Subject matches rank first, stems match, and W1AW's private
+        # message is hidden
+        found = self.search('f antenna')
+        self.assertEqual(sorted(found[:2]), [1, 4])
+        self.assertEqual(sorted(found[2:]), [2, 5])
+        self.assertEqual(self.search('search ANTENNA party'), [1])
+
+    def test_limit_and_prefix(self):
+        self.assertEqual(len(self.search('f -n 1 antenna')), 1)
+        self.assertEqual(sorted(self.search('f antenn*')), [1, 2, 4, 5])
+        self.search('f -n many antenna')
+        self.assertIn("The limit must be a number.", self.transcript)
+
+    def test_query_syntax_is_not_exposed(self):
+        for line in ('f "antenna', 'f AND', 'f antenna OR', 'f *',
+                     'f NEAR(antenna', 'f subject:antenna'):
+            with self.subTest(line=line):
+                self.search(line)
+
+    def test_index_follows_changes(self):
+        with self.controller.engine.begin() as connection:
+            connection.execute(sqlalchemy.delete(Message).where(
+                Message.id == 1))
+            connection.execute(sqlalchemy.update(Message).where(
+                Message.id == 5).values(subject='Antenna swap'))
+        self.assertEqual(self.search('f party'), [])
+        self.assertEqual(self.search('f swap'), [5])
+        self.assertEqual(self.search('f meet'), [])
+
+    def test_migration_indexes_existing_messages(self):
+        engine = sqlalchemy.create_engine(
+            'sqlite:///' + os.path.join(self.tmpdir, 'old.db'))
+        self.addCleanup(engine.dispose)
+        migrations.migrate(engine, target=5)
+        with engine.begin() as connection:
+            connection.exec_driver_sql(
+                "INSERT INTO message (sender, recipient, subject, message, "
+                "datetime, is_private) VALUES ('K1ABC', 'W1AW', 'Field "
+                "day', 'Bring antennas.', '2023-06-24 00:00:00', 0)")
+        migrations.migrate(engine)
+        with engine.connect() as connection:
+            self.assertEqual(connection.exec_driver_sql(
+                "SELECT rowid FROM message_fts "
+                "WHERE message_fts MATCH 'antenna'").scalars().all(), [1])
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import asyncio
+import os
+
+from rsbbs.server import Server
+
+from tests.support import StationTestCase
+
+
+PROMPT = b'ENTER COMMAND >\r\n'
+
+
+class TestServer(StationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.socket_path = os.path.join(self.tmpdir, 'rsbbs.sock')
+        config = self.make_config(serve=True)
+        config._config['server'] = {
+            'tcp_host': '127.0.0.1',
+            'tcp_port': 0,
+            'unix_socket': self.socket_path,
+            'max_sessions': 2,
+        }
+        self.server = Server(config)
+        self.addCleanup(self.server.controller.engine.dispose)
+
+    def serve(self, scenario) -> None:
+        """Run a scenario against the server, stopping it afterwards."""
+        async def main():
+            await self.server.start()
+            try:
+                await asyncio.wait_for(scenario(), 20)
+            finally:
+                await self.server.stop()
+        asyncio.run(main())
+
+    async def connect_tcp(self) -> tuple:
+        host, port = self.server.addresses[0]
+        return await asyncio.open_connection(host, port)
+
+    async def log_in(self, connection: tuple, callsign: bytes) -> bytes:
+        reader, writer = connection
+        await reader.readuntil(b'Callsign:\r\n')
+        writer.write(callsign + b'\r\n')
+        return await reader.readuntil(PROMPT)
+
+    async def command(self, connection: tuple, line: bytes) -> bytes:
+        reader, writer = connection
+        writer.write(line + b'\r\n')
+        return await reader.readuntil(PROMPT)
+
+    def test_callers_over_tcp_and_unix_at_once(self):
+        async def scenario():
+            tcp = await self.connect_tcp()
+            unix = await asyncio.open_unix_connection(self.socket_path)
+            greetings = await asyncio.gather(self.log_in(tcp, b'k1abc'),
+                                             self.log_in(unix, b'w1aw'))
+            self.assertIn(b"Welcome to Really Simple BBS, K1ABC",
+                          greetings[0])
+            self.assertIn(b"Welcome to Really Simple BBS, W1AW",
+                          greetings[1])
+
+            # Each caller is themselves, sharing one database
+            await self.command(
+                tcp, b'sp --callsign w1aw --subject hi --message 73')
+            listing = await self.command(unix, b'lm')
+            self.assertRegex(listing.decode(), r"W1AW +K1ABC .* hi")
+
+            for reader, writer in (tcp, unix):
+                writer.write(b'b\r\n')
+                self.assertIn(b"Bye!", await reader.read())
+                writer.close()
+        self.serve(scenario)
+
+    def test_max_sessions(self):
+        async def scenario():
+            first = await self.connect_tcp()
+            await self.log_in(first, b'k1abc')
+            second = await self.connect_tcp()
+            await second[0].readuntil(b'Callsign:\r\n')
+            reader, writer = await self.connect_tcp()
+            self.assertIn(b"busy", await reader.read())
+            writer.close()
+            for _, writer in (first, second):
+                writer.close()
+        self.serve(scenario)
+
+    def test_bad_callsign(self):
+        async def scenario():
+            reader, writer = await self.connect_tcp()
+            writer.write(b'hello there\r\n!!\r\n\r\n')
+            transcript = await reader.read()
+            self.assertEqual(transcript.count(b'Callsign:'), 3)
+            self.assertNotIn(b'Welcome', transcript)
+            writer.close()
+        self.serve(scenario)
+
+    def test_stop_disconnects_callers(self):
+        async def scenario():
+            connection = await self.connect_tcp()
+            await self.log_in(connection, b'k1abc')
+            await self.server.stop()
+            self.assertIn(b"shutting down", await connection[0].read())
+            self.assertEqual(self.server.sessions, set())
+            self.assertEqual(
+                self.server.controller.engine.pool.checkedout(), 0)
+            self.assertFalse(os.path.exists(self.socket_path))
+            connection[1].close()
+        self.serve(scenario)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import asyncio
+import socket
+
+import sqlalchemy
+
+from rsbbs.console import Console
+from rsbbs.controller import Controller
+from rsbbs.models import Message
+from rsbbs.session import CallerSession
+from rsbbs.user import User
+
+from tests.support import StationTestCase
+
+
+class TestCallerSession(StationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.config = self.make_config(calling_station='K1ABC')
+        self.controller = Controller(self.config)
+        self.engine = self.controller.engine
+        self.addCleanup(self.engine.dispose)
+        user = User(self.config, self.controller)
+        user.record_login()
+        self.console = Console(self.config, self.controller, user)
+
+    def call(self, commands: bytes, hang_up: bool = True,
+             **timeouts) -> tuple:
+        """Run a session over a socket pair, sending it commands, and
+        return the transcript and the session.
+        """
+        async def scenario():
+            ours, theirs = socket.socketpair()
+            reader, writer = await asyncio.open_connection(sock=ours)
+            session = CallerSession(self.console, reader, writer, **timeouts)
+            task = asyncio.create_task(session.run())
+            caller_reader, caller = await asyncio.open_connection(sock=theirs)
+            caller.write(commands)
+            if hang_up:
+                caller.write_eof()
+            transcript = await asyncio.wait_for(caller_reader.read(), 10)
+            await asyncio.wait_for(task, 10)
+            caller.close()
+            return transcript.decode(), session
+        return asyncio.run(scenario())
+
+    def test_commands(self):
+        transcript, session = self.call(b'l\r\nb\r\n')
+        self.assertIn("Welcome to Really Simple BBS, K1ABC", transcript)
+        self.assertIn("MSG#", transcript)
+        self.assertTrue(transcript.endswith("Bye!\r\n"))
+        self.assertFalse(session.thread.is_alive())
+
+    def test_idle_timeout(self):
+        transcript, session = self.call(b'l\r\n', hang_up=False,
+                                        idle_timeout=0.2)
+        self.assertIn("MSG#", transcript)
+        self.assertIn("No input for a while", transcript)
+        self.assertEqual(self.engine.pool.checkedout(), 0)
+
+    def test_session_timeout(self):
+        transcript, session = self.call(b'', hang_up=False,
+                                        idle_timeout=10, session_timeout=0.2)
+        self.assertIn("Session time limit reached", transcript)
+        self.assertFalse(session.thread.is_alive())
+
+    def test_cancel_closes_database_sessions(self):
+        self.config._config['screen_lines'] = 10
+        with self.engine.begin() as connection:
+            connection.execute(sqlalchemy.insert(Message), [
+                {'sender': 'W1AW', 'recipient': 'K1ABC',
+                 'subject': f"hello {n}", 'message': 'body',
+                 'is_private': False}
+                for n in range(500)])
+
+        async def scenario():
+            ours, theirs = socket.socketpair()
+            reader, writer = await asyncio.open_connection(sock=ours)
+            session = CallerSession(self.console, reader, writer)
+            task = asyncio.create_task(session.run())
+            caller_reader, caller = await asyncio.open_connection(sock=theirs)
+            # Stop at the more prompt, partway through the list, with its
+            # query still open
+            caller.write(b'l 0\r\n')
+            await asyncio.wait_for(caller_reader.readuntil(b'-- More'), 10)
+            self.assertEqual(self.engine.pool.checkedout(), 1)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await asyncio.wait_for(task, 10)
+            transcript = await asyncio.wait_for(caller_reader.read(), 10)
+            caller.close()
+            return transcript.decode()
+
+        transcript = asyncio.run(scenario())
+        self.assertIn("shutting down", transcript)
+        self.assertEqual(self.engine.pool.checkedout(), 0)
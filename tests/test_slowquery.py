@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+
+import sqlalchemy
+
+from rsbbs import slowquery
+from rsbbs.controller import Controller
+from rsbbs.models import Message
+
+from tests.support import StationTestCase
+
+
+class TestSlowQueryLog(StationTestCase):
+
+    def controller(self, **options) -> Controller:
+        config = self.make_config()
+        config._config['slow_query_log'] = {'enabled': True, **options}
+        controller = Controller(config)
+        self.addCleanup(controller.engine.dispose)
+        self.path = slowquery.log_path(config.app_name)
+        self.assertTrue(self.path.startswith(self.tmpdir))
+        return controller
+
+    def logged(self) -> str:
+        slowquery._handler.flush()
+        if not os.path.exists(self.path):
+            return ''
+        with open(self.path) as f:
+            return f.read()
+
+    def test_slow_statement_is_logged_with_its_plan(self):
+        controller = self.controller(threshold_ms=0)
+        with controller.engine.connect() as connection:
+            connection.execute(
+                sqlalchemy.select(Message.id).where(Message.subject == 'hi'))
+        logged = self.logged()
+        self.assertIn("FROM message", logged)
+        self.assertIn("parameters: ('hi',", logged)
+        self.assertIn("plan:\n  SCAN message", logged)
+
+    def test_indexed_lookup_shows_its_index(self):
+        controller = self.controller(threshold_ms=0)
+        with controller.engine.connect() as connection:
+            connection.execute(sqlalchemy.select(Message.id).where(
+                Message.recipient == 'W1AW'))
+        self.assertIn("USING COVERING INDEX ix_message_recipient",
+                      self.logged())
+
+    def test_fast_statements_are_not_logged(self):
+        controller = self.controller(threshold_ms=10_000)
+        with controller.engine.connect() as connection:
+            connection.execute(sqlalchemy.select(Message.id))
+        self.assertEqual(self.logged(), '')
+
+    def test_failed_statement_leaves_nothing_behind(self):
+        controller = self.controller(threshold_ms=0)
+        with controller.engine.connect() as connection:
+            with self.assertRaises(sqlalchemy.exc.OperationalError):
+                connection.exec_driver_sql("SELECT nothing FROM nowhere")
+            connection.execute(sqlalchemy.select(Message.id))
+            self.assertEqual(connection.info, {})
+        self.assertIn("SELECT message.id", self.logged())
+
+    def test_off_by_default(self):
+        config = self.make_config()
+        self.assertFalse(config.slow_query_log['enabled'])
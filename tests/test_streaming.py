@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import io
+import os
+import tracemalloc
+import unittest.mock
+
+import sqlalchemy
+
+from rsbbs.console import Console
+from rsbbs.controller import Controller
+from rsbbs.models import Message
+from rsbbs.user import User
+
+from tests.support import StationTestCase
+
+
+BODY_SIZE = 2000
+
+
+class TestStreaming(StationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        config = self.make_config()
+        # Nobody is there to answer a more prompt
+        config._config['screen_lines'] = 0
+        self.controller = Controller(config)
+        self.addCleanup(self.controller.engine.dispose)
+        self.console = Console(config, self.controller, None)
+
+    def send(self, count: int) -> None:
+        with self.controller.engine.begin() as connection:
+            connection.execute(sqlalchemy.insert(Message), [
+                {'sender': 'K1ABC', 'recipient': 'N0CALL',
+                 'subject': f"hello {n}", 'message': 'x' * BODY_SIZE,
+                 'is_private': False}
+                for n in range(count)])
+
+    def command(self, line: str) -> None:
+        with open(os.devnull, 'w') as devnull:
+            with unittest.mock.patch('sys.stdout', new=devnull):
+                args = self.console.parser.parse_args(line.split())
+                args.func(args)
+
+    def peak_memory(self, line: str) -> int:
+        """Peak memory allocated while running a command, in bytes."""
+        tracemalloc.start()
+        try:
+            self.command(line)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_memory_does_not_grow_with_the_mailbox(self):
+        # Warm up the plugin and the statement cache first
+        self.send(10)
+        self.command('l 0')
+
+        self.send(1000)
+        small = self.peak_memory('l 0')
+        self.send(4000)
+        large = self.peak_memory('l 0')
+
+        # Holding every row would take five times as much for the large
+        # mailbox, and at least its message bodies (10 MB)
+        self.assertLess(large, small * 1.5)
+        self.assertLess(large, 5000 * BODY_SIZE / 10)
+
+    def test_session_closed_after_stream(self):
+        self.send(30)
+        pool = self.controller.engine.pool
+        for line in ('l', 'l 0', 'lm 5-', 'lu <10'):
+            self.command(line)
+            self.assertEqual(pool.checkedout(), 0, line)
+
+        with self.controller.stream(sqlalchemy.select(Message)) as result:
+            next(result)
+            self.assertEqual(pool.checkedout(), 1)
+        self.assertEqual(pool.checkedout(), 0)
+
+    def test_listing_leaves_out_bodies(self):
+        self.send(3)
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+        sqlalchemy.event.listen(
+            self.controller.engine, 'before_cursor_execute', record)
+        for line in ('l', 'lm', 'lu'):
+            self.command(line)
+        self.assertEqual(len(statements), 3)
+        for statement in statements:
+            self.assertNotRegex(statement, r'\bmessage\.message\b')
+
+        # Reading a message still loads its body
+        self.console.user = User(self.controller.config, self.controller)
+        with unittest.mock.patch('sys.stdout', new=io.StringIO()) as out:
+            args = self.console.parser.parse_args(['r', '2'])
+            args.func(args)
+        self.assertIn('x' * BODY_SIZE, out.getvalue())
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+
+from datetime import datetime
+
+import sqlalchemy
+
+from sqlalchemy.orm import Session
+
+from rsbbs import mailbox, migrations, readstate, transfer
+from rsbbs.controller import Controller
+from rsbbs.models import Message, User
+from rsbbs.readstate import ReadSet
+
+from tests.support import StationTestCase
+
+
+class TestTransfer(StationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.engine = Controller(self.make_config()).engine
+        self.addCleanup(self.engine.dispose)
+        with Session(self.engine) as session:
+            session.add_all([
+                Message(sender='K1ABC', recipient='W1AW',
+                        subject=f"hello {n}",
+                        message=f"body {n}\nFrom here on\n",
+                        is_private=n % 2 == 0,
+                        datetime=datetime(2023, 6, n))
+                for n in range(1, 6)])
+            user = User(callsign='W1AW', given_name='Hiram',
+                        login_count=3, login_last=datetime(2023, 6, 7))
+            session.add(user)
+            session.flush()
+            mailbox.mark_read(session, user, [1, 2, 4])
+            session.commit()
+
+    def new_engine(self, name: str) -> sqlalchemy.Engine:
+        engine = sqlalchemy.create_engine(
+            'sqlite:///' + os.path.join(self.tmpdir, name))
+        self.addCleanup(engine.dispose)
+        migrations.migrate(engine)
+        return engine
+
+    def messages(self, engine: sqlalchemy.Engine) -> list:
+        with engine.connect() as connection:
+            return [tuple(row) for row in connection.execute(
+                sqlalchemy.select(
+                    Message.id, Message.sender, Message.recipient,
+                    Message.subject, Message.message, Message.datetime,
+                    Message.is_private).order_by(Message.id))]
+
+    def test_round_trip(self):
+        path = os.path.join(self.tmpdir, 'bbs.jsonl')
+        self.assertEqual(transfer.export_file(self.engine, path),
+                         {'user': 1, 'message': 5, 'read': 1})
+        engine = self.new_engine('copy.db')
+        self.assertEqual(transfer.import_file(engine, path),
+                         {'user': 1, 'message': 5, 'read': 1})
+
+        self.assertEqual(self.messages(engine), self.messages(self.engine))
+        with Session(engine) as session:
+            user = session.execute(sqlalchemy.select(User)).scalar_one()
+            self.assertEqual((user.callsign, user.given_name,
+                              user.login_count, user.login_last),
+                             ('W1AW', 'Hiram', 3, datetime(2023, 6, 7)))
+            self.assertEqual(list(readstate.load(session, user.id)),
+                             [1, 2, 4])
+            self.assertEqual(
+                session.execute(mailbox.select_unread_ids('W1AW'))
+                .scalars().all(), [3, 5])
+
+    def test_import_after_existing_messages(self):
+        path = os.path.join(self.tmpdir, 'bbs.jsonl')
+        transfer.export_file(self.engine, path)
+        # The same file again: messages are renumbered after the ones
+        # already there, and the user is kept as is
+        with Session(self.engine) as session:
+            session.execute(sqlalchemy.update(User).values(login_count=9))
+            session.commit()
+        transfer.import_file(self.engine, path)
+
+        messages = self.messages(self.engine)
+        self.assertEqual([m[0] for m in messages], list(range(1, 11)))
+        self.assertEqual([m[1:] for m in messages[:5]],
+                         [m[1:] for m in messages[5:]])
+        with Session(self.engine) as session:
+            user = session.execute(sqlalchemy.select(User)).scalar_one()
+            self.assertEqual(user.login_count, 9)
+            self.assertEqual(list(readstate.load(session, user.id)),
+                             [1, 2, 4, 6, 7, 9])
+
+    def test_new_message_after_import_is_unread(self):
+        # The newest messages, one of them read, are deleted before export,
+        # so the read state reaches past the last message exported
+        with self.engine.begin() as connection:
+            connection.execute(sqlalchemy.delete(Message).where(
+                Message.id >= 4))
+        path = os.path.join(self.tmpdir, 'bbs.jsonl')
+        transfer.export_file(self.engine, path)
+        engine = self.new_engine('copy.db')
+        transfer.import_file(engine, path)
+
+        with Session(engine) as session:
+            session.add(Message(sender='K1ABC', recipient='W1AW',
+                                subject='new', message='body',
+                                is_private=False))
+            session.commit()
+        self.assertEqual([m[0] for m in self.messages(engine)], [1, 2, 3, 5])
+
+        # And it stays unread through another export and import
+        transfer.export_file(engine, path)
+        engine = self.new_engine('again.db')
+        transfer.import_file(engine, path)
+        with Session(engine) as session:
+            self.assertEqual(
+                session.execute(mailbox.select_unread_ids('W1AW'))
+                .scalars().all(), [3, 5])
+
+    def test_mbox(self):
+        path = os.path.join(self.tmpdir, 'bbs.mbox')
+        self.assertEqual(transfer.export_file(self.engine, path),
+                         {'message': 5})
+        with open(path) as f:
+            text = f.read()
+        self.assertEqual(text.count('\nFrom K1ABC '), 4)
+        self.assertIn('\n>From here on\n', text)
+
+        engine = self.new_engine('copy.db')
+        self.assertEqual(transfer.import_file(engine, path), {'message': 5})
+        self.assertEqual(self.messages(engine), self.messages(self.engine))
+
+    def test_batches(self):
+        original = transfer.BATCH_SIZE
+        transfer.BATCH_SIZE = 2
+        self.addCleanup(setattr, transfer, 'BATCH_SIZE', original)
+        path = os.path.join(self.tmpdir, 'bbs.jsonl')
+        transfer.export_file(self.engine, path)
+        engine = self.new_engine('copy.db')
+        transfer.import_file(engine, path)
+        self.assertEqual(self.messages(engine), self.messages(self.engine))
+
+    def test_from_runs(self):
+        self.assertEqual(ReadSet.from_runs([(5, 7), (1, 2), (3, 3), (6, 9)]),
+                         ReadSet([1, 2, 3, 5, 6, 7, 8, 9]))
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+#
+# Really Simple BBS - a really simple BBS for ax.25 packet radio.
+# Copyright (C) 2023 John Burwell <john@atatdotdot.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import unittest.mock
+
+from datetime import datetime
+
+import sqlalchemy
+
+from rsbbs.controller import Controller
+from rsbbs.models import Message
+from rsbbs.user import User
+
+from tests.support import StationTestCase
+
+
+class TestUser(StationTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.config = self.make_config(calling_station='w1aw')
+        self.controller = Controller(self.config)
+        self.addCleanup(self.controller.engine.dispose)
+
+    def login(self) -> User:
+        user = User(self.config, self.controller)
+        user.record_login()
+        return user
+
+    def test_first_login(self):
+        user = self.login()
+        self.assertEqual(user.callsign, 'W1AW')
+        self.assertEqual(user.login_count, 1)
+        self.assertIsNone(user.login_previous)
+        self.assertEqual(user.login_last, user._user.login_last)
+        self.assertEqual(user.unread_count, 0)
+
+    def test_next_login(self):
+        first = self.login()
+        with self.controller.session() as session:
+            session.add_all(
+                Message(sender='K1ABC', recipient='W1AW', subject='hello',
+                        message='body', is_private=True,
+                        datetime=datetime(2023, 6, 1))
+                for _ in range(2))
+            session.commit()
+        user = self.login()
+        self.assertEqual(user.id, first.id)
+        self.assertEqual(user.login_count, 2)
+        self.assertEqual(user.login_last, first._user.login_last)
+        self.assertGreater(user._user.login_last, user.login_last)
+        self.assertEqual(user.unread_count, 2)
+
+    def test_login_is_one_statement(self):
+        self.login()
+        statements = []
+        sqlalchemy.event.listen(
+            self.controller.engine, 'before_cursor_execute',
+            lambda *args: statements.append(args[2]))
+        self.login()
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith('INSERT INTO user'))
+
+    def test_login_without_returning(self):
+        # SQLite before 3.35, as in Debian bullseye
+        with unittest.mock.patch('sqlite3.sqlite_version_info', (3, 34, 1)):
+            self.test_next_login()
+            statements = []
+            sqlalchemy.event.listen(
+                self.controller.engine, 'before_cursor_execute',
+                lambda *args: statements.append(args[2]))
+            self.login()
+        self.assertEqual(len(statements), 2)
+        self.assertNotIn('RETURNING', statements[0])
+
+    def test_user_without_login(self):
+        user = User(self.config, self.controller)
+        self.assertEqual(user.login_count, 0)
+        self.assertEqual(self.login().id, user.id)